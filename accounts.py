@@ -0,0 +1,145 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Iterable
+
+import settings
+
+ROUND_ROBIN, LEAST_LOADED = 'round_robin', 'least_loaded'
+
+
+class Account:
+    """Учётная запись из пула: свой api ключ (получается один раз и хранится до invalidate) и
+    число операций, которые сейчас выполняются от её имени"""
+
+    def __init__(self, email: str, password: str):
+        self.email = email
+        self.password = password
+        self.key = None
+        self.active = 0
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return 'Account(%r, active=%d, used=%d)' % (self.email, self.active, self.used)
+
+
+def parse_accounts(text: str) -> list:
+    """Разбирает учётные записи из текста: по одной на строку, email и пароль разделены двоеточием
+    или пробелом. Пустые строки и строки с # пропускаются. Запятая - часть пароля, через запятую
+    записи перечисляются только в переменной accounts (см. credentials)"""
+
+    accounts = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        email, separator, password = line.partition(':') if ':' in line else line.partition(' ')
+        if not separator or not email.strip() or not password.strip():
+            raise ValueError('Ожидается "email:пароль", получено %r' % line)
+        accounts.append((email.strip(), password.strip()))
+    return accounts
+
+
+class AccountPool:
+    """Пул учётных записей PetFriends, между которыми распределяется работа, чтобы список my_pets
+    каждой записи оставался небольшим, а параллельные потоки и воркеры не упирались в одну запись.
+    strategy='round_robin' выдаёт записи по очереди, 'least_loaded' - запись с наименьшим числом
+    выполняющихся сейчас операций (при равенстве - реже использованную).
+    Ключ каждой записи получается через pf.get_api_key при первом обращении и кэшируется в пуле"""
+
+    def __init__(self, pf, accounts: Iterable, strategy: str = ROUND_ROBIN):
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError("strategy может быть 'round_robin' или 'least_loaded'")
+        self.pf = pf
+        self.strategy = strategy
+        self.accounts = [item if isinstance(item, Account) else Account(*item) for item in accounts]
+        if not self.accounts:
+            raise ValueError('Пул учётных записей пуст')
+        self._order = itertools.cycle(self.accounts)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, pf, path: str, strategy: str = ROUND_ROBIN) -> 'AccountPool':
+        with open(path, encoding='utf-8') as file:
+            return cls(pf, parse_accounts(file.read()), strategy)
+
+    @classmethod
+    def from_settings(cls, pf, strategy: str = ROUND_ROBIN) -> 'AccountPool':
+        """Пул из настроек (см. credentials)"""
+
+        return cls(pf, credentials(), strategy)
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def next(self) -> Account:
+        """Выбирает запись по стратегии пула"""
+
+        with self._lock:
+            return self._pick()
+
+    def _pick(self) -> Account:
+        if self.strategy == ROUND_ROBIN:
+            account = next(self._order)
+        else:
+            account = min(self.accounts, key=lambda item: (item.active, item.used))
+        account.used += 1
+        return account
+
+    def shard(self, index: int) -> Account:
+        """Постоянная запись для index (например, номера воркера): одни и те же воркеры всегда
+        работают со своей записью"""
+
+        return self.accounts[index % len(self.accounts)]
+
+    def key(self, account: Account) -> dict:
+        """Api ключ записи. Параллельные вызовы для одной записи ждут один запрос к /api/key"""
+
+        if account.key is not None:
+            return account.key
+        with account._lock:
+            if account.key is None:
+                status, result = self.pf.get_api_key(account.email, account.password)
+                if status != 200:
+                    raise RuntimeError('Не удалось получить api ключ для %s: %s %s'
+                                       % (account.email, status, result))
+                account.key = result
+        return account.key
+
+    def invalidate(self, account: Account):
+        """Сбрасывает ключ записи, следующий key() получит новый"""
+
+        account.key = None
+
+    @contextmanager
+    def lease(self):
+        """Выдаёт (запись, api ключ) на время блока with; пока блок выполняется, запись считается
+        занятой для стратегии least_loaded"""
+
+        with self._lock:
+            account = self._pick()
+            account.active += 1
+        try:
+            yield account, self.key(account)
+        finally:
+            with self._lock:
+                account.active -= 1
+
+    def run(self, func, *args, **kwargs):
+        """Вызывает func(auth_key, *args, **kwargs) от имени записи, выбранной пулом"""
+
+        with self.lease() as (_, auth_key):
+            return func(auth_key, *args, **kwargs)
+
+
+def credentials() -> list:
+    """Учётные записи из настроек: файл accounts_file, иначе переменная accounts (записи через
+    запятую), иначе единственная пара valid_email/valid_password"""
+
+    if settings.accounts_file:
+        with open(settings.accounts_file, encoding='utf-8') as file:
+            return parse_accounts(file.read())
+    if settings.accounts:
+        return parse_accounts(settings.accounts.replace(',', '\n'))
+    return [(settings.valid_email, settings.valid_password)]
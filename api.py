@@ -1,51 +1,611 @@
 import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Union
 
 import requests
+from requests.adapters import BaseAdapter
+
+import settings
+from cache import ResponseCache
+from decoding import decode_body, get_decoder, resolve
+from images import ImagePreprocessor
+from journal import PetJournal
+from limits import AdaptiveLimiter, TokenBucket
+from metrics import Metrics, RequestInfo
+from mirror import PetsMirror
+from models import Pet
+from streaming import PetsParser
+from transport import TimedHTTPAdapter, measure_connections
+from uploads import PhotoEncoder
+
+
+class BulkResult:
+    """Результат пакетной операции. При итерации отдаёт тройки (item, status, result) по мере
+    завершения запросов; если запрос упал с исключением, status равен None, а result - исключение.
+    Все неуспешные элементы (статус не 200 или исключение) собираются в failures по мере завершения,
+    даже если результат никто не перебирает; пакет при этом не прерывается. Повторная итерация
+    отдаёт те же тройки в том же порядке"""
+
+    def __init__(self, futures: dict):
+        self._futures = futures
+        # Тройки в порядке завершения запросов
+        self._results = []
+        self._done = threading.Condition()
+        self.failures = []
+        for future in futures:
+            future.add_done_callback(self._collect)
+
+    def _collect(self, future):
+        item = self._futures[future]
+        try:
+            status, result = future.result()
+        except Exception as e:
+            status, result = None, e
+        with self._done:
+            self._results.append((item, status, result))
+            if status != 200:
+                self.failures.append((item, status, result))
+            self._done.notify_all()
+
+    def __iter__(self):
+        for index in range(len(self._futures)):
+            with self._done:
+                self._done.wait_for(lambda: len(self._results) > index)
+                triple = self._results[index]
+            yield triple
+
+    def wait(self) -> list:
+        """Дожидается завершения всех запросов и возвращает список троек (item, status, result)"""
+
+        return list(self)
+
+
+# Статусы, при которых идемпотентный запрос имеет смысл повторить
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Предел потоков для hedged GET (исходный запрос и дубликат). Пул создаёт потоки по мере надобности,
+# поэтому предел не должен ограничивать одновременные вызовы: каждому нужен поток на время запроса
+HEDGE_WORKERS = 512
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
 
 
 class PetFriends:
-    def __init__(self):
-        self.base_url = 'https://petfriends.skillfactory.ru'
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, keep_alive: bool = True,
+                 headers: dict = None, key_ttl: float = None, bulk_workers: int = 8, typed: bool = False,
+                 timeout: float = 60.0, attempt_timeout: float = None, retries: int = 0, backoff: float = 0.1,
+                 backoff_max: float = 2.0, hedge: bool = False, hedge_after: float = None,
+                 hedge_min_samples: int = 20, concurrency: Union[int, AdaptiveLimiter] = None,
+                 rate: Union[float, TokenBucket] = None, mirror: bool = False, mirror_ttl: float = None,
+                 cache_ttl: float = None, cache_max_bytes: int = 32 * 1024 * 1024, decoder=None,
+                 lazy_json: bool = False, images: ImagePreprocessor = None, transport: BaseAdapter = None,
+                 journal: PetJournal = None):
+        """Клиент держит собственную сессию requests с пулом соединений, поэтому повторные запросы
+        к base_url идут по уже открытым keep-alive соединениям без нового TCP/TLS рукопожатия.
+        pool_connections - сколько пулов (хостов) держать, pool_maxsize - максимум соединений на хост,
+        keep_alive=False закрывает соединение после каждого ответа, headers - заголовки по умолчанию
+        для всех запросов.
+        key_ttl - время жизни (в секундах) кэша api ключей; по умолчанию кэш выключен.
+        bulk_workers - число потоков для пакетных операций.
+        typed=True - успешные ответы с питомцами возвращаются как объекты models.Pet (список питомцев -
+        как список Pet) вместо словарей.
+        В hooks['before_request'] и hooks['after_request'] можно добавить функции, которые получают
+        metrics.RequestInfo до и после каждого HTTP вызова; metrics собирает статистику по эндпоинтам.
+        timeout - срок (в секундах) на весь вызов метода вместе с повторами, его можно переопределить
+        в каждом методе; None - ждать без ограничений. attempt_timeout - ограничение на одну попытку.
+        retries - сколько раз повторять идемпотентные вызовы (get_api_key, get_list_of_pets, update_pet,
+        delete_pet) при ошибке соединения, таймауте или статусах 429/502/503/504; пауза между
+        попытками растёт экспоненциально от backoff до backoff_max со случайным разбросом.
+        hedge=True - если GET запрос не получил ответ за hedge_after секунд (по умолчанию - p95 задержки
+        эндпоинта, когда набрано hedge_min_samples замеров), отправляется дубликат и берётся первый ответ.
+        concurrency - начальный лимит одновременных запросов для limits.AdaptiveLimiter (AIMD) или
+        готовый лимитер, общий для нескольких клиентов. rate - ограничение запросов в секунду или
+        готовый limits.TokenBucket (в том числе общий для процессов через файл).
+        mirror=True включает локальную копию собственных питомцев (см. my_pets): она загружается один
+        раз и обновляется ответами методов, меняющих питомцев; mirror_ttl - через сколько секунд копия
+        загружается заново.
+        cache_ttl - включает кэш ответов get_list_of_pets (cache.ResponseCache) на cache_ttl секунд с
+        ограничением cache_max_bytes; устаревшие записи перепроверяются условным запросом (ETag или
+        Last-Modified), а вызовы, меняющие питомцев, сбрасывают записи своего api ключа.
+        decoder - функция разбора JSON или её имя ('json', 'orjson'); по умолчанию orjson, если он
+        установлен. lazy_json=True - ответы JSON возвращаются как decoding.LazyJSON и разбираются при
+        первом обращении. Время разбора попадает в RequestInfo.timings['decode'] и в метрики.
+        images - images.ImagePreprocessor, через который проходят фото в add_new_pet и add_photo_pet:
+        проверка формата по содержимому (в strict режиме - ошибка ImageError без запроса к серверу),
+        уменьшение и пережатие с кэшем результатов на диске.
+        transport - адаптер requests вместо стандартного пула соединений, например
+        cassette.CassetteAdapter для записи и воспроизведения ответов без сети или http2.HTTP2Adapter,
+        который ведёт одновременные запросы параллельными потоками одного HTTP/2 соединения.
+        journal - journal.PetJournal, куда записываются созданные клиентом питомцы (и вычёркиваются
+        удалённые через delete_pet), чтобы потом удалить оставшихся одним вызовом cleanup"""
 
-    def get_api_key(self, email: str, password: str) -> json:
-        """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате
-        JSON с уникальным ключом пользователя, найденным по указанным email и паролю"""
+        self.base_url = settings.base_url
+
+        self.session = requests.Session()
+        adapter = transport or TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        self.key_ttl = key_ttl
+        # (email, password) -> (время истечения, результат запроса ключа)
+        self._keys = {}
+        # ключ -> (email, password), чтобы по ответу 403 понять, какой ключ перезапросить
+        self._key_owners = {}
+        # отдельная блокировка на каждую пару (email, password): параллельные вызовы
+        # ждут один запрос к /api/key вместо того, чтобы отправлять свои
+        self._key_locks = {}
+        self._keys_lock = threading.Lock()
+
+        self.bulk_workers = bulk_workers
+
+        self._photos = PhotoEncoder()
+        self._environment = {}
+        self.typed = typed
+
+        self.hooks = {'before_request': [], 'after_request': []}
+        self.metrics = Metrics()
+
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_min_samples = hedge_min_samples
+        self._hedge_executor = None
+
+        if isinstance(concurrency, int):
+            concurrency = AdaptiveLimiter(initial=concurrency)
+        self.limiter = concurrency
+        if isinstance(rate, (int, float)):
+            rate = TokenBucket(rate)
+        self.rate_limit = rate
+
+        self.mirror = PetsMirror(mirror_ttl) if mirror else None
+        self.cache = ResponseCache(cache_ttl, cache_max_bytes) if cache_ttl is not None else None
+
+        self.decoder = get_decoder(decoder)
+        self.lazy_json = lazy_json
+        self.images = images
+        self.journal = journal
+
+    def close(self):
+        """Закрывает все соединения пула и освобождает закэшированные фото"""
+
+        self.session.close()
+        self._photos.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _send(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Отправляет запрос и возвращает ответ без разбора тела"""
+
+        return self._exchange(method, path, decode=False, **kwargs)[0]
+
+    def _call(self, method: str, path: str, **kwargs) -> tuple:
+        """Отправляет запрос и разбирает ответ. Возвращает статус и результат (JSON или текст)"""
+
+        res, result = self._exchange(method, path, decode=True, **kwargs)
+        return res.status_code, result
+
+    def _exchange(self, method: str, path: str, auth_key: json = None, headers: dict = None, stream: bool = False,
+                  endpoint: str = None, timeout: float = None, idempotent: bool = False, decode: bool = False,
+                  **kwargs) -> tuple:
+        """Общий конвейер всех вызовов: отправка через сессию клиента, разбор ответа (при decode=True),
+        хуки и метрики. Возвращает (ответ, результат разбора или None).
+        endpoint - шаблон пути для метрик (например '/api/pets/{pet_id}'), по умолчанию сам путь.
+        timeout - срок на вызов (по умолчанию self.timeout), idempotent - можно ли повторять запрос"""
+
+        headers = dict(headers or {})
+        if auth_key is not None:
+            headers['auth_key'] = auth_key['key']
+
+        prepared = self.session.prepare_request(
+            requests.Request(method, self.base_url + path, headers=headers, **kwargs))
+
+        info = RequestInfo(method, endpoint or path, prepared.url)
+        info.bytes_sent = _body_size(prepared.body)
+        for hook in self.hooks['before_request']:
+            hook(info)
+
+        started = time.perf_counter()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with measure_connections() as timings:
+            try:
+                res = self._transmit(prepared, auth_key, stream, info, deadline, idempotent)
+            except Exception as e:
+                info.error = e
+                raise
+            else:
+                info.status = res.status_code
+                if stream:
+                    info.bytes_received = int(res.headers.get('Content-Length') or 0)
+                else:
+                    info.bytes_received = len(res.content)
+                if decode:
+                    result, info.timings['decode'] = self._decode(res.content, res.headers.get('Content-Type'),
+                                                                  res.encoding)
+            finally:
+                info.timings.update(timings)
+                info.timings['total'] = time.perf_counter() - started
+                self.metrics.record(info)
+                for hook in self.hooks['after_request']:
+                    hook(info)
+        return res, result if decode else None
+
+    def _decode(self, content: bytes, content_type: str = 'application/json', encoding: str = None):
+        return decode_body(content, content_type, self.decoder, self.lazy_json, encoding)
+
+    def _transmit(self, prepared: requests.PreparedRequest, auth_key: json, stream: bool, info: RequestInfo,
+                  deadline: float, idempotent: bool) -> requests.Response:
+        """Отправляет подготовленный запрос с повторами для идемпотентных вызовов. Если передан auth_key
+        из кэша и сервер ответил 403, ключ перезапрашивается и запрос повторяется один раз с новым ключом"""
+
+        send_kwargs = self._send_kwargs(stream)
+        hedge = self.hedge and prepared.method == 'GET' and not stream
+        res = self._attempts(prepared, send_kwargs, info, deadline, idempotent, hedge)
+
+        if res.status_code == 403 and auth_key is not None:
+            new_key = self._refresh_key(auth_key['key'], self._remaining(deadline))
+            if new_key is not None:
+                # Ответ 403 больше не нужен: при stream=True без close соединение не вернётся в пул
+                res.close()
+                # Обновляем ключ у вызывающего, чтобы следующие вызовы сразу шли с новым ключом
+                auth_key['key'] = new_key
+                prepared = prepared.copy()
+                prepared.headers['auth_key'] = new_key
+                info.retries += 1
+                res = self._attempts(prepared, send_kwargs, info, deadline, idempotent, hedge)
+        return res
+
+    def _attempts(self, prepared: requests.PreparedRequest, send_kwargs: dict, info: RequestInfo,
+                  deadline: float, idempotent: bool, hedge: bool) -> requests.Response:
+        """Отправляет запрос и, если он идемпотентный, повторяет его до self.retries раз при ошибках
+        соединения, таймаутах и статусах RETRY_STATUSES, пока не истёк срок deadline"""
+
+        attempt = 0
+        while True:
+            if hasattr(prepared.body, 'seek'):
+                prepared.body.seek(0)
+            try:
+                res = self._send_limited(prepared, send_kwargs, info, deadline, hedge)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self._can_retry(idempotent, attempt, deadline):
+                    raise
+            else:
+                if res.status_code not in RETRY_STATUSES or not self._can_retry(idempotent, attempt, deadline):
+                    return res
+                res.close()
+
+            # Экспоненциальная пауза со случайным разбросом (full jitter), но не дольше оставшегося срока
+            pause = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+            if deadline is not None:
+                pause = min(pause, max(0.0, deadline - time.monotonic()))
+            time.sleep(pause)
+            attempt += 1
+            info.retries += 1
+
+    def _send_limited(self, prepared: requests.PreparedRequest, send_kwargs: dict, info: RequestInfo,
+                      deadline: float, hedge: bool) -> requests.Response:
+        """Одна попытка запроса с учётом ограничения частоты и адаптивного лимита одновременных запросов.
+        Ожидание жетона и места в лимите входит в срок вызова"""
+
+        if self.rate_limit is not None and not self.rate_limit.acquire(timeout=self._remaining(deadline)):
+            raise requests.Timeout('Истёк срок выполнения запроса в ожидании лимита частоты')
+        if self.limiter is not None and not self.limiter.acquire(timeout=self._remaining(deadline)):
+            raise requests.Timeout('Истёк срок выполнения запроса в ожидании лимита одновременных запросов')
+
+        def attempt():
+            timeout = self._attempt_timeout(deadline)
+            if hedge:
+                return self._send_hedged(prepared, send_kwargs, timeout, info)
+            return self.session.send(prepared, timeout=timeout, **send_kwargs)
+
+        return self._observe(attempt)
+
+    def _observe(self, send, *args) -> requests.Response:
+        """Вызывает send(*args) на занятом месте limiter и освобождает место. Перегрузкой сервера
+        считаются только ответы 429 и 5xx и таймаут чтения ответа. Если запрос не дошёл до сервера
+        (истёк срок, не удалось подготовить тело или соединиться), место возвращается без замера"""
+
+        started = time.perf_counter()
+        try:
+            res = send(*args)
+        except requests.ReadTimeout:
+            if self.limiter is not None:
+                self.limiter.release(time.perf_counter() - started, True)
+            raise
+        except BaseException:
+            if self.limiter is not None:
+                self.limiter.cancel()
+            raise
+        if self.limiter is not None:
+            self.limiter.release(time.perf_counter() - started, res.status_code == 429 or res.status_code >= 500)
+        return res
+
+    @staticmethod
+    def _remaining(deadline: float):
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def _can_retry(self, idempotent: bool, attempt: int, deadline: float) -> bool:
+        return idempotent and attempt < self.retries and (deadline is None or time.monotonic() < deadline)
+
+    def _attempt_timeout(self, deadline: float):
+        """Таймаут очередной попытки: остаток срока вызова, но не больше attempt_timeout"""
+
+        timeout = self.attempt_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout('Истёк срок выполнения запроса')
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _hedge_delay(self, info: RequestInfo):
+        """Через сколько секунд отправлять дубликат: hedge_after или p95 задержки эндпоинта"""
+
+        if self.hedge_after is not None:
+            return self.hedge_after
+        latency = self.metrics.latency(info.method, info.endpoint)
+        if latency.count < self.hedge_min_samples:
+            return None
+        return latency.percentile(0.95)
+
+    def _send_hedged(self, prepared: requests.PreparedRequest, send_kwargs: dict, timeout: float,
+                     info: RequestInfo) -> requests.Response:
+        """Отправляет GET запрос и, если ответа нет дольше _hedge_delay, дублирует его.
+        Дубликату нужны свои жетон rate_limit и место в limiter; если их нет сразу, дубликат не
+        отправляется и ждём исходный ответ. Возвращает первый успешно полученный ответ, второй
+        закрывается после получения. Срок hedge_after отсчитывается с момента, когда исходный запрос
+        действительно начал отправляться, а не с постановки в очередь пула"""
+
+        delay = self._hedge_delay(info)
+        if delay is None:
+            return self.session.send(prepared, timeout=timeout, **send_kwargs)
+
+        if self._hedge_executor is None:
+            with self._keys_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS,
+                                                              thread_name_prefix='hedge')
+        send = lambda request: self.session.send(request, timeout=timeout, **send_kwargs)
+        started = threading.Event()
+
+        def primary():
+            started.set()
+            return send(prepared)
+
+        futures = [self._hedge_executor.submit(primary)]
+        started.wait()
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._acquire_hedge():
+            info.hedged = True
+            futures.append(self._hedge_executor.submit(self._observe, send, prepared.copy()))
+
+        error = None
+        pending = futures
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _acquire_hedge(self) -> bool:
+        """Берёт жетон и место для дубликата без ожидания: дубликат не должен ни превышать лимиты,
+        ни задерживать исходный запрос"""
+
+        if self.limiter is not None and not self.limiter.acquire(timeout=0):
+            return False
+        if self.rate_limit is not None and not self.rate_limit.acquire(timeout=0):
+            if self.limiter is not None:
+                self.limiter.cancel()
+            return False
+        return True
+
+    def _send_kwargs(self, stream: bool) -> dict:
+        """Параметры отправки с учётом окружения (прокси, сертификаты). Они зависят только от хоста,
+        а их вычисление перебирает все переменные окружения, поэтому считаются один раз на base_url"""
+
+        environment = self._environment.get(self.base_url)
+        if environment is None:
+            environment = self.session.merge_environment_settings(self.base_url, {}, None, None, None)
+            self._environment[self.base_url] = environment
+        return dict(environment, stream=stream)
+
+    def _typed(self, status: int, result):
+        """В режиме typed превращает успешный ответ с питомцем или списком питомцев в Pet"""
+
+        if not self.typed or status != 200:
+            return result
+        result = resolve(result)
+        if not isinstance(result, dict):
+            return result
+        if 'pets' in result:
+            return [Pet.from_dict(pet) for pet in result['pets']]
+        return Pet.from_dict(result)
+
+    def _cached_list(self, auth_key: json, filter: dict, timeout: float):
+        """get_list_of_pets через кэш ответов: свежая запись отдаётся без запроса, устаревшая
+        перепроверяется условным запросом, ответ 304 продлевает её срок жизни"""
+
+        key = (auth_key['key'], filter['filter'])
+        entry, generation = self.cache.lookup(key)
+        if entry is not None and entry.fresh():
+            return 200, self._decode(entry.content)[0]
+
+        headers = entry.validators() if entry is not None else None
+        res, result = self._exchange('GET', '/api/pets', auth_key=auth_key, params=filter, headers=headers,
+                                     timeout=timeout, idempotent=True, decode=True)
+        status = res.status_code
+        if status == 304 and entry is not None:
+            self.cache.refresh(key, entry)
+            return 200, self._decode(entry.content)[0]
+
+        if status == 200:
+            self.cache.store(key, generation, res.content,
+                             res.headers.get('ETag'), res.headers.get('Last-Modified'))
+        return status, result
+
+    def _changed(self, auth_key: json):
+        """Сбрасывает кэш списков api ключа после вызова, который мог изменить питомцев"""
+
+        if self.cache is not None:
+            self.cache.invalidate(auth_key['key'])
+
+    def _prepare_photo(self, pet_photo):
+        if self.images is None:
+            return pet_photo, None
+        return self.images.prepare(pet_photo)
+
+    def _mirror_load(self, auth_key: json, filter: str, status: int, result):
+        if self.mirror is not None and filter == 'my_pets' and status == 200:
+            result = resolve(result)
+            if isinstance(result, dict):
+                self.mirror.load(auth_key['key'], result['pets'])
+
+    def _mirror_put(self, auth_key: json, status: int, result):
+        if self.mirror is not None and status == 200:
+            result = resolve(result)
+            if isinstance(result, dict) and 'id' in result:
+                self.mirror.put(auth_key['key'], result)
+
+    def _track(self, auth_key: json, status: int, result):
+        if self.journal is not None and status == 200:
+            result = resolve(result)
+            if isinstance(result, dict) and 'id' in result:
+                owner = self._key_owners.get(auth_key['key'])
+                self.journal.add(auth_key, result['id'], owner[0] if owner else None)
+
+    def _refresh_key(self, key: str, timeout: float = None):
+        """Сбрасывает ключ из кэша и получает новый не дольше timeout секунд (остаток срока вызова).
+        Возвращает None, если ключ получен не через кэш или новый ключ получить не удалось"""
+
+        with self._keys_lock:
+            credentials = self._key_owners.get(key)
+            if credentials is None:
+                return None
+            cached = self._keys.get(credentials)
+            if cached is not None and cached[1]['key'] == key:
+                del self._keys[credentials]
+
+        status, result = self.get_api_key(*credentials, timeout=timeout)
+        if status != 200 or result['key'] == key:
+            return None
+        return result['key']
+
+    def _fetch_api_key(self, email: str, password: str, timeout: float = None) -> json:
+        """Запрашивает новый api ключ у сервера в обход кэша"""
 
         headers = {
             'email': email,
             'password': password
         }
 
-        res = requests.get(self.base_url+'/api/key', headers=headers)
-        status = res.status_code
-        result = ''
-        try:
-            result = res.json()
-        except:
-            result = res.text
-        return status, result
+        status, result = self._call('GET', '/api/key', headers=headers, timeout=timeout, idempotent=True)
+        return status, resolve(result)
 
-    def get_list_of_pets(self, auth_key: json, filter: str = '') -> json:
+    def get_api_key(self, email: str, password: str, timeout: float = None) -> json:
+        """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате
+        JSON с уникальным ключом пользователя, найденным по указанным email и паролю"""
+
+        if self.key_ttl is None:
+            return self._fetch_api_key(email, password, timeout)
+
+        credentials = (email, password)
+        with self._keys_lock:
+            lock = self._key_locks.setdefault(credentials, threading.Lock())
+
+        with lock:
+            cached = self._keys.get(credentials)
+            if cached is not None and cached[0] > time.monotonic():
+                return 200, dict(cached[1])
+
+            status, result = self._fetch_api_key(email, password, timeout)
+            if status == 200 and isinstance(result, dict) and 'key' in result:
+                with self._keys_lock:
+                    self._keys[credentials] = (time.monotonic() + self.key_ttl, dict(result))
+                    self._key_owners[result['key']] = credentials
+            return status, result
+
+    def get_list_of_pets(self, auth_key: json, filter: str = '', timeout: float = None) -> json:
         """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате
         JSON со списком найденных питомцев, совпадающих с фильтром. На данный момент фильтр может
         иметь либо пустое значение - получить список всех питомцев либо 'my_pets' - получить список
         собственных питомцев"""
 
-        headers = {'auth_key': auth_key['key']}
         filter = {'filter': filter}
 
-        res = requests.get(self.base_url+'/api/pets', headers=headers, params=filter)
-        status = res.status_code
-        result = ''
+        if self.cache is not None:
+            status, result = self._cached_list(auth_key, filter, timeout)
+            self._mirror_load(auth_key, filter['filter'], status, result)
+            return status, self._typed(status, result)
+
+        status, result = self._call('GET', '/api/pets', auth_key=auth_key, params=filter, timeout=timeout,
+                                    idempotent=True)
+        self._mirror_load(auth_key, filter['filter'], status, result)
+        return status, self._typed(status, result)
+
+    def iter_pets(self, auth_key: json, filter: str = '', photos: str = 'keep', chunk_size: int = 64 * 1024,
+                  timeout: float = None):
+        """Генератор, который читает ответ со списком питомцев по частям и отдаёт питомцев по одному,
+        не загружая весь список в память. photos: 'keep' - оставить фото, 'skip' - не возвращать поле
+        pet_photo, 'defer' - вернуть pet_photo как bytes без разбора JSON. В режиме typed отдаются
+        объекты Pet. Если сервер вернул статус не 200, выбрасывается исключение с текстом ответа.
+        timeout ограничивает получение заголовков ответа и паузы между кусками"""
+
+        parser = PetsParser(photos, self.decoder)
+        filter = {'filter': filter}
+
+        res = self._send('GET', '/api/pets', auth_key=auth_key, params=filter, stream=True, timeout=timeout,
+                         idempotent=True)
         try:
-            result = res.json()
-        except:
-            result = res.text
-        return status, result
+            if res.status_code != 200:
+                raise Exception("Не удалось получить список питомцев: %s %s" % (res.status_code, res.text))
+            for chunk in res.iter_content(chunk_size):
+                pets = parser.feed(chunk)
+                yield from (map(Pet.from_dict, pets) if self.typed else pets)
+                if parser.done:
+                    break
+        finally:
+            res.close()
 
-    def add_new_pet(self, auth_key: json, name: str, animal_type: str, age: str, pet_photo: str) -> json:
+    def add_new_pet(self, auth_key: json, name: str, animal_type: str, age: str, pet_photo,
+                    timeout: float = None) -> json:
         """Метод отправляет данные о новом добавляемом питомце на сервер и возвращает статус запроса и результат в формате
-        JSON с данными добавленного питомца"""
+        JSON с данными добавленного питомца. pet_photo - путь к файлу, bytes, memoryview или файловый объект"""
 
         data = {
             'name': name,
@@ -53,33 +613,31 @@ class PetFriends:
             'age': age
         }
 
-        headers = {'auth_key': auth_key['key']}
-        file = {'pet_photo': (pet_photo, open(pet_photo, 'rb'), 'image/jpeg')}
+        headers = {'Content-Type': self._photos.content_type}
+        pet_photo, photo_type = self._prepare_photo(pet_photo)
+        body = self._photos.body(data, pet_photo, content_type=photo_type)
 
-        res = requests.post(self.base_url+'/api/pets', headers=headers, data=data, files=file)
-        status = res.status_code
-        result = ''
-        try:
-            result = res.json()
-        except:
-            result = res.text
-        return status, result
+        status, result = self._call('POST', '/api/pets', auth_key=auth_key, headers=headers, data=body, timeout=timeout)
+        self._changed(auth_key)
+        self._track(auth_key, status, result)
+        self._mirror_put(auth_key, status, result)
+        return status, self._typed(status, result)
 
-    def delete_pet(self, auth_key: json, pet_id: str) -> json:
+    def delete_pet(self, auth_key: json, pet_id: str, timeout: float = None) -> json:
         """Метод отправляет запрос на сервер на удаление питомца по pet_id и возвращает
         статус запроса и результат в формате JSON"""
 
-        headers = {'auth_key': auth_key['key']}
-        res = requests.delete(self.base_url+'/api/pets/'+pet_id, headers=headers)
-        status = res.status_code
-        result = ''
-        try:
-            result = res.json()
-        except:
-            result = res.text
+        status, result = self._call('DELETE', '/api/pets/'+pet_id, auth_key=auth_key, endpoint='/api/pets/{pet_id}',
+                                    timeout=timeout, idempotent=True)
+        self._changed(auth_key)
+        if self.journal is not None and status == 200:
+            self.journal.remove(pet_id)
+        if self.mirror is not None and status == 200:
+            self.mirror.remove(auth_key['key'], pet_id)
         return status, result
 
-    def update_pet(self, auth_key: json, pet_id: str, name: str, animal_type: str, age: str) -> json:
+    def update_pet(self, auth_key: json, pet_id: str, name: str, animal_type: str, age: str,
+                   timeout: float = None) -> json:
         """Метод отправляет на сервер запрос на обновление/изменение данных питомца по pet_id и возвращает
         статус запроса и результат в формате JSON"""
 
@@ -88,19 +646,16 @@ class PetFriends:
             'animal_type': animal_type,
             'age': age
         }
-        headers = {'auth_key': auth_key['key']}
 
-        res = requests.put(self.base_url+'/api/pets/'+pet_id, headers=headers, data=data)
-        status = res.status_code
-        result = ''
-        try:
-            result = res.json()
-        except:
-            result = res.text
-        return status, result
+        status, result = self._call('PUT', '/api/pets/'+pet_id, auth_key=auth_key, data=data,
+                                    endpoint='/api/pets/{pet_id}', timeout=timeout, idempotent=True)
+        self._changed(auth_key)
+        self._mirror_put(auth_key, status, result)
+        return status, self._typed(status, result)
 
 
-    def add_new_pet_simple(self, auth_key: json, name: str, animal_type: str, age: str) -> json:
+    def add_new_pet_simple(self, auth_key: json, name: str, animal_type: str, age: str,
+                           timeout: float = None) -> json:
         """Метод отправляет данные о новом добавляемом питомце без фото на сервер и возвращает статус запроса и результат в формате
         JSON с данными добавленного питомца"""
 
@@ -110,32 +665,95 @@ class PetFriends:
             'age': age
         }
 
-        headers = {'auth_key': auth_key['key']}
+        status, result = self._call('POST', '/api/create_pet_simple', auth_key=auth_key, data=data, timeout=timeout)
+        self._changed(auth_key)
+        self._track(auth_key, status, result)
+        self._mirror_put(auth_key, status, result)
+        return status, self._typed(status, result)
 
-        res = requests.post(self.base_url+'/api/create_pet_simple', headers=headers, data=data)
-        status = res.status_code
-        result = ''
-        try:
-            result = res.json()
-        except:
-            result = res.text
-        return status, result
-
-    def add_photo_pet(self, auth_key: json, pet_id: str, pet_photo: str) -> json:
+    def add_photo_pet(self, auth_key: json, pet_id: str, pet_photo, timeout: float = None) -> json:
         """Метод отправляет на сервер запрос на добавление фото питомца по pet_id и возвращает
-        статус запроса и результат в формате JSON"""
+        статус запроса и результат в формате JSON. pet_photo - путь к файлу, bytes, memoryview или файловый объект"""
 
-        file = {'pet_photo': (pet_photo, open(pet_photo, 'rb'), 'image/jpeg')}
+        headers = {'Content-Type': self._photos.content_type}
+        pet_photo, photo_type = self._prepare_photo(pet_photo)
+        body = self._photos.body({}, pet_photo, content_type=photo_type)
 
-        headers = {'auth_key': auth_key['key']}
+        status, result = self._call('POST', '/api/pets/set_photo/'+pet_id, auth_key=auth_key, headers=headers,
+                                    data=body, endpoint='/api/pets/set_photo/{pet_id}', timeout=timeout)
+        self._changed(auth_key)
+        self._mirror_put(auth_key, status, result)
+        return status, self._typed(status, result)
 
-        res = requests.post(self.base_url+'/api/pets/set_photo/'+pet_id, headers=headers, files=file)
-        status = res.status_code
-        result = ''
-        try:
-            result = res.json()
-        except:
-            result = res.text
-        return status, result
+    def my_pets(self, auth_key: json, refresh: bool = False, timeout: float = None) -> list:
+        """Возвращает список собственных питомцев из локальной копии (нужен mirror=True). Список
+        запрашивается у сервера только при первом обращении, по refresh=True или после mirror_ttl.
+        Если загрузить список не удалось, выбрасывается исключение с текстом ответа"""
+
+        self._sync_mirror(auth_key, refresh, timeout)
+        return self._typed_pets(self.mirror.pets(auth_key['key']))
+
+    def my_pet(self, auth_key: json, pet_id: str, timeout: float = None):
+        """Возвращает собственного питомца по id из локальной копии или None"""
+
+        self._sync_mirror(auth_key, False, timeout)
+        pet = self.mirror.get(auth_key['key'], pet_id)
+        return Pet.from_dict(pet) if self.typed and pet is not None else pet
+
+    def find_my_pets(self, auth_key: json, name: str, timeout: float = None) -> list:
+        """Возвращает собственных питомцев с именем name из локальной копии"""
+
+        self._sync_mirror(auth_key, False, timeout)
+        return self._typed_pets(self.mirror.find(auth_key['key'], name))
+
+    def _sync_mirror(self, auth_key: json, refresh: bool, timeout: float):
+        if self.mirror is None:
+            raise ValueError('Локальная копия питомцев выключена, создайте клиент с mirror=True')
+        if refresh or not self.mirror.is_fresh(auth_key['key']):
+            status, result = self.get_list_of_pets(auth_key, 'my_pets', timeout=timeout)
+            if status != 200:
+                raise Exception("Не удалось получить список питомцев: %s %s" % (status, result))
+
+    def _typed_pets(self, pets: list) -> list:
+        return [Pet.from_dict(pet) for pet in pets] if self.typed else pets
+
+    def _run_bulk(self, func, items: Iterable, workers: int = None) -> BulkResult:
+        """Запускает func(item) для каждого элемента в пуле потоков и возвращает BulkResult"""
+
+        executor = ThreadPoolExecutor(max_workers=workers or self.bulk_workers)
+        futures = {executor.submit(func, item): item for item in items}
+        # Потоки завершатся сами после выполнения уже поставленных задач
+        executor.shutdown(wait=False)
+        return BulkResult(futures)
+
+    def add_new_pets(self, auth_key: json, pets: Iterable[dict], workers: int = None) -> BulkResult:
+        """Метод параллельно добавляет питомцев. Каждый элемент pets - словарь с ключами name, animal_type,
+        age и необязательным pet_photo: питомцы с фото добавляются через add_new_pet, без фото -
+        через add_new_pet_simple"""
+
+        def add(pet):
+            if pet.get('pet_photo'):
+                return self.add_new_pet(auth_key, pet['name'], pet['animal_type'], pet['age'], pet['pet_photo'])
+            return self.add_new_pet_simple(auth_key, pet['name'], pet['animal_type'], pet['age'])
+
+        return self._run_bulk(add, pets, workers)
+
+    def update_pets(self, auth_key: json, pets: Iterable[dict], workers: int = None) -> BulkResult:
+        """Метод параллельно обновляет питомцев. Каждый элемент pets - словарь с ключами id, name,
+        animal_type и age"""
+
+        def update(pet):
+            return self.update_pet(auth_key, pet['id'], pet['name'], pet['animal_type'], pet['age'])
+
+        return self._run_bulk(update, pets, workers)
+
+    def delete_pets(self, auth_key: json, pet_ids: Iterable[str], workers: int = None) -> BulkResult:
+        """Метод параллельно удаляет питомцев по списку pet_ids"""
+
+        return self._run_bulk(lambda pet_id: self.delete_pet(auth_key, pet_id), pet_ids, workers)
 
+    def delete_all_my_pets(self, auth_key: json, workers: int = None) -> BulkResult:
+        """Метод получает список собственных питомцев (без фото) и параллельно удаляет их всех"""
 
+        pet_ids = [pet['id'] for pet in self.iter_pets(auth_key, 'my_pets', photos='skip')]
+        return self.delete_pets(auth_key, pet_ids, workers)
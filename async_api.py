@@ -0,0 +1,146 @@
+import asyncio
+import json
+from typing import Awaitable, Iterable
+
+import aiohttp
+
+import settings
+
+
+class AsyncPetFriends:
+    """Асинхронный двойник api.PetFriends на aiohttp: те же семь методов и тот же
+    контракт (status, result), но все вызовы идут через один event loop"""
+
+    def __init__(self, pool_maxsize: int = 100, pool_maxsize_per_host: int = 0, keep_alive: bool = True,
+                 headers: dict = None, concurrency: int = 50):
+        self.base_url = settings.base_url
+        self.pool_maxsize = pool_maxsize
+        self.pool_maxsize_per_host = pool_maxsize_per_host
+        self.keep_alive = keep_alive
+        self.headers = headers or {}
+        self.concurrency = concurrency
+        self.session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Сессию создаём лениво, так как aiohttp требует запущенный event loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, limit_per_host=self.pool_maxsize_per_host,
+                                             force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+        return self.session
+
+    async def close(self):
+        """Закрывает сессию и все соединения пула"""
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _send(self, method: str, path: str, **kwargs):
+        """Отправляет запрос и возвращает статус и результат в формате JSON либо текст ответа"""
+
+        async with self._get_session().request(method, self.base_url + path, **kwargs) as res:
+            status = res.status
+            text = await res.text()
+        try:
+            result = json.loads(text)
+        except ValueError:
+            result = text
+        return status, result
+
+    async def run_bounded(self, aws: Iterable[Awaitable], limit: int = None) -> list:
+        """Выполняет переданные корутины в одном event loop, но не больше limit одновременно
+        (по умолчанию self.concurrency). Возвращает результаты в порядке передачи"""
+
+        semaphore = asyncio.Semaphore(limit or self.concurrency)
+
+        async def bounded(aw):
+            async with semaphore:
+                return await aw
+
+        return await asyncio.gather(*(bounded(aw) for aw in aws))
+
+    async def get_api_key(self, email: str, password: str) -> json:
+        """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате
+        JSON с уникальным ключом пользователя, найденным по указанным email и паролю"""
+
+        headers = {
+            'email': email,
+            'password': password
+        }
+
+        return await self._send('GET', '/api/key', headers=headers)
+
+    async def get_list_of_pets(self, auth_key: json, filter: str = '') -> json:
+        """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате
+        JSON со списком найденных питомцев, совпадающих с фильтром"""
+
+        headers = {'auth_key': auth_key['key']}
+        filter = {'filter': filter}
+
+        return await self._send('GET', '/api/pets', headers=headers, params=filter)
+
+    async def add_new_pet(self, auth_key: json, name: str, animal_type: str, age: str, pet_photo: str) -> json:
+        """Метод отправляет данные о новом добавляемом питомце на сервер и возвращает статус запроса и результат в формате
+        JSON с данными добавленного питомца"""
+
+        headers = {'auth_key': auth_key['key']}
+
+        with open(pet_photo, 'rb') as photo:
+            data = aiohttp.FormData()
+            data.add_field('name', name)
+            data.add_field('animal_type', animal_type)
+            data.add_field('age', age)
+            data.add_field('pet_photo', photo, filename=pet_photo, content_type='image/jpeg')
+            return await self._send('POST', '/api/pets', headers=headers, data=data)
+
+    async def delete_pet(self, auth_key: json, pet_id: str) -> json:
+        """Метод отправляет запрос на сервер на удаление питомца по pet_id и возвращает
+        статус запроса и результат в формате JSON"""
+
+        headers = {'auth_key': auth_key['key']}
+
+        return await self._send('DELETE', '/api/pets/'+pet_id, headers=headers)
+
+    async def update_pet(self, auth_key: json, pet_id: str, name: str, animal_type: str, age: str) -> json:
+        """Метод отправляет на сервер запрос на обновление/изменение данных питомца по pet_id и возвращает
+        статус запроса и результат в формате JSON"""
+
+        data = {
+            'name': name,
+            'animal_type': animal_type,
+            'age': age
+        }
+        headers = {'auth_key': auth_key['key']}
+
+        return await self._send('PUT', '/api/pets/'+pet_id, headers=headers, data=data)
+
+    async def add_new_pet_simple(self, auth_key: json, name: str, animal_type: str, age: str) -> json:
+        """Метод отправляет данные о новом добавляемом питомце без фото на сервер и возвращает статус запроса и результат в формате
+        JSON с данными добавленного питомца"""
+
+        data = {
+            'name': name,
+            'animal_type': animal_type,
+            'age': age
+        }
+        headers = {'auth_key': auth_key['key']}
+
+        return await self._send('POST', '/api/create_pet_simple', headers=headers, data=data)
+
+    async def add_photo_pet(self, auth_key: json, pet_id: str, pet_photo: str) -> json:
+        """Метод отправляет на сервер запрос на добавление фото питомца по pet_id и возвращает
+        статус запроса и результат в формате JSON"""
+
+        headers = {'auth_key': auth_key['key']}
+
+        with open(pet_photo, 'rb') as photo:
+            data = aiohttp.FormData()
+            data.add_field('pet_photo', photo, filename=pet_photo, content_type='image/jpeg')
+            return await self._send('POST', '/api/pets/set_photo/'+pet_id, headers=headers, data=data)
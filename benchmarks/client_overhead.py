@@ -0,0 +1,169 @@
+"""Микробенчмарки накладных расходов клиента PetFriends. Запросы не уходят в сеть: сессия клиента
+отправляет их в StubAdapter, который сразу возвращает заранее подготовленный ответ. Поэтому
+замеряется только работа клиента: сборка заголовков и параметров, кодирование multipart,
+разбор JSON и упаковка результата.
+
+    python -m benchmarks.client_overhead            # замер и сравнение с сохранённой базой
+    python -m benchmarks.client_overhead --save     # замер и сохранение новой базы
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import timeit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from api import PetFriends
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGES = os.path.join(ROOT, 'tests', 'images')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+AUTH_KEY = {'key': 'ea738148a1f19838e1c5d1413877f3691a3731380e733e877b0ae729'}
+
+
+def make_pets(count: int, photo_size: int = 4096) -> list:
+    photo = 'data:image/jpeg;base64,' + base64.b64encode(os.urandom(photo_size)).decode()
+    return [{'id': '%08d-0000-0000-0000-000000000000' % i, 'name': 'Пушок%d' % i, 'animal_type': 'кот',
+             'age': str(i % 20), 'created_at': '1690000000.%d' % i, 'user_id': 'user', 'pet_photo': photo}
+            for i in range(count)]
+
+
+class StubAdapter(BaseAdapter):
+    """Транспорт для requests, который не ходит в сеть и отвечает подготовленным телом. Ответ ищется
+    по ключу 'МЕТОД путь', а если такого нет - по 'МЕТОД префикс/' (для путей с id питомца)"""
+
+    def __init__(self, routes: dict):
+        super().__init__()
+        self.routes = routes
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body
+        if hasattr(body, 'read'):
+            # Вычитываем потоковое тело, как это сделал бы настоящий транспорт
+            while body.read(64 * 1024):
+                pass
+        route = request.method + ' ' + request.path_url.split('?')[0]
+        content = self.routes.get(route)
+        if content is None:
+            content = self.routes[route.rsplit('/', 1)[0] + '/']
+
+        response = Response()
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json',
+                                                'Content-Length': str(len(content))})
+        response.raw = io.BytesIO(content)
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        return response
+
+    def close(self):
+        pass
+
+
+def make_client(list_size: int, typed: bool = False) -> PetFriends:
+    pet = json.dumps(make_pets(1)[0]).encode()
+    routes = {
+        'GET /api/key': json.dumps(AUTH_KEY).encode(),
+        'GET /api/pets': json.dumps({'pets': make_pets(list_size)}).encode(),
+        'POST /api/pets': pet,
+        'PUT /api/pets/': pet,
+        'DELETE /api/pets/': b'',
+        'POST /api/create_pet_simple': pet,
+        'POST /api/pets/set_photo/': pet,
+    }
+    pf = PetFriends(typed=typed)
+    pf.base_url = 'http://petfriends.bench'
+    pf.session.mount(pf.base_url, StubAdapter(routes))
+    return pf
+
+
+def cases() -> dict:
+    """Набор замеров: имя -> функция без аргументов"""
+
+    pf = make_client(10)
+    large = make_client(1000)
+    typed = make_client(1000, typed=True)
+    jpeg = os.path.join(IMAGES, 'rab.jpeg')
+    gif = os.path.join(IMAGES, 'rab_1.gif')
+    pet_id = '00000000-0000-0000-0000-000000000000'
+
+    return {
+        'get_api_key': lambda: pf.get_api_key('email', 'password'),
+        'get_list_of_pets[10]': lambda: pf.get_list_of_pets(AUTH_KEY),
+        'get_list_of_pets[1000]': lambda: large.get_list_of_pets(AUTH_KEY),
+        'get_list_of_pets[1000,typed]': lambda: typed.get_list_of_pets(AUTH_KEY),
+        'iter_pets[1000,skip]': lambda: sum(1 for _ in large.iter_pets(AUTH_KEY, photos='skip')),
+        'add_new_pet[jpeg]': lambda: pf.add_new_pet(AUTH_KEY, 'Снежа', 'кролик', '2', jpeg),
+        'add_new_pet[gif]': lambda: pf.add_new_pet(AUTH_KEY, 'Снежа', 'кролик', '2', gif),
+        'add_photo_pet[jpeg]': lambda: pf.add_photo_pet(AUTH_KEY, pet_id, jpeg),
+        'add_new_pet_simple': lambda: pf.add_new_pet_simple(AUTH_KEY, 'Бэль', 'кролик', '4'),
+        'update_pet': lambda: pf.update_pet(AUTH_KEY, pet_id, 'Пушок', 'заяц', '3'),
+        'delete_pet': lambda: pf.delete_pet(AUTH_KEY, pet_id),
+    }
+
+
+def measure(func, repeat: int = 5, min_time: float = 0.2) -> float:
+    """Возвращает лучшее время одного вызова в микросекундах"""
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def run(names: list = None, repeat: int = 5, min_time: float = 0.2) -> dict:
+    return {name: measure(func, repeat, min_time) for name, func in cases().items() if not names or name in names}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Возвращает список замеров, которые стали медленнее базы больше чем на threshold (доля)"""
+
+    return [name for name, value in results.items()
+            if name in baseline and value > baseline[name] * (1 + threshold)]
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Микробенчмарки накладных расходов клиента PetFriends')
+    parser.add_argument('--save', action='store_true', help='сохранить результаты как новую базу')
+    parser.add_argument('--baseline', default=BASELINE, help='файл с базовыми результатами')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='допустимое замедление относительно базы, доля (по умолчанию 0.25)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='минимальное время одного повтора, с')
+    parser.add_argument('names', nargs='*', help='запустить только указанные замеры')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.repeat, args.min_time)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    for name, value in results.items():
+        base = baseline.get(name)
+        change = '' if base is None else '%+7.1f%%' % ((value / base - 1) * 100)
+        print('%-30s %12.1f us %s' % (name, value, change))
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print('База сохранена в %s' % args.baseline)
+        return 0
+
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print('Медленнее базы больше чем на %d%%: %s' % (args.threshold * 100, ', '.join(slower)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
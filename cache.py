@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ('content', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, content: bytes, etag: str, last_modified: str, expires: float):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+    def validators(self) -> dict:
+        """Заголовки условного запроса: сервер ответит 304, если данные не изменились"""
+
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """LRU кэш тел ответов со сроком жизни ttl и ограничением суммарного размера max_bytes.
+    Ключ - (api ключ, фильтр). Устаревшая запись не удаляется сразу: если у неё есть ETag или
+    Last-Modified, по ней делается условный запрос. invalidate(api ключ) сбрасывает все записи
+    ключа и увеличивает его поколение, чтобы ответ, запрошенный до изменения данных, не попал в кэш"""
+
+    def __init__(self, ttl: float = 30.0, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key: tuple):
+        """Возвращает (запись или None, поколение api ключа) - поколение передаётся в store()"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry, self._generation(key[0])
+
+    def _generation(self, auth_key: str) -> tuple:
+        return self._epoch, self._generations.get(auth_key, 0)
+
+    def store(self, key: tuple, generation: tuple, content: bytes, etag: str = None, last_modified: str = None):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            if self._generation(key[0]) != generation:
+                return
+            self._remove(key)
+            self._entries[key] = CacheEntry(content, etag, last_modified, time.monotonic() + self.ttl)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def refresh(self, key: tuple, entry: CacheEntry):
+        """Продлевает срок жизни записи после ответа 304"""
+
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry.expires = time.monotonic() + self.ttl
+
+    def invalidate(self, auth_key: str = None):
+        """Сбрасывает записи api ключа auth_key или весь кэш, если ключ не указан"""
+
+        with self._lock:
+            if auth_key is None:
+                self._epoch += 1
+                self._entries.clear()
+                self.size = 0
+                return
+            self._generations[auth_key] = self._generations.get(auth_key, 0) + 1
+            for key in [key for key in self._entries if key[0] == auth_key]:
+                self._remove(key)
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.content)
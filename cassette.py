@@ -0,0 +1,217 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import threading
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from transport import TimedHTTPAdapter
+
+RECORD, REPLAY = 'record', 'replay'
+
+# Значения, которые меняются от прогона к прогону: id питомцев (UUID) и длинные hex строки
+# (api ключи, граница multipart). При сопоставлении запросов они заменяются заглушкой
+VOLATILE = (
+    rb'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}',
+    rb'[0-9a-fA-F]{32,}',
+)
+
+# Заголовки запроса, которые участвуют в сопоставлении: от них зависит ответ на /api/key.
+# В индекс попадает только их хэш, поэтому email и пароль в кассете не хранятся
+MATCH_HEADERS = ('email', 'password')
+
+# Заголовки с api ключом. Ключ меняется от прогона к прогону, поэтому при записи каждый новый ключ
+# получает постоянную заглушку key#1, key#2... по порядку появления, а в индекс попадает только его
+# хэш. При воспроизведении ключ, которого не было при записи, остаётся самим собой и не совпадает
+# ни с одной записью
+KEY_HEADERS = ('auth_key',)
+
+# Тело ответа хранится уже раскодированным, поэтому эти заголовки при воспроизведении не нужны
+_SKIP_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+class CassetteMiss(requests.ConnectionError):
+    """В кассете нет записанного ответа на запрос"""
+
+
+class MappedBody(io.RawIOBase):
+    """Тело ответа - срез отображённого в память файла данных. read() отдаёт memoryview без
+    копирования, поэтому большие ответы при потоковом чтении не загружаются в память целиком"""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            size = len(self._view) - self._position
+        chunk = self._view[self._position:self._position + size]
+        self._position += len(chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+class CassetteAdapter(BaseAdapter):
+    """Транспорт requests, который записывает пары запрос/ответ в кассету или воспроизводит их без сети.
+    Кассета - два файла: path + '.data' с телами ответов подряд и path + '.index' с описанием
+    ответов (JSON по строке на ответ). При воспроизведении файл данных отображается в память.
+    Запрос сопоставляется по методу, пути с параметрами и общему хэшу тела, заголовков match_headers и
+    заглушки api ключа из key_headers (см. KEY_HEADERS); в пути и теле изменчивые значения по шаблонам
+    volatile (id питомцев, ключи) заменяются заглушкой.
+    Если один и тот же запрос записан несколько раз, ответы воспроизводятся по очереди, а после
+    последнего повторяется последний. Запрос, которого нет в кассете, вызывает CassetteMiss.
+    mode='record' перезаписывает кассету, отправляя запросы через adapter (по умолчанию
+    transport.TimedHTTPAdapter)"""
+
+    def __init__(self, path: str, mode: str = REPLAY, adapter: BaseAdapter = None, volatile: tuple = VOLATILE,
+                 match_headers: tuple = MATCH_HEADERS, key_headers: tuple = KEY_HEADERS):
+        super().__init__()
+        if mode not in (RECORD, REPLAY):
+            raise ValueError("mode может быть 'record' или 'replay'")
+        self.path = path
+        self.mode = mode
+        self.match_headers = tuple(name.lower() for name in match_headers)
+        self.key_headers = tuple(name.lower() for name in key_headers)
+        self._volatile = [re.compile(pattern) for pattern in volatile]
+        self._lock = threading.Lock()
+        # SHA-1 api ключа -> его заглушка
+        self._aliases = {}
+
+        if mode == RECORD:
+            self.adapter = adapter or TimedHTTPAdapter()
+            self._data = open(path + '.data', 'wb')
+            self._index = open(path + '.index', 'w', encoding='utf-8')
+            return
+
+        self.adapter = None
+        self._entries = {}
+        self._cursors = {}
+        with open(path + '.index', encoding='utf-8') as index:
+            for line in index:
+                entry = json.loads(line)
+                if 'alias' in entry:
+                    self._aliases[entry['token']] = entry['alias']
+                    continue
+                self._entries.setdefault(tuple(entry['key']), []).append(entry)
+        with open(path + '.data', 'rb') as data:
+            size = os.fstat(data.fileno()).st_size
+            self._map = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def _normalize(self, data: bytes) -> bytes:
+        for pattern in self._volatile:
+            data = pattern.sub(b'*', data)
+        return data
+
+    def _key(self, request: requests.PreparedRequest) -> tuple:
+        path = request.path_url.encode()
+        body = request.body
+        if hasattr(body, 'read'):
+            body.seek(0)
+            content = body.read()
+            body.seek(0)
+        elif isinstance(body, str):
+            content = body.encode()
+        else:
+            content = bytes(body or b'')
+        digest = hashlib.sha1(self._normalize(content))
+        for name in self.match_headers:
+            value = request.headers.get(name, '')
+            digest.update(b'\0' + _encode(value))
+        for name in self.key_headers:
+            value = request.headers.get(name)
+            digest.update(b'\0' + (b'' if value is None else self._alias(_encode(value)).encode()))
+        return request.method, self._normalize(path).decode(), digest.hexdigest()
+
+    def _alias(self, key: bytes) -> str:
+        """Заглушка api ключа. При записи новый ключ получает следующую заглушку, при
+        воспроизведении незнакомый ключ сопоставляется по своему хэшу"""
+
+        token = hashlib.sha1(key).hexdigest()
+        with self._lock:
+            alias = self._aliases.get(token)
+            if alias is None:
+                if self.mode != RECORD:
+                    return token
+                alias = self._aliases[token] = 'key#%d' % (len(self._aliases) + 1)
+                self._index.write(json.dumps({'alias': alias, 'token': token}) + '\n')
+                self._index.flush()
+        return alias
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None) -> requests.Response:
+        key = self._key(request)
+        if self.mode == RECORD:
+            return self._record(key, request, stream, timeout, verify, cert, proxies)
+
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss('В кассете %s нет ответа на %s %s' % (self.path, request.method, request.path_url),
+                                   request=request)
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = min(position + 1, len(entries) - 1)
+            entry = entries[position]
+
+        view = memoryview(self._map)[entry['offset']:entry['offset'] + entry['length']] if entry['length'] \
+            else memoryview(b'')
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.headers['Content-Length'] = str(entry['length'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = MappedBody(view)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def _record(self, key: tuple, request, stream, timeout, verify, cert, proxies) -> requests.Response:
+        response = self.adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                     proxies=proxies)
+        content = response.content
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in _SKIP_HEADERS}
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(content)
+            self._data.flush()
+            self._index.write(json.dumps({
+                'key': key, 'status': response.status_code, 'reason': response.reason, 'headers': headers,
+                'offset': offset, 'length': len(content),
+            }, ensure_ascii=False) + '\n')
+            self._index.flush()
+        return response
+
+    def close(self):
+        if self.mode == RECORD:
+            self.adapter.close()
+            self._data.close()
+            self._index.close()
+        elif self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Ответ ещё читается - mmap закроется сборщиком мусора
+                pass
+
+
+def _encode(value) -> bytes:
+    return value if isinstance(value, bytes) else value.encode()
@@ -0,0 +1,107 @@
+import json
+import re
+import time
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него используется стандартный json
+    orjson = None
+
+DECODERS = {'json': json.loads}
+if orjson is not None:
+    DECODERS['orjson'] = orjson.loads
+
+# Начало JSON объекта или массива: только такие тела откладываются до первого обращения
+_LAZY_START = re.compile(rb'\s*[\[{]')
+
+
+def get_decoder(decoder=None):
+    """Возвращает функцию разбора JSON: None - самая быстрая из установленных (orjson, иначе json),
+    'json' или 'orjson' - по имени, либо переданную функцию bytes -> объект"""
+
+    if decoder is None:
+        return DECODERS.get('orjson', json.loads)
+    if callable(decoder):
+        return decoder
+    if decoder not in DECODERS:
+        raise ValueError('Декодер %r недоступен, установлены: %s' % (decoder, ', '.join(DECODERS)))
+    return DECODERS[decoder]
+
+
+class LazyJSON(Mapping):
+    """Ответ JSON, который разбирается при первом обращении к данным. До этого хранятся только
+    исходные байты (raw). После разбора decode_time - время разбора в секундах.
+    Ведёт себя как словарь для чтения (result['pets'], 'key' in result, len, items и т.д.),
+    а если ответ оказался массивом - как список. Если тело всё же не JSON, значением становится
+    текст ответа, как и без ленивого разбора"""
+
+    __slots__ = ('raw', 'decode_time', '_decoder', '_encoding', '_value')
+
+    _EMPTY = object()
+
+    def __init__(self, raw: bytes, decoder=json.loads, encoding: str = None):
+        self.raw = raw
+        self.decode_time = None
+        self._decoder = decoder
+        self._encoding = encoding
+        self._value = self._EMPTY
+
+    @property
+    def value(self):
+        if self._value is self._EMPTY:
+            started = time.perf_counter()
+            try:
+                self._value = self._decoder(self.raw)
+            except ValueError:
+                self._value = self.raw.decode(self._encoding or 'utf-8', errors='replace')
+            self.decode_time = time.perf_counter() - started
+        return self._value
+
+    @property
+    def decoded(self) -> bool:
+        return self._value is not self._EMPTY
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __contains__(self, key):
+        return key in self.value
+
+    def __eq__(self, other):
+        return self.value == (other.value if isinstance(other, LazyJSON) else other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self.decoded:
+            return 'LazyJSON(%r)' % (self._value,)
+        return 'LazyJSON(<%d bytes>)' % len(self.raw)
+
+
+def resolve(result):
+    """Возвращает разобранное значение для LazyJSON и сам результат для всего остального"""
+
+    return result.value if isinstance(result, LazyJSON) else result
+
+
+def decode_body(content: bytes, content_type: str, decoder, lazy: bool = False, encoding: str = None):
+    """Общий разбор тела ответа для всех методов клиента: JSON (сразу или лениво) или, если тело не
+    JSON, текст. Лениво разбираются только тела, которые начинаются как объект или массив JSON,
+    поэтому HTML страница ошибки с Content-Type JSON сразу возвращается текстом.
+    Возвращает (результат, время разбора в секундах)"""
+
+    started = time.perf_counter()
+    if lazy and 'json' in (content_type or '') and _LAZY_START.match(content):
+        return LazyJSON(content, decoder, encoding), 0.0
+    try:
+        result = decoder(content)
+    except ValueError:
+        result = content.decode(encoding or 'utf-8', errors='replace')
+    return result, time.perf_counter() - started
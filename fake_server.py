@@ -0,0 +1,517 @@
+import argparse
+import base64
+import email.parser
+import email.policy
+import email.utils
+import hashlib
+import io
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import settings
+from accounts import credentials
+
+# Сигнатуры форматов, которые сервер принимает как фото питомца
+PHOTO_FORMATS = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+}
+
+
+class FakeStore:
+    """Состояние локального двойника PetFriends: пользователи, выданные ключи и питомцы.
+    Каждому пользователю и демо-пользователю заранее создаётся по seed питомцев"""
+
+    def __init__(self, users: dict = None, seed: int = 3):
+        self.lock = threading.Lock()
+        self.users = dict(users or {})
+        self.keys = {}
+        self.pets = {}
+        # время последнего изменения питомцев для заголовка Last-Modified
+        self.changed = time.time()
+        if seed:
+            self.users.setdefault('demo@petfriends.local', 'demo')
+            for user in self.users:
+                for i in range(seed):
+                    self.add_pet(user, 'Демо%d' % i, 'кот', str(i + 1))
+
+    def issue_key(self, email: str, password: str):
+        with self.lock:
+            if not email or self.users.get(email) != password:
+                return None
+            key = uuid.uuid4().hex + uuid.uuid4().hex
+            self.keys[key] = email
+            return key
+
+    def user(self, key: str):
+        return self.keys.get(key)
+
+    def add_pet(self, user: str, name: str, animal_type: str, age: str, pet_photo: str = '') -> dict:
+        pet = {
+            'id': str(uuid.uuid4()),
+            'name': name,
+            'animal_type': animal_type,
+            'age': age,
+            'pet_photo': pet_photo,
+            'created_at': '%.6f' % time.time(),
+            'user_id': user,
+        }
+        with self.lock:
+            self.pets[pet['id']] = pet
+            self.changed = time.time()
+        return pet
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к двойнику. Коды ответов повторяют документацию API: 403 - неверные
+    email/пароль или ключ, 400 - некорректные данные, 500 - неподдерживаемый фильтр или формат фото"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakePetFriends/1.0'
+
+    def setup(self):
+        super().setup()
+        # Заголовки и тело ответа уходят отдельными записями. Без TCP_NODELAY на keep-alive
+        # соединении тело ждёт ACK на заголовки (алгоритм Нейгла и отложенный ACK), и каждый ответ
+        # задерживается примерно на 40 мс
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self) -> FakeStore:
+        return self.server.store
+
+    def _reply(self, status: int, body=None):
+        data = b'' if body is None else json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reply_conditional(self, body, changed: float):
+        """Ответ с ETag и Last-Modified; если данные клиента не изменились (If-None-Match, а без
+        него If-Modified-Since), отвечает 304 без тела"""
+
+        data = json.dumps(body, ensure_ascii=False).encode()
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()
+        not_modified = False
+        if self.headers.get('If-None-Match') is not None:
+            not_modified = etag in [tag.strip() for tag in self.headers['If-None-Match'].split(',')]
+        elif self.headers.get('If-Modified-Since') is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(self.headers['If-Modified-Since']).timestamp()
+                not_modified = int(changed) <= since
+            except (TypeError, ValueError):
+                pass
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(changed, usegmt=True))
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str):
+        data = message.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _faulty(self) -> bool:
+        """Применяет внедрённую через FakePetFriendsServer.inject неисправность: задержку и/или
+        ответ с заданным статусом. Возвращает True, если ответ уже отправлен"""
+
+        fault = self.server.take_fault(self.command, urlsplit(self.path).path)
+        if fault is None:
+            return False
+        delay, status = fault
+        if delay:
+            time.sleep(delay)
+        if status is None:
+            return False
+        self._body()
+        self._error(status, 'Injected fault')
+        return True
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _form(self):
+        """Разбирает тело запроса. Возвращает текстовые поля и файлы (имя поля -> bytes)"""
+
+        body = self._body()
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+            fields, files = {}, {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                payload = part.get_payload(decode=True) or b''
+                if part.get_filename() is not None:
+                    files[name] = payload
+                else:
+                    fields[name] = payload.decode()
+            return fields, files
+        fields = {name: values[0] for name, values in parse_qs(body.decode(), keep_blank_values=True).items()}
+        return fields, {}
+
+    def _user(self):
+        user = self.store.user(self.headers.get('auth_key'))
+        if user is None:
+            self._body()
+            self._error(403, 'Please provide &#x27;auth_key&#x27; Header')
+        return user
+
+    def _pet_id(self, prefix: str) -> str:
+        return urlsplit(self.path).path[len(prefix):]
+
+    def do_GET(self):
+        if self._faulty():
+            return
+        url = urlsplit(self.path)
+        if url.path == '/api/key':
+            key = self.store.issue_key(self.headers.get('email'), self.headers.get('password'))
+            if key is None:
+                return self._error(403, "This user wasn&#x27;t found in database")
+            return self._reply(200, {'key': key})
+
+        if url.path == '/api/pets':
+            user = self._user()
+            if user is None:
+                return
+            filter = parse_qs(url.query, keep_blank_values=True).get('filter', [''])[0]
+            with self.store.lock:
+                pets = list(self.store.pets.values())
+                changed = self.store.changed
+            if filter == 'my_pets':
+                pets = [pet for pet in pets if pet['user_id'] == user]
+            elif filter:
+                return self._error(500, 'Filter value is incorrect')
+            return self._reply_conditional({'pets': pets}, changed)
+
+        self._error(404, 'Not Found')
+
+    def do_POST(self):
+        if self._faulty():
+            return
+        path = urlsplit(self.path).path
+        if path not in ('/api/pets', '/api/create_pet_simple') and not path.startswith('/api/pets/set_photo/'):
+            self._body()
+            return self._error(404, 'Not Found')
+        user = self._user()
+        if user is None:
+            return
+        fields, files = self._form()
+
+        if path.startswith('/api/pets/set_photo/'):
+            pet = self.store.pets.get(self._pet_id('/api/pets/set_photo/'))
+            if pet is None or pet['user_id'] != user:
+                return self._error(400, 'Provided data is incorrect')
+            photo = _photo(files.get('pet_photo'))
+            if photo is None:
+                return self._error(500, 'Unsupported photo format')
+            with self.store.lock:
+                pet['pet_photo'] = photo
+                self.store.changed = time.time()
+            return self._reply(200, pet)
+
+        if not _valid_pet(fields):
+            return self._error(400, 'Provided data is incorrect')
+        photo = ''
+        if path == '/api/pets':
+            photo = _photo(files.get('pet_photo'))
+            if photo is None:
+                return self._error(400, 'Provided data is incorrect')
+        pet = self.store.add_pet(user, fields['name'], fields['animal_type'], fields['age'], photo)
+        self._reply(200, pet)
+
+    def do_PUT(self):
+        if self._faulty():
+            return
+        if not urlsplit(self.path).path.startswith('/api/pets/'):
+            self._body()
+            return self._error(404, 'Not Found')
+        user = self._user()
+        if user is None:
+            return
+        fields, _ = self._form()
+        pet = self.store.pets.get(self._pet_id('/api/pets/'))
+        if pet is None or pet['user_id'] != user or not _valid_pet(fields, partial=True):
+            return self._error(400, 'Provided data is incorrect')
+        with self.store.lock:
+            pet.update({name: value for name, value in fields.items()
+                        if name in ('name', 'animal_type', 'age') and value})
+            self.store.changed = time.time()
+        self._reply(200, pet)
+
+    def do_DELETE(self):
+        if self._faulty():
+            return
+        if not urlsplit(self.path).path.startswith('/api/pets/'):
+            return self._error(404, 'Not Found')
+        user = self._user()
+        if user is None:
+            return
+        pet_id = self._pet_id('/api/pets/')
+        with self.store.lock:
+            pet = self.store.pets.get(pet_id)
+            if pet is not None and pet['user_id'] == user:
+                del self.store.pets[pet_id]
+                self.store.changed = time.time()
+        self._reply(200)
+
+
+def _valid_pet(fields: dict, partial: bool = False) -> bool:
+    """Проверяет имя, вид и возраст: строки от 1 до 255 символов, возраст - целое число от 0 до 100"""
+
+    for name in ('name', 'animal_type', 'age'):
+        value = fields.get(name, '')
+        if partial and not value:
+            continue
+        if not value or len(value) > 255:
+            return False
+    age = fields.get('age', '')
+    return (partial and not age) or (age.isdigit() and int(age) <= 100)
+
+
+def _photo(data: bytes):
+    """Возвращает фото в виде data URI или None, если формат не поддерживается"""
+
+    for signature, content_type in PHOTO_FORMATS.items():
+        if data and data.startswith(signature):
+            return 'data:%s;base64,%s' % (content_type, base64.b64encode(data).decode())
+    return None
+
+
+class FakePetFriendsServer(ThreadingHTTPServer):
+    """Локальный двойник API PetFriends в отдельном потоке. По умолчанию знает пользователя из
+    settings (valid_email/valid_password). Используется как контекстный менеджер:
+
+        with FakePetFriendsServer() as server:
+            pf.base_url = server.url
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+    handler = FakeHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, users: dict = None, seed: int = 3):
+        super().__init__((host, port), self.handler)
+        if users is None:
+            users = {settings.valid_email: settings.valid_password, **dict(credentials())}
+        self.store = FakeStore(users, seed)
+        self.url = 'http://%s:%d' % self.server_address[:2]
+        self._thread = None
+        self._faults = []
+
+    def inject(self, method: str = None, path: str = None, delay: float = 0.0, status: int = None,
+               times: int = 1):
+        """Внедряет неисправность для следующих times запросов (None - для всех), подходящих под
+        method и префикс пути path: задержку ответа на delay секунд и/или ответ со статусом status"""
+
+        with self.store.lock:
+            self._faults.append([method, path, delay, status, times])
+
+    def take_fault(self, method: str, path: str):
+        with self.store.lock:
+            for fault in self._faults:
+                if fault[0] in (None, method) and (fault[1] is None or path.startswith(fault[1])):
+                    if fault[4] is not None:
+                        fault[4] -= 1
+                        if fault[4] <= 0:
+                            self._faults.remove(fault)
+                    return fault[2], fault[3]
+        return None
+
+    def handle_error(self, request, client_address):
+        # Клиент может закрыть соединение, не дождавшись ответа (таймаут, дублирующий запрос)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> 'FakePetFriendsServer':
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class _Exchange:
+    """Имитация сокета для FakeHandler: запрос читается из буфера, ответ копится в output"""
+
+    def __init__(self, data: bytes):
+        self._input = io.BytesIO(data)
+        self.output = bytearray()
+
+    def makefile(self, mode: str, *args, **kwargs):
+        return self._input
+
+    def sendall(self, data: bytes):
+        self.output += data
+
+    def setsockopt(self, *args):
+        pass
+
+
+class H2Handler(socketserver.BaseRequestHandler):
+    """Соединение HTTP/2 без TLS (h2c, prior knowledge). Каждый поток (stream) обрабатывается в
+    отдельном потоке выполнения тем же FakeHandler, что и HTTP/1.1, поэтому запросы одного
+    соединения выполняются параллельно. Ответы отправляются с учётом окна управления потоком"""
+
+    def handle(self):
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.exceptions
+
+        self.server.connections += 1
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        self.condition = threading.Condition()
+        self.closed = False
+        streams = {}
+        with self.condition:
+            self.conn.initiate_connection()
+            self._flush()
+
+        try:
+            while not self.closed:
+                data = self.request.recv(65536)
+                if not data:
+                    break
+                with self.condition:
+                    try:
+                        events = self.conn.receive_data(data)
+                    except h2.exceptions.ProtocolError:
+                        self._flush()
+                        break
+                    for event in events:
+                        if isinstance(event, h2.events.RequestReceived):
+                            streams[event.stream_id] = (event.headers, bytearray())
+                        elif isinstance(event, h2.events.DataReceived):
+                            streams[event.stream_id][1].extend(event.data)
+                            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            headers, body = streams.pop(event.stream_id)
+                            threading.Thread(target=self._respond, args=(event.stream_id, headers, bytes(body)),
+                                             daemon=True).start()
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            self.closed = True
+                    self._flush()
+                    self.condition.notify_all()
+        except OSError:
+            pass
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+
+    def _flush(self):
+        data = self.conn.data_to_send()
+        if data:
+            self.request.sendall(data)
+
+    def _respond(self, stream_id: int, headers: list, body: bytes):
+        import h2.exceptions
+
+        with self.server.lock:
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            status, response_headers, data = self.server.dispatch(headers, body, self.client_address)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+        try:
+            with self.condition:
+                self.conn.send_headers(stream_id, [(':status', str(status))] + response_headers,
+                                       end_stream=not data)
+                self._flush()
+            while data:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.closed or self.conn.local_flow_control_window(stream_id) > 0)
+                    if self.closed:
+                        return
+                    size = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                    chunk, data = data[:size], data[size:]
+                    self.conn.send_data(stream_id, chunk, end_stream=not data)
+                    self._flush()
+        except (h2.exceptions.ProtocolError, OSError):
+            # Клиент закрыл поток или соединение, пока запрос обрабатывался
+            pass
+
+
+class FakeH2Server(FakePetFriendsServer):
+    """Двойник PetFriends, который говорит HTTP/2 без TLS (h2c). Логика ответов та же, что у
+    FakePetFriendsServer. connections - число принятых TCP соединений, max_active - наибольшее число
+    одновременно обрабатываемых запросов. Требует библиотеку h2"""
+
+    handler = H2Handler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, users: dict = None, seed: int = 3):
+        super().__init__(host, port, users, seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+
+    def dispatch(self, headers: list, body: bytes, client_address):
+        """Выполняет запрос HTTP/2 через FakeHandler. Возвращает статус, заголовки и тело ответа"""
+
+        pseudo = {name: value for name, value in headers if name.startswith(':')}
+        lines = ['%s %s HTTP/1.1' % (pseudo[':method'], pseudo[':path']), 'Host: %s' % pseudo.get(':authority', '')]
+        lines += ['%s: %s' % (name, value) for name, value in headers if not name.startswith(':')]
+        if body and not any(name == 'content-length' for name, _ in headers):
+            lines.append('Content-Length: %d' % len(body))
+        exchange = _Exchange(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        FakeHandler(exchange, client_address, self)
+
+        head, _, data = bytes(exchange.output).partition(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        response_headers = []
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            if name.lower() not in ('connection', 'keep-alive', 'transfer-encoding'):
+                response_headers.append((name.lower(), value.strip()))
+        return int(status_line.split()[1]), response_headers, data
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Локальный двойник API PetFriends')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--http2', action='store_true', help='HTTP/2 без TLS (h2c) вместо HTTP/1.1')
+    args = parser.parse_args()
+
+    server = (FakeH2Server if args.http2 else FakePetFriendsServer)(args.host, args.port)
+    print('Fake PetFriends: %s' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,235 @@
+import asyncio
+import io
+import os
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import (DEFAULT_CA_BUNDLE_PATH, extract_zipped_paths, get_encoding_from_headers,
+                            select_proxy)
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 транспорт необязателен
+    httpx = None
+
+# Тело ответа отдаётся уже раскодированным, поэтому заголовки сжатия и передачи не нужны
+_SKIP_HEADERS = ('content-encoding', 'transfer-encoding')
+CHUNK_SIZE = 64 * 1024
+
+
+class HTTPXBody(io.RawIOBase):
+    """Поток тела ответа httpx в виде, который понимает requests (read кусками). Куски читаются
+    в цикле событий адаптера"""
+
+    def __init__(self, adapter: 'HTTP2Adapter', response):
+        super().__init__()
+        self._adapter = adapter
+        self._response = response
+        self._chunks = response.aiter_bytes()
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def _next(self):
+        try:
+            return self._adapter._call(anext(self._chunks, None))
+        except httpx.TransportError as e:
+            raise _translate(e, None)
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            chunks = [self._buffer]
+            while True:
+                chunk = self._next()
+                if chunk is None:
+                    break
+                chunks.append(chunk)
+            self._buffer = b''
+            return b''.join(chunks)
+        while len(self._buffer) < size:
+            chunk = self._next()
+            if chunk is None:
+                break
+            self._buffer += chunk
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        if not self.closed and self._adapter._loop.is_running():
+            self._adapter._call(self._response.aclose())
+        super().close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Транспорт requests поверх httpx с HTTP/2: одновременные запросы из разных потоков идут
+    параллельными потоками (streams) одного соединения вместо пула HTTP/1.1 соединений.
+    Для https версия выбирается через ALPN, и если сервер не умеет HTTP/2, httpx сам переходит на
+    HTTP/1.1. Для http без TLS (h2c) по умолчанию сразу говорим HTTP/2 (prior knowledge); если сервер
+    ответил не по HTTP/2, адрес запоминается и запросы к нему идут через HTTP/1.1.
+    Синхронное HTTP/2 соединение httpx нельзя использовать из нескольких потоков одновременно, поэтому
+    запросы выполняет httpx.AsyncClient в собственном цикле событий адаптера, а вызывающие потоки
+    ждут результат. Параметры запроса verify, cert и proxies учитываются так же, как в
+    HTTPAdapter: на каждое их сочетание заводится свой клиент со своими соединениями; через прокси
+    http запросы идут по HTTP/1.1. Ошибки httpx переводятся в исключения requests.
+    max_connections - ограничение соединений каждого клиента.
+    Требует httpx с поддержкой HTTP/2: pip install httpx[http2]"""
+
+    def __init__(self, max_connections: int = 10, h2c: bool = True):
+        if httpx is None:
+            raise RuntimeError('Для HTTP/2 нужен httpx: pip install httpx[http2]')
+        super().__init__()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='http2-adapter', daemon=True)
+        self._thread.start()
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.h2c = h2c
+        # (h2c, verify, cert, proxy) -> httpx.AsyncClient
+        self._clients = {}
+        # http://host:port -> True (HTTP/2 работает) или False (только HTTP/1.1)
+        self._origins = {}
+        self._lock = threading.Lock()
+
+    def _call(self, coroutine):
+        """Выполняет корутину в цикле событий адаптера и возвращает её результат"""
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _client(self, h2c: bool, verify, cert, proxy):
+        """Клиент httpx для сочетания параметров запроса; создаётся при первом обращении"""
+
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        key = (h2c, verify, cert, proxy)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = httpx.AsyncClient(
+                    http1=not h2c, http2=True, limits=self._limits, verify=_ssl_context(verify, cert),
+                    proxy=proxy, trust_env=False)
+            return self._clients[key]
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None) -> requests.Response:
+        url = urlsplit(request.url)
+        origin = '%s://%s' % (url.scheme, url.netloc)
+        proxy = select_proxy(request.url, proxies)
+        h2c = url.scheme == 'http' and self.h2c and proxy is None and self._origins.get(origin) is not False
+
+        try:
+            try:
+                response = self._send(self._client(h2c, verify, cert, proxy), request, timeout)
+            except httpx.RemoteProtocolError:
+                # Сервер не понял HTTP/2 без TLS - переключаем адрес на HTTP/1.1 и повторяем запрос
+                if not h2c or self._origins.get(origin):
+                    raise
+                with self._lock:
+                    self._origins[origin] = False
+                h2c = False
+                response = self._send(self._client(False, verify, cert, proxy), request, timeout)
+        except httpx.TransportError as e:
+            raise _translate(e, request)
+        if h2c:
+            self._origins.setdefault(origin, True)
+        return self._build(request, response)
+
+    def _send(self, client, request: requests.PreparedRequest, timeout):
+        body = request.body
+        if hasattr(body, 'read'):
+            body.seek(0)
+            body = _chunks(body)
+        elif isinstance(body, str):
+            body = body.encode()
+        headers = [(name, value) for name, value in request.headers.items() if name.lower() != 'connection']
+        built = client.build_request(request.method, request.url, headers=headers, content=body,
+                                     timeout=_timeout(timeout))
+        return self._call(client.send(built, stream=True))
+
+    def _build(self, request: requests.PreparedRequest, response) -> requests.Response:
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        skip = _SKIP_HEADERS + ('content-length',) if 'content-encoding' in response.headers else _SKIP_HEADERS
+        result.headers = CaseInsensitiveDict(
+            (name, value) for name, value in response.headers.items() if name.lower() not in skip)
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.raw = HTTPXBody(self, response)
+        result.url = request.url
+        result.request = request
+        result.connection = self
+        result.http_version = response.http_version
+        return result
+
+    def close(self):
+        if not self._loop.is_running():
+            return
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            self._call(client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+async def _chunks(stream):
+    """Файловое тело запроса (например, uploads.MultipartBody) кусками; чтение идёт в пуле потоков,
+    чтобы не останавливать цикл событий"""
+
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, stream.read, CHUNK_SIZE)
+        if not chunk:
+            break
+        yield bytes(chunk)
+
+
+def _ssl_context(verify, cert) -> ssl.SSLContext:
+    """SSL контекст по параметрам verify и cert в формате requests"""
+
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    else:
+        path = verify if isinstance(verify, str) else extract_zipped_paths(DEFAULT_CA_BUNDLE_PATH)
+        if os.path.isdir(path):
+            context = ssl.create_default_context(capath=path)
+        else:
+            context = ssl.create_default_context(cafile=path)
+    if cert:
+        certfile, keyfile = cert if isinstance(cert, tuple) else (cert, None)
+        context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def _translate(error, request: requests.PreparedRequest) -> requests.RequestException:
+    """Ошибка httpx -> исключение requests, которое ожидают вызывающие (повторы в api.PetFriends)"""
+
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.ConnectTimeout(error, request=request)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.ReadTimeout(error, request=request)
+    if isinstance(error, httpx.ProxyError):
+        return requests.exceptions.ProxyError(error, request=request)
+    return requests.ConnectionError(error, request=request)
+
+
+def _timeout(timeout):
+    """Таймаут в формате requests (число или пара connect, read) -> httpx.Timeout"""
+
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
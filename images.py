@@ -0,0 +1,163 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow нужен только для уменьшения и пережатия фото
+    Image = None
+
+JPEG, PNG = 'image/jpeg', 'image/png'
+
+# Сигнатуры форматов изображений (первые байты файла)
+SIGNATURES = (
+    (b'\xff\xd8\xff', JPEG),
+    (b'\x89PNG\r\n\x1a\n', PNG),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+EXTENSIONS = {JPEG: '.jpg', PNG: '.png'}
+
+# Сколько первых байтов нужно sniff
+HEADER_SIZE = 12
+
+
+class ImageError(ValueError):
+    """Фото не прошло локальную проверку формата"""
+
+
+def sniff(data) -> str:
+    """Определяет формат изображения по содержимому, а не по расширению файла. Возвращает MIME тип
+    или None, если формат не распознан"""
+
+    head = bytes(data[:HEADER_SIZE])
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+class ImagePreprocessor:
+    """Подготовка фото питомца перед отправкой. Определяет настоящий формат по содержимому и, если
+    задано, уменьшает фото до max_size пикселей по длинной стороне и пережимает JPEG с качеством
+    quality. Форматы, которые сервер не принимает (не из accept), в strict режиме отклоняются сразу
+    с ImageError, без запроса к серверу, а в обычном - конвертируются в JPEG, если задана обработка,
+    иначе отправляются как есть.
+    cache_dir - каталог, где результаты обработки хранятся по SHA-256 исходного содержимого и
+    настроек, поэтому повторная загрузка того же фото не обрабатывает его заново.
+    Уменьшение и пережатие требуют Pillow"""
+
+    def __init__(self, max_size: int = None, quality: int = None, strict: bool = False, cache_dir: str = None,
+                 accept: tuple = (JPEG, PNG)):
+        self.max_size = max_size
+        self.quality = quality
+        self.strict = strict
+        self.accept = accept
+        self.cache_dir = cache_dir
+        if self.processing and Image is None:
+            raise RuntimeError('Для max_size и quality нужен Pillow: pip install pillow')
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        # (путь, размер, mtime) -> результат, чтобы не хэшировать неизменённый файл повторно
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    @property
+    def processing(self) -> bool:
+        return self.max_size is not None or self.quality is not None
+
+    def prepare(self, pet_photo):
+        """Возвращает (фото, MIME тип) для отправки. Фото - путь к файлу (исходному или из cache_dir)
+        либо bytes. pet_photo - путь к файлу, bytes, memoryview или файловый объект"""
+
+        key = None
+        if not isinstance(pet_photo, (bytes, bytearray, memoryview)) and not hasattr(pet_photo, 'read'):
+            path = os.path.abspath(os.fspath(pet_photo))
+            stat = os.stat(path)
+            key = (path, stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                cached = self._paths.get(key)
+            if cached is not None:
+                return cached
+            with open(path, 'rb') as file:
+                # Без обработки содержимое нужно только для sniff, весь файл читать незачем
+                data = file.read() if self.processing else file.read(HEADER_SIZE)
+            source = path
+        elif hasattr(pet_photo, 'read'):
+            data = source = pet_photo.read()
+        else:
+            data = source = bytes(pet_photo)
+
+        result = self._prepare(data, source)
+        if key is not None and isinstance(result[0], str):
+            with self._lock:
+                self._paths[key] = result
+        return result
+
+    def _prepare(self, data: bytes, source):
+        content_type = sniff(data)
+        if content_type not in self.accept:
+            if self.strict:
+                raise ImageError('Неподдерживаемый формат фото: %s, ожидается %s'
+                                 % (content_type or 'не изображение', ', '.join(self.accept)))
+            if content_type is None or not self.processing:
+                return source, content_type or JPEG
+        elif not self.processing:
+            return source, content_type
+
+        digest = hashlib.sha256(data)
+        digest.update(('|%s|%s' % (self.max_size, self.quality)).encode())
+        target = PNG if content_type == PNG else JPEG
+        cached = None
+        if self.cache_dir is not None:
+            cached = os.path.join(self.cache_dir, digest.hexdigest() + EXTENSIONS[target])
+            if os.path.exists(cached):
+                return cached, target
+
+        output = self._convert(data, target)
+        if content_type == target and len(output) >= len(data) and not self._too_big(data):
+            # Пережатие не уменьшило файл - отправляем исходный
+            output = data
+        if cached is None:
+            return output, target
+        _write_atomic(cached, output)
+        return cached, target
+
+    def _too_big(self, data: bytes) -> bool:
+        if self.max_size is None:
+            return False
+        with Image.open(io.BytesIO(data)) as image:
+            return max(image.size) > self.max_size
+
+    def _convert(self, data: bytes, target: str) -> bytes:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if self.max_size is not None:
+                image.thumbnail((self.max_size, self.max_size))
+            buffer = io.BytesIO()
+            if target == PNG:
+                image.save(buffer, 'PNG', optimize=True)
+            else:
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                image.save(buffer, 'JPEG', quality=self.quality or 85, optimize=True)
+        return buffer.getvalue()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Запись через временный файл и переименование: параллельные процессы не увидят недописанный файл"""
+
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
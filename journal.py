@@ -0,0 +1,134 @@
+import glob
+import json
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: журнал работает, но без защиты от одновременной уборки
+    fcntl = None
+
+# Статусы удаления, после которых питомца больше нет на сервере
+REMOVED = (200, 404)
+
+
+class PetJournal:
+    """Журнал питомцев, созданных клиентом PetFriends (параметр journal): id питомца, api ключ,
+    которым он создан, и email владельца, если он известен. Удалённые через delete_pet питомцы
+    из журнала вычёркиваются, оставшиеся удаляет cleanup.
+    Если указан path, каждое изменение сразу дописывается в файл (JSON по строке), поэтому после
+    аварийного завершения прогона питомцев можно найти и удалить при следующем запуске (см. stale).
+    Пока журнал открыт, файл заблокирован через fcntl.flock, и другие процессы его не трогают"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        # id -> (api ключ, email)
+        self._pets = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if path is None:
+            return
+
+        self._file = open(path, 'a+', encoding='utf-8')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._file.close()
+                raise RuntimeError('Журнал %s уже открыт другим процессом' % path)
+        self._file.seek(0)
+        for line in self._file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Строка, которую не успели дописать при аварийном завершении
+                continue
+            if 'add' in entry:
+                self._pets[entry['add']] = (entry['key'], entry.get('email'))
+            else:
+                self._pets.pop(entry['remove'], None)
+
+    @classmethod
+    def stale(cls, directory: str) -> list:
+        """Открывает журналы *.jsonl в directory, которые не заблокированы живыми процессами, то есть
+        остались от завершившихся прогонов"""
+
+        journals = []
+        for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))):
+            try:
+                journals.append(cls(path))
+            except (RuntimeError, OSError):
+                continue
+        return journals
+
+    @classmethod
+    def create(cls, directory: str) -> 'PetJournal':
+        """Новый журнал со случайным именем в directory. Файл получает имя *.jsonl только после
+        блокировки, чтобы stale в другом процессе не принял его за брошенный"""
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, '%d-%s.jsonl' % (os.getpid(), uuid.uuid4().hex[:8]))
+        journal = cls(path + '.new')
+        os.replace(journal.path, path)
+        journal.path = path
+        return journal
+
+    def _write(self, entry: dict):
+        if self._file is not None:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def __len__(self):
+        return len(self._pets)
+
+    def add(self, auth_key: dict, pet_id: str, email: str = None):
+        with self._lock:
+            self._pets[pet_id] = (auth_key['key'], email)
+            self._write({'add': pet_id, 'key': auth_key['key'], 'email': email})
+
+    def remove(self, pet_id: str):
+        with self._lock:
+            if self._pets.pop(pet_id, None) is not None:
+                self._write({'remove': pet_id})
+
+    def pending(self) -> dict:
+        """api ключ -> список id питомцев, которые ещё не удалены"""
+
+        result = {}
+        with self._lock:
+            for pet_id, (key, _) in self._pets.items():
+                result.setdefault(key, []).append(pet_id)
+        return result
+
+    def cleanup(self, pf, keys: dict = None, workers: int = None) -> list:
+        """Параллельно удаляет через pf.delete_pet всех питомцев из журнала. keys - email -> api ключ
+        для питомцев, чей ключ из журнала мог устареть (например, после прошлого прогона).
+        Возвращает тройки (id, статус, результат) для питомцев, которых удалить не удалось"""
+
+        with self._lock:
+            pets = dict(self._pets)
+        by_key = {}
+        for pet_id, (key, email) in pets.items():
+            key = (keys or {}).get(email, {'key': key})['key']
+            by_key.setdefault(key, []).append(pet_id)
+
+        failed = []
+        for key, pet_ids in by_key.items():
+            for pet_id, status, result in pf.delete_pets({'key': key}, pet_ids, workers).wait():
+                if status in REMOVED:
+                    self.remove(pet_id)
+                else:
+                    failed.append((pet_id, status, result))
+        return failed
+
+    def close(self):
+        """Закрывает файл журнала; пустой журнал удаляется"""
+
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.close()
+            self._file = None
+            if not self._pets:
+                os.unlink(self.path)
@@ -0,0 +1,151 @@
+import math
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: общий между процессами лимит недоступен
+    fcntl = None
+
+AIMD, GRADIENT = 'aimd', 'gradient'
+
+
+class AdaptiveLimiter:
+    """Ограничивает число одновременных запросов и подстраивает лимит по задержке и ошибкам.
+    'aimd' - лимит растёт на 1 за каждые limit успешных ответов и умножается на decrease при
+    перегрузке (5xx, 429 или таймаут чтения ответа). 'gradient' - лимит следует за отношением
+    минимальной задержки к текущей: пока задержка не выросла больше чем в tolerance раз, лимит
+    растёт на sqrt(limit), иначе уменьшается пропорционально росту задержки.
+    Один лимитер можно передать в несколько клиентов PetFriends, чтобы они делили общий лимит"""
+
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 200, algorithm: str = AIMD,
+                 decrease: float = 0.5, tolerance: float = 2.0, smoothing: float = 0.2):
+        if algorithm not in (AIMD, GRADIENT):
+            raise ValueError("algorithm может быть 'aimd' или 'gradient'")
+        self.algorithm = algorithm
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._min_latency = None
+        self._latency = None
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Ждёт свободного места не дольше timeout секунд. Возвращает False, если не дождался"""
+
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, overloaded: bool = False):
+        """Освобождает место и учитывает результат запроса: его задержку и признак перегрузки"""
+
+        with self._condition:
+            self.in_flight -= 1
+            if self.algorithm == AIMD:
+                self._aimd(overloaded)
+            else:
+                self._gradient(latency, overloaded)
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Освобождает место, не учитывая результат: запрос так и не был отправлен"""
+
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _aimd(self, overloaded: bool):
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _gradient(self, latency: float, overloaded: bool):
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+            return
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.smoothing * (latency - self._latency)
+        gradient = min(1.0, self.tolerance * self._min_latency / max(self._latency, 1e-9))
+        limit = self.limit * gradient + (math.sqrt(self.limit) if gradient >= 1.0 else 0.0)
+        # Сглаживаем изменение, чтобы один медленный ответ не обрушил лимит
+        self.limit = min(self.max_limit, max(self.min_limit,
+                                             self.limit + self.smoothing * (limit - self.limit)))
+
+
+class TokenBucket:
+    """Ограничение частоты запросов: rate запросов в секунду с запасом burst. Общий для всех
+    потоков, которые его используют. Если указан path, состояние хранится в файле под блокировкой
+    fcntl.flock, и лимит делят все процессы на машине, открывшие тот же файл"""
+
+    _STATE = struct.Struct('dd')
+
+    def __init__(self, rate: float, burst: float = None, path: str = None):
+        if rate <= 0:
+            raise ValueError('rate должен быть больше 0')
+        self.rate = rate
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        if path is not None and fcntl is None:
+            raise RuntimeError('Общий между процессами TokenBucket требует fcntl (Linux, macOS)')
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Забирает tokens жетонов, ожидая их не дольше timeout секунд. Возвращает False,
+        если жетонов не хватит до истечения timeout"""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._take_shared(tokens) if self.path is not None else self._take(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def _take(self, tokens: float) -> float:
+        now = time.monotonic()
+        self._tokens, wait = self._refill(self._tokens, now - self._updated, tokens)
+        self._updated = now
+        return wait
+
+    def _take_shared(self, tokens: float) -> float:
+        # time.time(), а не monotonic: отсчёт monotonic у разных процессов может не совпадать
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            now = time.time()
+            data = os.pread(fd, self._STATE.size, 0)
+            if len(data) == self._STATE.size:
+                available, updated = self._STATE.unpack(data)
+            else:
+                available, updated = self.burst, now
+            available, wait = self._refill(available, max(0.0, now - updated), tokens)
+            os.pwrite(fd, self._STATE.pack(available, now), 0)
+            return wait
+        finally:
+            os.close(fd)
+
+    def _refill(self, available: float, elapsed: float, tokens: float):
+        """Возвращает новый запас жетонов и время ожидания (0, если жетоны забраны)"""
+
+        available = min(self.burst, available + elapsed * self.rate)
+        if available >= tokens:
+            return available - tokens, 0.0
+        return available, (tokens - available) / self.rate
@@ -0,0 +1,270 @@
+"""Генератор нагрузки на API PetFriends. N виртуальных пользователей параллельно выполняют
+взвешенную смесь операций клиента PetFriends в течение заданного времени или до заданного числа
+запросов. По каждой операции считаются пропускная способность, ошибки и перцентили задержки
+(metrics.Histogram), отчёт печатается текстом и при необходимости сохраняется в JSON.
+
+    python -m load --users 20 --duration 60
+    python -m load --users 8 --requests 5000 --mix list_all=5,update=2,delete=1 --json report.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from accounts import AccountPool, credentials, parse_accounts
+from api import PetFriends
+from metrics import QUANTILES, Histogram
+
+PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'images', 'rab.jpeg')
+
+# Смесь операций по умолчанию: имя -> вес
+MIX = {
+    'key': 1,
+    'list_all': 10,
+    'list_my': 10,
+    'create_photo': 2,
+    'create_simple': 4,
+    'update': 4,
+    'set_photo': 2,
+    'delete': 4,
+}
+
+
+class VirtualUser:
+    """Виртуальный пользователь: свой api ключ, свои питомцы и свой генератор случайных чисел.
+    Операции, которым нужен питомец (update, set_photo, delete), при пустом списке питомцев
+    заменяются на create_simple"""
+
+    def __init__(self, pf: PetFriends, number: int, email: str, password: str, photo: str, seed: int = None):
+        self.pf = pf
+        self.number = number
+        self.email = email
+        self.password = password
+        self.photo = photo
+        self.random = random.Random(None if seed is None else seed + number)
+        self.key = None
+        self.pets = []
+        self._names = itertools.count()
+
+    def _name(self) -> str:
+        return 'load-%d-%d' % (self.number, next(self._names))
+
+    def _created(self, status: int, result) -> int:
+        if status == 200:
+            self.pets.append(result['id'])
+        return status
+
+    def _pet(self) -> str:
+        return self.random.choice(self.pets)
+
+    def login(self) -> int:
+        status, result = self.pf.get_api_key(self.email, self.password)
+        if status == 200:
+            self.key = result
+        return status
+
+    def run(self, operation: str) -> (str, int):
+        """Выполняет операцию и возвращает (фактически выполненная операция, статус)"""
+
+        if operation in ('update', 'set_photo', 'delete') and not self.pets:
+            operation = 'create_simple'
+        pf = self.pf
+        if operation == 'key':
+            return operation, self.login()
+        if operation == 'list_all':
+            return operation, pf.get_list_of_pets(self.key)[0]
+        if operation == 'list_my':
+            return operation, pf.get_list_of_pets(self.key, 'my_pets')[0]
+        if operation == 'create_photo':
+            return operation, self._created(*pf.add_new_pet(self.key, self._name(), 'кот', '3', self.photo))
+        if operation == 'create_simple':
+            return operation, self._created(*pf.add_new_pet_simple(self.key, self._name(), 'кот', '3'))
+        if operation == 'update':
+            return operation, pf.update_pet(self.key, self._pet(), self._name(), 'кот', '4')[0]
+        if operation == 'set_photo':
+            return operation, pf.add_photo_pet(self.key, self._pet(), self.photo)[0]
+        if operation == 'delete':
+            pet_id = self.pets.pop(self.random.randrange(len(self.pets)))
+            return operation, pf.delete_pet(self.key, pet_id)[0]
+        raise ValueError('Неизвестная операция: %s' % operation)
+
+
+class OperationStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, seconds: float, status):
+        self.latency.record(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status != 200:
+            self.errors += 1
+
+    def merge(self, other: 'OperationStats'):
+        self.latency.merge(other.latency)
+        self.errors += other.errors
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+def parse_mix(text: str) -> dict:
+    """'list_all=5,update=2' -> {'list_all': 5.0, 'update': 2.0}. Операции не из MIX - ошибка"""
+
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in MIX:
+            raise ValueError('Неизвестная операция %r, доступны: %s' % (name, ', '.join(MIX)))
+        mix[name] = float(weight or 1)
+    if not mix or not any(weight > 0 for weight in mix.values()):
+        raise ValueError('В смеси нет ни одной операции с положительным весом')
+    return mix
+
+
+def run(pf: PetFriends, users: int = 10, duration: float = None, requests: int = None, mix: dict = None,
+        email: str = None, password: str = None, photo: str = PHOTO, seed: int = None,
+        cleanup: bool = True, accounts: list = None) -> dict:
+    """Запускает нагрузку и возвращает отчёт. Останавливается через duration секунд или после
+    requests операций (что наступит раньше); без обоих ограничений - через 10 секунд.
+    Виртуальные пользователи по очереди распределяются между учётными записями accounts (пары
+    email, пароль); по умолчанию - email и password или пул учётных записей из настроек.
+    cleanup=True удаляет питомцев, оставшихся у виртуальных пользователей после прогона"""
+
+    mix = mix or MIX
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    if duration is None and requests is None:
+        duration = 10.0
+
+    pool = AccountPool(pf, accounts or ([(email, password)] if email else credentials()))
+    virtual = []
+    for number in range(users):
+        account = pool.next()
+        user = VirtualUser(pf, number, account.email, account.password, photo, seed)
+        user.key = pool.key(account)
+        virtual.append(user)
+
+    issued = itertools.count()
+    stop = threading.Event()
+    results = [{} for _ in virtual]
+
+    def work(user: VirtualUser, stats: dict):
+        while not stop.is_set():
+            if requests is not None and next(issued) >= requests:
+                break
+            operation = user.random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                operation, status = user.run(operation)
+            except Exception as e:
+                status = type(e).__name__
+            stats.setdefault(operation, OperationStats()).record(time.perf_counter() - started, status)
+
+    threads = [threading.Thread(target=work, args=(user, stats), daemon=True)
+               for user, stats in zip(virtual, results)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(None if duration is None else max(0.0, started + duration - time.perf_counter()))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if cleanup:
+        for user in virtual:
+            pf.delete_pets(user.key, user.pets).wait()
+
+    operations = {}
+    for stats in results:
+        for operation, item in stats.items():
+            operations.setdefault(operation, OperationStats()).merge(item)
+    result = report(operations, elapsed, users)
+    result['accounts'] = len(pool)
+    return result
+
+
+def report(operations: dict, elapsed: float, users: int) -> dict:
+    total = OperationStats()
+    result = {'users': users, 'duration': elapsed, 'operations': {}}
+    for name in sorted(operations):
+        stats = operations[name]
+        total.merge(stats)
+        result['operations'][name] = _summary(stats, elapsed)
+    result['total'] = _summary(total, elapsed)
+    return result
+
+
+def _summary(stats: OperationStats, elapsed: float) -> dict:
+    summary = stats.latency.summary()
+    summary['errors'] = stats.errors
+    summary['throughput'] = summary['count'] / elapsed if elapsed else 0.0
+    summary['statuses'] = {str(status): count for status, count in sorted(stats.statuses.items(), key=str)}
+    return summary
+
+
+def format_report(result: dict) -> str:
+    columns = ['p%g' % (q * 100) for q in QUANTILES]
+    lines = ['%d пользователей, %.1f с' % (result['users'], result['duration']),
+             '%-14s %8s %7s %9s %9s ' % ('операция', 'запросов', 'ошибок', 'в секунду', 'среднее')
+             + ' '.join('%9s' % column for column in columns) + ' %9s' % 'max']
+    rows = list(result['operations'].items()) + [('всего', result['total'])]
+    for name, summary in rows:
+        lines.append('%-14s %8d %7d %9.1f %7.1fms ' % (name, summary['count'], summary['errors'],
+                                                       summary['throughput'], summary['mean'] * 1000)
+                     + ' '.join('%7.1fms' % (summary[column] * 1000) for column in columns)
+                     + ' %7.1fms' % (summary['max'] * 1000))
+    return '\n'.join(lines)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Генератор нагрузки на API PetFriends')
+    parser.add_argument('--users', type=int, default=10, help='число виртуальных пользователей')
+    parser.add_argument('--duration', type=float, help='длительность прогона, с')
+    parser.add_argument('--requests', type=int, help='общее число операций')
+    parser.add_argument('--mix', help='веса операций, например list_all=5,update=2 (доступны: %s)' % ', '.join(MIX))
+    parser.add_argument('--base-url', help='адрес API (по умолчанию base_url из настроек)')
+    parser.add_argument('--email', help='по умолчанию учётные записи из настроек (accounts.py)')
+    parser.add_argument('--password')
+    parser.add_argument('--accounts-file', help='файл с учётными записями email:пароль по строке')
+    parser.add_argument('--photo', default=PHOTO, help='фото для create_photo и set_photo')
+    parser.add_argument('--seed', type=int, help='зерно генератора случайных чисел для воспроизводимой смеси')
+    parser.add_argument('--timeout', type=float, default=30.0, help='срок на одну операцию, с')
+    parser.add_argument('--no-cleanup', action='store_true', help='не удалять созданных питомцев после прогона')
+    parser.add_argument('--json', help='сохранить отчёт в JSON файл (- - вывести JSON вместо текста)')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix) if args.mix else None
+        accounts = None
+        if args.accounts_file:
+            with open(args.accounts_file, encoding='utf-8') as file:
+                accounts = parse_accounts(file.read())
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    with PetFriends(pool_maxsize=max(10, args.users), bulk_workers=max(8, args.users), timeout=args.timeout) as pf:
+        if args.base_url:
+            pf.base_url = args.base_url
+        result = run(pf, args.users, args.duration, args.requests, mix, args.email, args.password, args.photo,
+                     args.seed, not args.no_cleanup, accounts)
+
+    if args.json == '-':
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    print(format_report(result))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
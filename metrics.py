@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+from collections import Counter
+
+# Точность гистограммы: 2**SUB_BITS делений на каждую степень двойки (ошибка меньше 1%)
+SUB_BITS = 7
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class Histogram:
+    """Гистограмма задержек в стиле HdrHistogram: значения в микросекундах раскладываются по
+    логарифмически-линейным корзинам, поэтому перцентили считаются с относительной ошибкой меньше 1%
+    при любом разбросе значений, а память зависит от разброса, а не от числа замеров"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1e6))
+        index = _index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: 'Histogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Возвращает значение (в секундах), ниже которого лежит доля q замеров"""
+
+        if not self.count:
+            return 0.0
+        rank = max(1, q * self.count)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_upper(index) / 1e6, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def summary(self) -> dict:
+        result = {'count': self.count, 'mean': self.mean(), 'min': self.min or 0.0, 'max': self.max or 0.0}
+        for q in QUANTILES:
+            result['p%g' % (q * 100)] = self.percentile(q)
+        return result
+
+
+def _index(value: int) -> int:
+    if value < (1 << SUB_BITS):
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return ((shift + 1) << SUB_BITS) + (value >> shift) - (1 << SUB_BITS)
+
+
+def _upper(index: int) -> int:
+    if index < (1 << SUB_BITS):
+        return index
+    shift = (index >> SUB_BITS) - 1
+    mantissa = (index & ((1 << SUB_BITS) - 1)) + (1 << SUB_BITS)
+    return ((mantissa + 1) << shift) - 1
+
+
+class RollingHistogram:
+    """Гистограмма за последние window секунд: время разбито на slots отрезков, устаревшие отрезки
+    отбрасываются при записи"""
+
+    def __init__(self, window: float = 60.0, slots: int = 6):
+        self.slot = window / slots
+        self.slots = slots
+        self._ring = [(None, Histogram()) for _ in range(slots)]
+
+    def _current(self, now: float) -> Histogram:
+        number = int(now // self.slot)
+        position = number % self.slots
+        started, histogram = self._ring[position]
+        if started != number:
+            histogram = Histogram()
+            self._ring[position] = (number, histogram)
+        return histogram
+
+    def record(self, seconds: float, now: float = None):
+        self._current(time.monotonic() if now is None else now).record(seconds)
+
+    def snapshot(self, now: float = None) -> Histogram:
+        number = int((time.monotonic() if now is None else now) // self.slot)
+        result = Histogram()
+        for started, histogram in self._ring:
+            if started is not None and number - started < self.slots:
+                result.merge(histogram)
+        return result
+
+
+class RequestInfo:
+    """Сведения об одном HTTP вызове, которые получают хуки before_request и after_request.
+    timings - словарь с ключами dns, connect, tls, decode и total (секунды); dns, connect и tls равны 0,
+    если запрос ушёл по уже открытому соединению из пула или был продублирован (hedged), decode -
+    время разбора тела ответа (0, если тело не разбиралось или разбирается лениво)"""
+
+    __slots__ = ('method', 'endpoint', 'url', 'status', 'bytes_sent', 'bytes_received', 'timings',
+                 'retries', 'hedged', 'error')
+
+    def __init__(self, method: str, endpoint: str, url: str):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timings = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0, 'decode': 0.0, 'total': 0.0}
+        self.retries = 0
+        self.hedged = False
+        self.error = None
+
+    def __repr__(self):
+        return 'RequestInfo(%s %s status=%s total=%.4f)' % (self.method, self.endpoint, self.status,
+                                                            self.timings['total'])
+
+
+class EndpointStats:
+    def __init__(self, window: float, slots: int):
+        self.latency = RollingHistogram(window, slots)
+        self.statuses = Counter()
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_time = 0.0
+        self.decode_time = 0.0
+
+
+class Metrics:
+    """Метрики клиента по эндпоинтам ('GET /api/pets'): скользящая гистограмма задержек,
+    счётчики статусов, ошибок, повторов и переданных байт. Экспорт в JSON и текстовый формат
+    Prometheus (задержки - как summary с квантилями за скользящее окно)"""
+
+    def __init__(self, window: float = 60.0, slots: int = 6):
+        self.window = window
+        self.slots = slots
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, info: RequestInfo):
+        key = (info.method, info.endpoint)
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats(self.window, self.slots)
+            stats.count += 1
+            stats.retries += info.retries
+            stats.bytes_sent += info.bytes_sent
+            stats.bytes_received += info.bytes_received
+            stats.total_time += info.timings['total']
+            stats.decode_time += info.timings['decode']
+            if info.error is not None:
+                stats.errors += 1
+            else:
+                stats.statuses[info.status] += 1
+            stats.latency.record(info.timings['total'])
+
+    def latency(self, method: str, endpoint: str) -> Histogram:
+        """Гистограмма задержек эндпоинта за скользящее окно"""
+
+        with self._lock:
+            stats = self._endpoints.get((method, endpoint))
+            return stats.latency.snapshot() if stats is not None else Histogram()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                '%s %s' % key: {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'retries': stats.retries,
+                    'statuses': {str(status): count for status, count in stats.statuses.items()},
+                    'bytes_sent': stats.bytes_sent,
+                    'bytes_received': stats.bytes_received,
+                    'decode_time': stats.decode_time,
+                    'latency': stats.latency.snapshot().summary(),
+                }
+                for key, stats in self._endpoints.items()
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_prometheus(self, prefix: str = 'petfriends') -> str:
+        lines = [
+            '# HELP %s_request_duration_seconds Request latency over the last %g seconds' % (prefix, self.window),
+            '# TYPE %s_request_duration_seconds summary' % prefix,
+        ]
+        counters = {
+            'requests_total': [], 'request_errors_total': [], 'request_retries_total': [],
+            'request_bytes_total': [], 'response_bytes_total': [], 'response_decode_seconds_total': [],
+        }
+        with self._lock:
+            for (method, endpoint), stats in sorted(self._endpoints.items()):
+                labels = 'method="%s",endpoint="%s"' % (method, endpoint)
+                snapshot = stats.latency.snapshot()
+                for q in QUANTILES:
+                    lines.append('%s_request_duration_seconds{%s,quantile="%g"} %.6f'
+                                 % (prefix, labels, q, snapshot.percentile(q)))
+                lines.append('%s_request_duration_seconds_sum{%s} %.6f' % (prefix, labels, stats.total_time))
+                lines.append('%s_request_duration_seconds_count{%s} %d' % (prefix, labels, stats.count))
+                for status, count in sorted(stats.statuses.items()):
+                    counters['requests_total'].append('{%s,status="%s"} %d' % (labels, status, count))
+                counters['request_errors_total'].append('{%s} %d' % (labels, stats.errors))
+                counters['request_retries_total'].append('{%s} %d' % (labels, stats.retries))
+                counters['request_bytes_total'].append('{%s} %d' % (labels, stats.bytes_sent))
+                counters['response_bytes_total'].append('{%s} %d' % (labels, stats.bytes_received))
+                counters['response_decode_seconds_total'].append('{%s} %.6f' % (labels, stats.decode_time))
+
+        for name, samples in counters.items():
+            lines.append('# TYPE %s_%s counter' % (prefix, name))
+            lines.extend('%s_%s%s' % (prefix, name, sample) for sample in samples)
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+class PetsMirror:
+    """Локальная копия списка собственных питомцев (filter='my_pets') для каждого api ключа.
+    Загружается целиком один раз, дальше обновляется ответами на добавление, изменение,
+    смену фото и удаление питомца. Питомцы индексируются по id и по имени.
+    ttl - через сколько секунд после загрузки копия считается устаревшей; None - не устаревает,
+    пока её не сбросят через invalidate()"""
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # ключ -> (время загрузки, {id: питомец}, {имя: {id: None}})
+        self._mirrors = {}
+
+    def load(self, key: str, pets: list):
+        by_id, by_name = {}, {}
+        for pet in pets:
+            by_id[pet['id']] = pet
+            by_name.setdefault(pet['name'], {})[pet['id']] = None
+        with self._lock:
+            self._mirrors[key] = (time.monotonic(), by_id, by_name)
+
+    def is_fresh(self, key: str) -> bool:
+        with self._lock:
+            mirror = self._mirrors.get(key)
+        return mirror is not None and (self.ttl is None or time.monotonic() - mirror[0] < self.ttl)
+
+    def invalidate(self, key: str = None):
+        """Сбрасывает копию для ключа key или все копии, если key не указан"""
+
+        with self._lock:
+            if key is None:
+                self._mirrors.clear()
+            else:
+                self._mirrors.pop(key, None)
+
+    def put(self, key: str, pet: dict):
+        """Добавляет питомца или заменяет его данные. Если копия для ключа не загружена, ничего не делает"""
+
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            if mirror is None:
+                return
+            _, by_id, by_name = mirror
+            old = by_id.get(pet['id'])
+            if old is not None and old['name'] != pet['name']:
+                self._unindex(by_name, old)
+            by_id[pet['id']] = pet
+            by_name.setdefault(pet['name'], {})[pet['id']] = None
+
+    def remove(self, key: str, pet_id: str):
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            if mirror is None:
+                return
+            _, by_id, by_name = mirror
+            pet = by_id.pop(pet_id, None)
+            if pet is not None:
+                self._unindex(by_name, pet)
+
+    @staticmethod
+    def _unindex(by_name: dict, pet: dict):
+        ids = by_name.get(pet['name'])
+        if ids is not None:
+            ids.pop(pet['id'], None)
+            if not ids:
+                del by_name[pet['name']]
+
+    def pets(self, key: str) -> list:
+        """Копии всех питомцев в порядке добавления или None, если копия не загружена"""
+
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            return None if mirror is None else [dict(pet) for pet in mirror[1].values()]
+
+    def get(self, key: str, pet_id: str):
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            pet = None if mirror is None else mirror[1].get(pet_id)
+            return None if pet is None else dict(pet)
+
+    def find(self, key: str, name: str) -> list:
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            if mirror is None:
+                return []
+            _, by_id, by_name = mirror
+            return [dict(by_id[pet_id]) for pet_id in by_name.get(name, ())]
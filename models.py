@@ -0,0 +1,53 @@
+import base64
+import sys
+
+
+class Pet:
+    """Компактное представление питомца из ответа API. Хранит поля в __slots__ вместо словаря,
+    повторяющиеся строки (вид животного, id пользователя) интернируются. Фото хранится в том виде,
+    в каком пришло (data URI), и декодируется из base64 в bytes только при обращении к photo"""
+
+    __slots__ = ('id', 'name', 'animal_type', 'age', 'created_at', 'user_id', 'pet_photo')
+
+    def __init__(self, id: str, name: str, animal_type: str, age: str, created_at: str = None,
+                 user_id: str = None, pet_photo=''):
+        self.id = id
+        self.name = name
+        self.animal_type = sys.intern(animal_type) if isinstance(animal_type, str) else animal_type
+        self.age = age
+        self.created_at = created_at
+        self.user_id = sys.intern(user_id) if isinstance(user_id, str) else user_id
+        self.pet_photo = pet_photo
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Pet':
+        return cls(data.get('id'), data.get('name'), data.get('animal_type'), data.get('age'),
+                   data.get('created_at'), data.get('user_id'), data.get('pet_photo', ''))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def photo(self) -> bytes:
+        """Фото питомца в виде bytes; пустые bytes, если фото нет"""
+
+        photo = self.pet_photo
+        if not photo:
+            return b''
+        if isinstance(photo, str):
+            photo = photo.encode('ascii')
+        return base64.b64decode(photo[photo.find(b',') + 1:])
+
+    def __getitem__(self, name: str):
+        # Совместимость с кодом, который работает с питомцем как со словарём: pet['id']
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __eq__(self, other):
+        if not isinstance(other, Pet):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return 'Pet(id=%r, name=%r, animal_type=%r, age=%r)' % (self.id, self.name, self.animal_type, self.age)
@@ -6,9 +6,21 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Адрес API. use_fake_server=1 запускает тесты против локального двойника fake_server.py
+base_url = os.getenv('base_url', 'https://petfriends.skillfactory.ru')
+use_fake_server = os.getenv('use_fake_server', '').lower() in ('1', 'true', 'yes')
+# Кассета с записанными ответами (cassette.py): cassette_mode=record записывает прогон, replay - воспроизводит
+cassette = os.getenv('cassette')
+cassette_mode = os.getenv('cassette_mode', 'replay')
 
 valid_email = os.getenv('valid_email')
 valid_password = os.getenv('valid_password')
+# Пул учётных записей (accounts.py): файл с парами email:пароль по строке или они же через запятую
+accounts_file = os.getenv('accounts_file')
+accounts = os.getenv('accounts')
+# Каталог журналов созданных тестами питомцев (journal.py): оставшихся после прогона удаляет следующий
+journal_dir = os.getenv('journal_dir',
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pytest_cache', 'pets'))
 
 invalid_email = os.getenv('invalid_email')
 invalid_password = os.getenv('invalid_password')
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import settings
+from accounts import AccountPool, credentials
+from api import PetFriends
+from cassette import VOLATILE, CassetteAdapter
+from journal import PetJournal
+from fake_server import FakePetFriendsServer
+
+
+def pytest_configure(config):
+    """При use_fake_server=1 весь прогон идёт против локального двойника вместо живого сервера"""
+
+    # Маркер регистрирует pytest-xdist; без него тесты с маркером выполняются как обычно
+    config.addinivalue_line('markers', 'xdist_group(name): тесты группы выполняются одним воркером xdist')
+    if settings.use_fake_server:
+        config._fake_server = FakePetFriendsServer().start()
+        settings.base_url = config._fake_server.url
+
+
+def pytest_unconfigure(config):
+    server = getattr(config, '_fake_server', None)
+    if server is not None:
+        server.stop()
+
+
+@pytest.fixture(scope='session')
+def pf():
+    """Общий клиент на весь прогон. При запуске через pytest -n у каждого воркера свой процесс,
+    а значит и свой клиент со своим пулом соединений. Против живого сервера созданные клиентом
+    питомцы записываются в журнал (journal.PetJournal) и удаляются в конце прогона"""
+
+    transport = None
+    if settings.cassette:
+        # Имена питомцев из my_pet случайные, поэтому тоже считаются изменчивыми
+        transport = CassetteAdapter(settings.cassette, settings.cassette_mode,
+                                    volatile=VOLATILE + (rb'pytest-\w+-[0-9a-f]{8}',))
+    # Против двойника и при воспроизведении кассеты питомцы не настоящие, журнал не нужен
+    tracked = not settings.use_fake_server and not (settings.cassette and settings.cassette_mode != 'record')
+    with PetFriends(key_ttl=600, transport=transport) as client:
+        if tracked:
+            _remove_stale_pets(client)
+            client.journal = PetJournal.create(settings.journal_dir)
+        yield client
+        if tracked:
+            client.journal.cleanup(client)
+            client.journal.close()
+
+
+def _remove_stale_pets(client: PetFriends):
+    """Удаляет питомцев из журналов прогонов, которые завершились аварийно и не убрали за собой"""
+
+    stale = PetJournal.stale(settings.journal_dir)
+    if not stale:
+        return
+    keys = {}
+    for email, password in credentials():
+        status, key = client.get_api_key(email, password)
+        if status == 200:
+            keys[email] = key
+    for journal in stale:
+        journal.cleanup(client, keys)
+        journal.close()
+
+
+@pytest.fixture(scope='session')
+def accounts(pf):
+    """Пул учётных записей из настроек (accounts_file или accounts, по умолчанию одна valid_email)"""
+
+    return AccountPool.from_settings(pf)
+
+
+@pytest.fixture(scope='session')
+def auth_key(accounts):
+    """Ключ учётной записи воркера: при нескольких записях в пуле воркеры pytest-xdist создают
+    питомцев каждый в своей записи, и списки my_pets не растут в одной общей"""
+
+    worker = os.environ.get('PYTEST_XDIST_WORKER', 'gw0')
+    return accounts.key(accounts.shard(int(worker[2:]) if worker[2:].isdigit() else 0))
+
+
+@pytest.fixture
+def my_pet(pf, auth_key):
+    """Отдельный питомец для теста: создаётся перед тестом и удаляется после него. Тесты, которые
+    меняют или удаляют питомца, работают каждый со своим и не мешают друг другу в разных воркерах"""
+
+    name = 'pytest-%s-%s' % (os.environ.get('PYTEST_XDIST_WORKER', 'main'), uuid.uuid4().hex[:8])
+    status, pet = pf.add_new_pet_simple(auth_key, name, 'кот', '1')
+    assert status == 200
+    yield pet
+    pf.delete_pet(auth_key, pet['id'])
+
+
+@pytest.fixture
+def fake_server():
+    """Отдельный чистый двойник PetFriends для теста"""
+
+    with FakePetFriendsServer() as server:
+        yield server
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Минимальная заглушка API PetFriends: отвечает фиксированным JSON и считает
+    новые TCP соединения, чтобы тесты могли проверить переиспользование пула"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path, dict(self.headers)))
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.active -= 1
+        length = int(self.headers.get('Content-Length') or 0)
+        self.server.bodies.append(self.rfile.read(length) if length else b'')
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if self.headers.get('auth_key') in self.server.revoked:
+            self._reply(403, {})
+            return False
+        if self.path in self.server.fail_paths:
+            self._reply(500, {})
+            return False
+        return True
+
+    def do_GET(self):
+        if self.path.startswith('/api/key'):
+            with self.server.lock:
+                self.server.keys_issued += 1
+                key = 'stub-key-%d' % self.server.keys_issued
+            self._reply(200, {'key': key})
+        elif self._authorized():
+            pets = self.server.pets
+            self._reply(200, pets if isinstance(pets, bytes) else {'pets': pets})
+
+    def do_POST(self):
+        if self._authorized():
+            self._reply(200, {'id': 'stub-id', 'name': 'stub'})
+
+    do_PUT = do_POST
+
+    def do_DELETE(self):
+        if self._authorized():
+            self._reply(200, {})
+
+
+@pytest.fixture
+def stub_server():
+    """Запускает заглушку на свободном локальном порту и возвращает её адрес"""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.requests = []
+    server.bodies = []
+    server.lock = threading.Lock()
+    server.delay = 0
+    server.active = 0
+    server.max_active = 0
+    server.keys_issued = 0
+    server.revoked = set()
+    server.fail_paths = set()
+    server.pets = []
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    server.url = 'http://127.0.0.1:%d' % server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,110 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import load
+import settings
+from accounts import LEAST_LOADED, AccountPool, credentials, parse_accounts
+from api import PetFriends
+from fake_server import FakePetFriendsServer
+
+USERS = {'user%d@petfriends.local' % i: 'secret%d' % i for i in range(3)}
+
+
+@pytest.fixture
+def server():
+    with FakePetFriendsServer(users=USERS, seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def pf(server):
+    with PetFriends() as client:
+        client.base_url = server.url
+        yield client
+
+
+def test_parse_accounts():
+    text = '# учётные записи\na@x.ru:1\n\nb@x.ru 2\n'
+    assert parse_accounts(text) == [('a@x.ru', '1'), ('b@x.ru', '2')]
+    assert parse_accounts('a@x.ru:p,1\nb@x.ru:p:2') == [('a@x.ru', 'p,1'), ('b@x.ru', 'p:2')]
+    with pytest.raises(ValueError):
+        parse_accounts('a@x.ru')
+
+
+def test_credentials_from_settings(tmp_path, monkeypatch):
+    """Проверяет, что через запятую разбирается только переменная accounts, а в файле запятая
+    остаётся частью пароля"""
+
+    monkeypatch.setattr(settings, 'accounts_file', None)
+    monkeypatch.setattr(settings, 'accounts', 'a@x.ru:1, b@x.ru:p:2')
+    assert credentials() == [('a@x.ru', '1'), ('b@x.ru', 'p:2')]
+
+    path = tmp_path / 'accounts.txt'
+    path.write_text('a@x.ru:p,1\n', encoding='utf-8')
+    monkeypatch.setattr(settings, 'accounts_file', str(path))
+    assert credentials() == [('a@x.ru', 'p,1')]
+
+
+def test_round_robin_spreads_pets(server, pf, tmp_path):
+    """Проверяет, что питомцы распределяются по записям поровну, а ключ каждой записи
+    запрашивается один раз"""
+
+    path = tmp_path / 'accounts.txt'
+    path.write_text('\n'.join('%s:%s' % item for item in USERS.items()), encoding='utf-8')
+    pool = AccountPool.from_file(pf, str(path))
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lambda i: pool.run(pf.add_new_pet_simple, 'Пушок%d' % i, 'кот', '1'), range(9)))
+    assert {status for status, _ in results} == {200}
+
+    sizes = [len(pf.get_list_of_pets(pool.key(account), 'my_pets')[1]['pets']) for account in pool.accounts]
+    assert sizes == [3, 3, 3]
+    assert len({pool.key(account)['key'] for account in pool.accounts}) == 3
+
+
+def test_least_loaded_avoids_busy_account(pf):
+    pool = AccountPool(pf, USERS.items(), strategy=LEAST_LOADED)
+    release = threading.Event()
+    leased = threading.Event()
+
+    def hold():
+        with pool.lease() as (account, _):
+            leased.set()
+            release.wait(5)
+        return account
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        busy = executor.submit(hold)
+        leased.wait(5)
+        chosen = [pool.next() for _ in range(4)]
+        release.set()
+        busy = busy.result()
+
+    assert busy not in chosen
+    assert busy.active == 0
+
+
+def test_key_failure_and_invalidate(pf):
+    pool = AccountPool(pf, [('nobody@petfriends.local', 'wrong')])
+    with pytest.raises(RuntimeError):
+        pool.key(pool.accounts[0])
+
+    pool = AccountPool(pf, USERS.items())
+    account = pool.shard(4)
+    assert account is pool.accounts[1]
+    key = pool.key(account)
+    assert pool.key(account) is key
+    pool.invalidate(account)
+    assert pool.key(account) is not key
+
+
+def test_load_shards_users_between_accounts(pf):
+    result = load.run(pf, users=6, requests=60, mix={'create_simple': 1, 'list_my': 1}, seed=2,
+                      accounts=list(USERS.items()), cleanup=False)
+
+    assert result['accounts'] == 3 and result['total']['errors'] == 0
+    pool = AccountPool(pf, USERS.items())
+    sizes = [len(pf.get_list_of_pets(pool.key(account), 'my_pets')[1]['pets']) for account in pool.accounts]
+    assert all(sizes) and sum(sizes) == result['operations']['create_simple']['count']
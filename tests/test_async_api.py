@@ -0,0 +1,56 @@
+import asyncio
+import os.path
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from async_api import AsyncPetFriends
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_async_methods_return_status_and_result(stub_server):
+    """Проверяет, что асинхронные методы возвращают ту же пару (status, result), что и PetFriends"""
+
+    pet_photo = os.path.join(os.path.dirname(__file__), 'images/rab.jpeg')
+
+    async def scenario():
+        async with AsyncPetFriends() as pf:
+            pf.base_url = stub_server.url
+            status, auth_key = await pf.get_api_key('email', 'password')
+            assert status == 200
+            assert 'key' in auth_key
+            results = [
+                await pf.get_list_of_pets(auth_key, 'my_pets'),
+                await pf.add_new_pet(auth_key, 'Снежа', 'кролик', '2', pet_photo),
+                await pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4'),
+                await pf.update_pet(auth_key, 'stub-id', 'Пушок', 'заяц', '3'),
+                await pf.add_photo_pet(auth_key, 'stub-id', pet_photo),
+                await pf.delete_pet(auth_key, 'stub-id'),
+            ]
+        return results
+
+    results = run(scenario())
+    assert [status for status, _ in results] == [200] * 6
+    assert results[0][1] == {'pets': []}
+    assert results[1][1]['name'] == 'stub'
+
+
+def test_run_bounded_limits_concurrency(stub_server):
+    """Проверяет, что run_bounded выполняет сотни вызовов, не превышая заданный лимит одновременных запросов"""
+
+    stub_server.delay = 0.01
+
+    async def scenario():
+        async with AsyncPetFriends() as pf:
+            pf.base_url = stub_server.url
+            calls = (pf.get_list_of_pets({'key': 'stub-key'}) for _ in range(200))
+            return await pf.run_bounded(calls, limit=10)
+
+    results = run(scenario())
+    assert len(results) == 200
+    assert all(status == 200 for status, _ in results)
+    assert stub_server.max_active <= 10
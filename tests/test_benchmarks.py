@@ -0,0 +1,25 @@
+import json
+
+from benchmarks import client_overhead
+
+
+def test_benchmark_saves_baseline_and_detects_regression(tmp_path):
+    """Проверяет, что бенчмарк сохраняет базу и завершается с ошибкой, если метод стал медленнее порога"""
+
+    baseline = tmp_path / 'baseline.json'
+    args = ['--baseline', str(baseline), '--repeat', '1', '--min-time', '0.001', 'get_api_key', 'update_pet']
+
+    assert client_overhead.main(args + ['--save']) == 0
+    saved = json.loads(baseline.read_text())
+    assert set(saved) == {'get_api_key', 'update_pet'}
+
+    # База в тысячу раз быстрее текущего результата - это регрессия
+    baseline.write_text(json.dumps({name: value / 1000 for name, value in saved.items()}))
+    assert client_overhead.main(args) == 1
+
+
+def test_compare_uses_threshold():
+    """Проверяет, что замедление в пределах порога не считается регрессией"""
+
+    baseline = {'a': 100.0, 'b': 100.0}
+    assert client_overhead.compare({'a': 120.0, 'b': 130.0, 'c': 1.0}, baseline, 0.25) == ['b']
@@ -0,0 +1,88 @@
+import os.path
+import time
+
+from api import PetFriends
+
+auth_key = {'key': 'stub-key'}
+
+
+def test_add_new_pets_uses_photo_and_simple_methods(stub_server):
+    """Проверяет, что питомцы с фото и без фото добавляются разными методами и все результаты возвращаются"""
+
+    pet_photo = os.path.join(os.path.dirname(__file__), 'images/rab.jpeg')
+    pets = [{'name': 'Снежа%d' % i, 'animal_type': 'кролик', 'age': '2'} for i in range(10)]
+    pets += [{'name': 'Бэль%d' % i, 'animal_type': 'кролик', 'age': '4', 'pet_photo': pet_photo} for i in range(5)]
+
+    with PetFriends(bulk_workers=4) as pf:
+        pf.base_url = stub_server.url
+        bulk = pf.add_new_pets(auth_key, pets)
+        results = bulk.wait()
+
+    paths = [path for _, path, _ in stub_server.requests]
+    assert len(results) == 15
+    assert all(status == 200 for _, status, _ in results)
+    assert paths.count('/api/create_pet_simple') == 10
+    assert paths.count('/api/pets') == 5
+    assert bulk.failures == []
+
+
+def test_failures_are_collected_without_aborting(stub_server):
+    """Проверяет, что неуспешные удаления попадают в failures, а остальные выполняются"""
+
+    stub_server.fail_paths.add('/api/pets/3')
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        bulk = pf.delete_pets(auth_key, [str(i) for i in range(6)])
+        results = list(bulk)
+
+    assert len(results) == 6
+    assert bulk.failures == [('3', 500, {})]
+
+
+def test_repeated_iteration_is_idempotent(stub_server):
+    """Проверяет, что failures заполняется без итерации, а повторные wait() отдают те же тройки
+    и не дублируют ошибки"""
+
+    stub_server.fail_paths.add('/api/pets/3')
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        bulk = pf.delete_pets(auth_key, [str(i) for i in range(6)])
+        first = bulk.wait()
+        assert bulk.wait() == first == list(bulk)
+
+        # Результат не перебирается: ошибка всё равно попадает в failures
+        other = pf.delete_pets(auth_key, ['3'])
+        deadline = time.monotonic() + 5
+        while not other.failures and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert bulk.failures == [('3', 500, {})]
+    assert other.failures == [('3', 500, {})]
+    assert len(first) == 6
+
+
+def test_update_pets(stub_server):
+    """Проверяет пакетное обновление питомцев"""
+
+    pets = [{'id': str(i), 'name': 'Пушок', 'animal_type': 'заяц', 'age': '3'} for i in range(5)]
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        results = pf.update_pets(auth_key, pets, workers=2).wait()
+
+    assert sorted(item['id'] for item, _, _ in results) == ['0', '1', '2', '3', '4']
+    assert {command for command, _, _ in stub_server.requests} == {'PUT'}
+
+
+def test_delete_all_my_pets(stub_server):
+    """Проверяет, что удаляются все питомцы из списка my_pets"""
+
+    stub_server.pets = [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        results = pf.delete_all_my_pets(auth_key).wait()
+
+    assert sorted(item for item, _, _ in results) == ['a', 'b', 'c']
@@ -0,0 +1,108 @@
+import pytest
+import requests
+
+import settings
+from api import PetFriends
+from cache import ResponseCache
+
+
+def _statuses(pf: PetFriends) -> dict:
+    return pf.metrics.to_dict().get('GET /api/pets', {}).get('statuses', {})
+
+
+@pytest.fixture
+def client(fake_server):
+    def make(**kwargs):
+        pf = PetFriends(**kwargs)
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        return pf, auth_key
+    return make
+
+
+def test_fresh_entry_served_without_request(client):
+    pf, auth_key = client(cache_ttl=60)
+    _, first = pf.get_list_of_pets(auth_key)
+    status, second = pf.get_list_of_pets(auth_key)
+
+    assert status == 200
+    assert second == first
+    assert _statuses(pf) == {'200': 1}
+    # Фильтры кэшируются отдельно
+    pf.get_list_of_pets(auth_key, 'my_pets')
+    assert _statuses(pf) == {'200': 2}
+
+
+def test_stale_entry_revalidated(client):
+    """Проверяет, что устаревшая запись перепроверяется по ETag и сервер отвечает 304 без тела"""
+
+    pf, auth_key = client(cache_ttl=0)
+    _, first = pf.get_list_of_pets(auth_key, 'my_pets')
+    status, second = pf.get_list_of_pets(auth_key, 'my_pets')
+
+    assert status == 200
+    assert second == first
+    assert _statuses(pf) == {'200': 1, '304': 1}
+
+
+def test_mutation_invalidates_key(client):
+    pf, auth_key = client(cache_ttl=60)
+    _, before = pf.get_list_of_pets(auth_key, 'my_pets')
+    _, pet = pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4')
+    _, after = pf.get_list_of_pets(auth_key, 'my_pets')
+    assert len(after['pets']) == len(before['pets']) + 1
+
+    pf.delete_pet(auth_key, pet['id'])
+    _, after = pf.get_list_of_pets(auth_key, 'my_pets')
+    assert after == before
+
+
+def test_change_by_other_client_detected_after_ttl(client, fake_server):
+    pf, auth_key = client(cache_ttl=0)
+    pf.get_list_of_pets(auth_key, 'my_pets')
+    fake_server.store.add_pet(settings.valid_email, 'Чужой', 'кот', '1')
+    _, result = pf.get_list_of_pets(auth_key, 'my_pets')
+
+    assert 'Чужой' in [pet['name'] for pet in result['pets']]
+    assert _statuses(pf) == {'200': 2}
+
+
+def test_fake_server_if_modified_since(fake_server):
+    url = fake_server.url + '/api/pets'
+    key = fake_server.store.issue_key(settings.valid_email, settings.valid_password)
+    res = requests.get(url, headers={'auth_key': key})
+    last_modified = res.headers['Last-Modified']
+
+    res = requests.get(url, headers={'auth_key': key, 'If-Modified-Since': last_modified})
+    assert res.status_code == 304
+    assert res.content == b''
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(ttl=60, max_bytes=10)
+    _, generation = cache.lookup(('a', ''))
+    cache.store(('a', ''), generation, b'12345')
+    cache.store(('a', 'my_pets'), generation, b'12345')
+    cache.lookup(('a', ''))
+    cache.store(('b', ''), cache.lookup(('b', ''))[1], b'123')
+
+    assert cache.lookup(('a', 'my_pets'))[0] is None
+    assert cache.lookup(('a', ''))[0].content == b'12345'
+    assert cache.size == 8
+
+    # Запись больше всего кэша не сохраняется
+    cache.store(('c', ''), cache.lookup(('c', ''))[1], b'x' * 11)
+    assert cache.lookup(('c', ''))[0] is None
+
+
+def test_response_started_before_invalidation_not_stored():
+    cache = ResponseCache(ttl=60)
+    _, generation = cache.lookup(('a', ''))
+    cache.invalidate('a')
+    cache.store(('a', ''), generation, b'old')
+    assert cache.lookup(('a', ''))[0] is None
+
+    _, generation = cache.lookup(('a', ''))
+    cache.invalidate()
+    cache.store(('a', ''), generation, b'old')
+    assert len(cache) == 0
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+import settings
+from api import PetFriends
+from cassette import VOLATILE, CassetteAdapter, CassetteMiss, MappedBody
+
+photo = os.path.join(os.path.dirname(__file__), 'images', 'rab.jpeg')
+# Порт, на котором никто не слушает: при воспроизведении сеть не нужна
+offline = 'http://127.0.0.1:9'
+
+
+def _session(pf: PetFriends, name: str):
+    """Сценарий из разных запросов: ключ, добавление с фото, список, потоковое чтение, удаление"""
+
+    results = [pf.get_api_key(settings.valid_email, 'wrong')[0]]
+    _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+    _, pet = pf.add_new_pet(key, name, 'кот', '3', photo)
+    results.append(pf.get_list_of_pets(key, 'my_pets'))
+    results.append([item['name'] for item in pf.iter_pets(key, 'my_pets', photos='skip')])
+    results.append(pf.delete_pet(key, pet['id'])[0])
+    results.append(pf.get_list_of_pets(key, 'my_pets'))
+    results.append(pf.get_list_of_pets(key, 'bad')[0])
+    return results
+
+
+def test_record_and_replay(fake_server, tmp_path):
+    path = str(tmp_path / 'session')
+
+    with PetFriends(transport=CassetteAdapter(path, 'record')) as pf:
+        pf.base_url = fake_server.url
+        recorded = _session(pf, 'Барсик')
+
+    with PetFriends(transport=CassetteAdapter(path)) as pf:
+        pf.base_url = offline
+        replayed = _session(pf, 'Барсик')
+
+    assert replayed == recorded
+    # Один и тот же запрос списка до и после удаления получает свои ответы по очереди
+    assert len(replayed[1][1]['pets']) == len(replayed[4][1]['pets']) + 1
+    assert replayed[0] == 403 and replayed[5] == 500
+    # Учётные данные из заголовков запроса не попадают в кассету открытым текстом
+    with open(path + '.index', encoding='utf-8') as index:
+        assert settings.valid_password not in index.read()
+
+
+def test_volatile_fields_and_miss(fake_server, tmp_path):
+    """Проверяет, что изменчивые значения не мешают сопоставлению, а неизвестный запрос и запрос с
+    api ключом, которого не было при записи, дают CassetteMiss"""
+
+    path = str(tmp_path / 'session')
+    volatile = VOLATILE + (rb'tmp-\d+',)
+
+    with PetFriends(transport=CassetteAdapter(path, 'record', volatile=volatile)) as pf:
+        pf.base_url = fake_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pf.add_new_pet_simple(key, 'tmp-1', 'кот', '3')
+
+    with PetFriends(transport=CassetteAdapter(path, volatile=volatile)) as pf:
+        pf.base_url = offline
+        # Имя другое, но запрос тот же
+        status, pet = pf.add_new_pet_simple(key, 'tmp-2', 'кот', '3')
+        assert (status, pet['name']) == (200, 'tmp-1')
+
+        with pytest.raises(CassetteMiss):
+            pf.add_new_pet_simple(key, 'Другой', 'кот', '3')
+        with pytest.raises(CassetteMiss):
+            pf.add_new_pet_simple({'key': 'f' * 56}, 'tmp-1', 'кот', '3')
+
+
+def test_distinct_keys_replayed_separately(fake_server, tmp_path):
+    """Проверяет, что запросы с разными api ключами, но одинаковым телом получают каждый свой ответ,
+    а сами ключи в индекс не попадают"""
+
+    path = str(tmp_path / 'session')
+    invalid = {'key': 'e' * 56}
+
+    with PetFriends(transport=CassetteAdapter(path, 'record')) as pf:
+        pf.base_url = fake_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        recorded = [pf.add_new_pet_simple(invalid, 'Бэль', 'кот', '4')[0],
+                    pf.add_new_pet_simple(key, 'Бэль', 'кот', '4')[0]]
+
+    with PetFriends(transport=CassetteAdapter(path)) as pf:
+        pf.base_url = offline
+        replayed = [pf.add_new_pet_simple(key, 'Бэль', 'кот', '4')[0],
+                    pf.add_new_pet_simple(invalid, 'Бэль', 'кот', '4')[0]]
+
+    assert recorded == [403, 200] and replayed == [200, 403]
+    with open(path + '.index', encoding='utf-8') as index:
+        content = index.read()
+    assert key['key'] not in content and invalid['key'] not in content
+
+
+def test_replay_streams_from_mapped_file(fake_server, tmp_path):
+    path = str(tmp_path / 'session')
+    with PetFriends(transport=CassetteAdapter(path, 'record')) as pf:
+        pf.base_url = fake_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pf.get_list_of_pets(key)
+
+    adapter = CassetteAdapter(path)
+    with PetFriends(transport=adapter) as pf:
+        pf.base_url = offline
+        res = pf.session.get(offline + '/api/pets', params={'filter': ''}, headers={'auth_key': key['key']},
+                             stream=True)
+        assert isinstance(res.raw, MappedBody)
+        chunks = list(res.iter_content(64))
+        assert all(isinstance(chunk, memoryview) for chunk in chunks)
+        assert len(b''.join(chunks)) == int(res.headers['Content-Length'])
+        res.close()
@@ -0,0 +1,155 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import settings
+from api import PetFriends
+from limits import AdaptiveLimiter
+
+
+def _client(fake_server, **kwargs) -> PetFriends:
+    pf = PetFriends(backoff=0.01, **kwargs)
+    pf.base_url = fake_server.url
+    return pf
+
+
+def test_deadline_raises_timeout(fake_server):
+    """Проверяет, что медленный ответ прерывается по сроку вызова"""
+
+    fake_server.inject('GET', '/api/key', delay=1.0)
+    with _client(fake_server) as pf:
+        started = time.monotonic()
+        with pytest.raises(requests.Timeout):
+            pf.get_api_key(settings.valid_email, settings.valid_password, timeout=0.2)
+        assert time.monotonic() - started < 0.9
+
+
+def test_idempotent_call_is_retried(fake_server):
+    """Проверяет, что GET повторяется при 503 и повторы попадают в метрики"""
+
+    infos = []
+    fake_server.inject('GET', '/api/key', status=503, times=2)
+    with _client(fake_server, retries=3) as pf:
+        pf.hooks['after_request'].append(infos.append)
+        status, result = pf.get_api_key(settings.valid_email, settings.valid_password)
+
+    assert status == 200
+    assert 'key' in result
+    assert infos[0].retries == 2
+
+
+def test_retries_are_bounded(fake_server):
+    """Проверяет, что после исчерпания повторов возвращается последний ответ сервера"""
+
+    fake_server.inject('GET', '/api/key', status=503, times=None)
+    with _client(fake_server, retries=2) as pf:
+        status, _ = pf.get_api_key(settings.valid_email, settings.valid_password)
+        assert status == 503
+        assert pf.metrics.to_dict()['GET /api/key']['retries'] == 2
+
+
+def test_post_is_not_retried(fake_server):
+    """Проверяет, что неидемпотентный POST не повторяется, чтобы не создать питомца дважды"""
+
+    with _client(fake_server, retries=3) as pf:
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        fake_server.inject('POST', '/api/create_pet_simple', status=503, times=1)
+        status, _ = pf.add_new_pet_simple(auth_key, 'Барсик', 'кот', '3')
+
+    assert status == 503
+
+
+def test_attempt_timeout_is_retried(fake_server):
+    """Проверяет, что зависшая попытка обрывается по attempt_timeout и запрос повторяется"""
+
+    with _client(fake_server, retries=1, attempt_timeout=0.2) as pf:
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        fake_server.inject('GET', '/api/pets', delay=1.0, times=1)
+        status, result = pf.get_list_of_pets(auth_key, timeout=5)
+
+    assert status == 200
+    assert result['pets']
+
+
+def test_hedged_get_returns_first_response(fake_server):
+    """Проверяет, что при медленном ответе отправляется дубликат GET и используется более быстрый ответ"""
+
+    infos = []
+    with _client(fake_server, hedge=True, hedge_after=0.05) as pf:
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pf.hooks['after_request'].append(infos.append)
+        fake_server.inject('GET', '/api/pets', delay=1.0, times=1)
+        started = time.monotonic()
+        status, _ = pf.get_list_of_pets(auth_key)
+        elapsed = time.monotonic() - started
+
+    assert status == 200
+    assert elapsed < 0.8
+    assert infos[0].hedged
+
+
+def test_hedging_does_not_limit_concurrent_calls(fake_server):
+    """Проверяет, что одновременные hedged GET не ждут друг друга в пуле потоков и что ожидание в
+    пуле не засчитывается в hedge_after: при ответе быстрее hedge_after дубликаты не отправляются"""
+
+    infos = []
+    with _client(fake_server, hedge=True, hedge_after=0.3, pool_maxsize=32) as pf:
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pf.hooks['after_request'].append(infos.append)
+        fake_server.inject('GET', '/api/pets', delay=0.15, times=None)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            statuses = list(executor.map(lambda _: pf.get_list_of_pets(auth_key)[0], range(32)))
+        elapsed = time.monotonic() - started
+
+    assert statuses == [200] * 32
+    assert elapsed < 0.5
+    assert not any(info.hedged for info in infos)
+
+
+def test_hedge_respects_concurrency_limit(fake_server):
+    """Проверяет, что дубликат не отправляется, если в лимите одновременных запросов нет места"""
+
+    infos = []
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    with _client(fake_server, hedge=True, hedge_after=0.05, concurrency=limiter) as pf:
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pf.hooks['after_request'].append(infos.append)
+        fake_server.inject('GET', '/api/pets', delay=0.3, times=1)
+        status, _ = pf.get_list_of_pets(auth_key)
+
+    assert status == 200
+    assert not infos[0].hedged
+    assert limiter.in_flight == 0
+
+
+def test_limiter_learns_only_from_server_overload(fake_server):
+    """Проверяет, что лимит одновременных запросов уменьшают таймаут чтения и 5xx, а ошибка соединения
+    (запрос не дошёл до сервера) возвращает место в лимите без замера"""
+
+    limiter = AdaptiveLimiter(initial=8)
+    with _client(fake_server, concurrency=limiter, retries=0) as pf:
+        pf.base_url = 'http://127.0.0.1:9'
+        with pytest.raises(requests.ConnectionError):
+            pf.get_api_key(settings.valid_email, settings.valid_password)
+        assert (limiter.limit, limiter.in_flight) == (8, 0)
+
+        pf.base_url = fake_server.url
+        fake_server.inject('GET', '/api/key', delay=0.5)
+        with pytest.raises(requests.Timeout):
+            pf.get_api_key(settings.valid_email, settings.valid_password, timeout=0.1)
+        assert (limiter.limit, limiter.in_flight) == (4, 0)
+
+
+def test_hedge_waits_for_latency_samples(fake_server):
+    """Проверяет, что без hedge_after дубликаты не отправляются, пока не набрано достаточно замеров"""
+
+    infos = []
+    with _client(fake_server, hedge=True, hedge_min_samples=5) as pf:
+        pf.hooks['after_request'].append(infos.append)
+        for _ in range(3):
+            pf.get_api_key(settings.valid_email, settings.valid_password)
+
+    assert not any(info.hedged for info in infos)
@@ -0,0 +1,149 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import decoding
+from api import PetFriends
+from decoding import LazyJSON, decode_body, get_decoder
+from models import Pet
+
+auth_key = {'key': 'stub-key'}
+pets = [{'id': str(i), 'name': 'Пушок', 'animal_type': 'кот', 'age': '1', 'pet_photo': ''} for i in range(3)]
+
+
+def test_get_decoder():
+    assert get_decoder('json') is json.loads
+    assert get_decoder(len) is len
+    with pytest.raises(ValueError):
+        get_decoder('nope')
+    if decoding.orjson is not None:
+        assert get_decoder() is decoding.orjson.loads
+    else:
+        assert get_decoder() is json.loads
+
+
+def test_lazy_json_decodes_on_first_access():
+    result = LazyJSON(b'{"pets": [1, 2]}')
+    assert not result.decoded
+    assert result.decode_time is None
+
+    assert len(result['pets']) == 2
+    assert result.decoded
+    assert result.decode_time >= 0
+    assert 'pets' in result
+    assert result == {'pets': [1, 2]}
+    assert dict(result) == {'pets': [1, 2]}
+
+
+def test_decode_body_falls_back_to_text():
+    result, elapsed = decode_body('Ошибка'.encode(), 'text/html; charset=utf-8', json.loads, lazy=True)
+    assert result == 'Ошибка'
+    assert elapsed >= 0
+    assert decode_body(b'', 'application/json', json.loads)[0] == ''
+
+
+def test_lazy_json_falls_back_to_text():
+    result = LazyJSON(b'{"pets": [', get_decoder())
+    assert result == '{"pets": ['
+    assert result.decoded
+
+
+@pytest.mark.parametrize('content_type', ['text/html; charset=utf-8', 'application/json'])
+@pytest.mark.parametrize('lazy', [False, True])
+def test_html_error_page_returned_as_text(content_type, lazy):
+    """Проверяет, что HTML страница ошибки со статусом 500 возвращается текстом, как и раньше, в том
+    числе с ленивым разбором и с неверным Content-Type"""
+
+    page = '<html><body><h1>500 Внутренняя ошибка сервера</h1></body></html>'.encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(500)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    try:
+        with PetFriends(lazy_json=lazy, retries=0) as pf:
+            pf.base_url = 'http://127.0.0.1:%d' % server.server_address[1]
+            status, result = pf.get_list_of_pets(auth_key)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert status == 500
+    assert result == page.decode()
+    assert isinstance(result, str)
+
+
+def test_all_methods_share_decoder(stub_server):
+    """Проверяет, что все методы разбирают ответ через заданный декодер"""
+
+    calls = []
+
+    def decoder(data):
+        calls.append(data)
+        return json.loads(data)
+
+    stub_server.pets = pets
+    with PetFriends(decoder=decoder) as pf:
+        pf.base_url = stub_server.url
+        pf.get_api_key('email', 'password')
+        pf.get_list_of_pets(auth_key)
+        pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4')
+        pf.update_pet(auth_key, 'abc', 'Пушок', 'заяц', '3')
+        pf.delete_pet(auth_key, 'abc')
+        assert len(list(pf.iter_pets(auth_key))) == 3
+
+    assert len(calls) == 5 + 3
+
+
+def test_decode_time_reported(stub_server):
+    infos = []
+    stub_server.pets = pets
+    with PetFriends(decoder='json') as pf:
+        pf.base_url = stub_server.url
+        pf.hooks['after_request'].append(infos.append)
+        pf.get_list_of_pets(auth_key)
+        stats = pf.metrics.to_dict()['GET /api/pets']
+        prometheus = pf.metrics.to_prometheus()
+
+    assert 0 < infos[0].timings['decode'] <= infos[0].timings['total']
+    assert stats['decode_time'] == infos[0].timings['decode']
+    assert 'petfriends_response_decode_seconds_total{method="GET",endpoint="/api/pets"}' in prometheus
+
+
+def test_lazy_json_client(stub_server):
+    infos = []
+    stub_server.pets = pets
+    with PetFriends(lazy_json=True) as pf:
+        pf.base_url = stub_server.url
+        pf.hooks['after_request'].append(infos.append)
+        status, result = pf.get_list_of_pets(auth_key)
+
+        assert status == 200
+        assert isinstance(result, LazyJSON) and not result.decoded
+        assert infos[0].timings['decode'] == 0
+        assert result['pets'] == pets
+
+        # Ключ кэшируется и с ленивым разбором
+        pf.key_ttl = 60
+        _, key = pf.get_api_key('email', 'password')
+        assert pf.get_api_key('email', 'password')[1] == key
+
+
+def test_lazy_json_typed(stub_server):
+    stub_server.pets = pets
+    with PetFriends(lazy_json=True, typed=True) as pf:
+        pf.base_url = stub_server.url
+        _, result = pf.get_list_of_pets(auth_key)
+
+    assert all(isinstance(pet, Pet) for pet in result)
@@ -0,0 +1,92 @@
+import os.path
+import time
+
+from api import PetFriends
+from settings import valid_email, valid_password
+
+pet_photo = os.path.join(os.path.dirname(__file__), 'images/rab.jpeg')
+gif_photo = os.path.join(os.path.dirname(__file__), 'images/rab_1.gif')
+
+
+def test_fake_server_pet_lifecycle(fake_server):
+    """Проверяет полный цикл работы с питомцем на локальном двойнике"""
+
+    with PetFriends() as pf:
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(valid_email, valid_password)
+
+        status, pet = pf.add_new_pet(auth_key, 'Снежа', 'кролик', '2', pet_photo)
+        assert status == 200
+        assert pet['name'] == 'Снежа'
+        assert pet['pet_photo'].startswith('data:image/jpeg;base64,')
+
+        status, pet = pf.update_pet(auth_key, pet['id'], 'Пушок', 'заяц', '3')
+        assert status == 200
+        assert pet['name'] == 'Пушок'
+
+        status, simple = pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4')
+        assert status == 200
+        assert simple['pet_photo'] == ''
+
+        status, simple = pf.add_photo_pet(auth_key, simple['id'], pet_photo)
+        assert status == 200
+        assert simple['pet_photo'] != ''
+
+        status, _ = pf.delete_pet(auth_key, pet['id'])
+        assert status == 200
+
+        _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+        _, all_pets = pf.get_list_of_pets(auth_key)
+
+    ids = [my_pet['id'] for my_pet in my_pets['pets']]
+    assert simple['id'] in ids
+    assert pet['id'] not in ids
+    assert len(all_pets['pets']) > len(my_pets['pets'])
+
+
+def test_fake_server_error_statuses(fake_server):
+    """Проверяет коды ошибок двойника: 403 - неверные данные входа или ключ, 400 - некорректные данные,
+    500 - неподдерживаемый фильтр или формат фото"""
+
+    with PetFriends() as pf:
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(valid_email, valid_password)
+        _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+
+        assert pf.get_api_key(valid_email, 'wrong')[0] == 403
+        assert pf.get_list_of_pets({'key': 'wrong'})[0] == 403
+        assert pf.get_list_of_pets(auth_key, 'filter')[0] == 500
+        assert pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '-4')[0] == 400
+        assert pf.add_new_pet_simple(auth_key, '', '', '')[0] == 400
+        assert pf.add_new_pet_simple(auth_key, 'Б' * 256, 'кролик', '4')[0] == 400
+        assert pf.add_new_pet(auth_key, 'Бэль', 'кролик', '4', b'abc')[0] == 400
+        assert pf.add_photo_pet(auth_key, my_pets['pets'][0]['id'], gif_photo)[0] == 500
+
+
+def test_fake_server_handles_concurrent_clients(fake_server):
+    """Проверяет, что двойник выдерживает много параллельных клиентов"""
+
+    with PetFriends(pool_maxsize=32, bulk_workers=32) as pf:
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(valid_email, valid_password)
+        pets = [{'name': 'Пёс%d' % i, 'animal_type': 'пёс', 'age': '1'} for i in range(200)]
+        results = pf.add_new_pets(auth_key, pets).wait()
+        _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+
+    assert all(status == 200 for _, status, _ in results)
+    assert len(my_pets['pets']) == 203
+
+
+def test_fake_server_keep_alive_without_delay(fake_server):
+    """Проверяет, что ответы по keep-alive соединению не задерживаются на отложенный ACK (~40 мс на
+    ответ без TCP_NODELAY)"""
+
+    with PetFriends() as pf:
+        pf.base_url = fake_server.url
+        pf.get_api_key(valid_email, valid_password)
+        started = time.perf_counter()
+        for _ in range(10):
+            pf.get_api_key(valid_email, valid_password)
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.2
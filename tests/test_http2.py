@@ -0,0 +1,118 @@
+import os
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('h2')
+
+import settings
+from api import PetFriends
+from fake_server import FakeH2Server
+from http2 import HTTP2Adapter, HTTPXBody, _ssl_context
+
+photo = os.path.join(os.path.dirname(__file__), 'images', 'rab.jpeg')
+
+
+@pytest.fixture
+def h2_server():
+    with FakeH2Server() as server:
+        yield server
+
+
+def test_concurrent_calls_share_one_connection(h2_server):
+    """Проверяет, что одновременные запросы идут параллельными потоками одного HTTP/2 соединения"""
+
+    with PetFriends(transport=HTTP2Adapter(), bulk_workers=16) as pf:
+        pf.base_url = h2_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pets = pf.add_new_pets(key, [{'name': 'Пушок%d' % i, 'animal_type': 'кот', 'age': '2'}
+                                     for i in range(16)]).wait()
+        ids = [result['id'] for _, _, result in pets]
+
+        h2_server.inject(delay=0.2, times=None)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            lists = [executor.submit(pf.get_list_of_pets, key, 'my_pets') for _ in range(8)]
+            updated = pf.update_pets(key, [{'id': pet_id, 'name': 'Мурзик', 'animal_type': 'кот', 'age': '3'}
+                                           for pet_id in ids]).wait()
+            assert {future.result()[0] for future in lists} == {200}
+        assert {status for _, status, _ in updated} == {200}
+
+        assert {status for _, status, _ in pf.delete_pets(key, ids).wait()} == {200}
+        res = pf.session.get(h2_server.url + '/api/pets', params={'filter': 'my_pets'},
+                             headers={'auth_key': key['key']})
+
+    assert res.http_version == 'HTTP/2'
+    assert not {pet['id'] for pet in res.json()['pets']} & set(ids)
+    assert h2_server.connections == 1
+    assert h2_server.max_active > 8
+
+
+def test_upload_over_http2(h2_server):
+    with PetFriends(transport=HTTP2Adapter()) as pf:
+        pf.base_url = h2_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        status, pet = pf.add_new_pet(key, 'Барсик', 'кот', '3', photo)
+        assert status == 200
+        status, pet = pf.add_photo_pet(key, pet['id'], photo)
+
+    assert status == 200
+    assert pet['pet_photo'].startswith('data:image/jpeg')
+
+
+def test_fallback_to_http1(fake_server):
+    """Проверяет, что с сервером без HTTP/2 адаптер сам переходит на HTTP/1.1"""
+
+    adapter = HTTP2Adapter()
+    with PetFriends(transport=adapter) as pf:
+        pf.base_url = fake_server.url
+        status, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        assert status == 200
+        assert pf.get_list_of_pets(key)[0] == 200
+        res = pf.session.get(fake_server.url + '/api/pets', headers={'auth_key': key['key']})
+
+    assert res.http_version == 'HTTP/1.1'
+    assert adapter._origins == {fake_server.url: False}
+
+
+def test_httpx_errors_translated(h2_server):
+    """Проверяет, что таймауты и ошибки соединения httpx приходят как исключения requests, в том числе
+    при чтении тела ответа"""
+
+    class Response:
+        async def aiter_bytes(self):
+            yield b'{"pets": ['
+            raise httpx.ReadError('соединение прервано')
+
+        async def aclose(self):
+            pass
+
+    adapter = HTTP2Adapter()
+    with requests.Session() as session:
+        session.mount('http://', adapter)
+        h2_server.inject(delay=1.0)
+        with pytest.raises(requests.ReadTimeout):
+            session.get(h2_server.url + '/api/pets', timeout=0.2)
+        with pytest.raises(requests.ConnectionError):
+            session.get('http://127.0.0.1:9/api/pets', timeout=1)
+
+        body = HTTPXBody(adapter, Response())
+        assert body.read(4) == b'{"pe'
+        with pytest.raises(requests.ConnectionError):
+            body.read()
+        body.close()
+
+
+def test_proxies_and_verify_honoured(h2_server):
+    """Проверяет, что запрос идёт через прокси из proxies, а verify и cert задают SSL контекст"""
+
+    with requests.Session() as session:
+        session.mount('http://', HTTP2Adapter())
+        # На порту 9 никто не слушает: если прокси учтён, запрос до сервера не дойдёт
+        with pytest.raises(requests.ConnectionError):
+            session.get(h2_server.url + '/api/pets', proxies={'http': 'http://127.0.0.1:9'}, timeout=1)
+
+    assert _ssl_context(True, None).verify_mode == ssl.CERT_REQUIRED
+    assert _ssl_context(False, None).verify_mode == ssl.CERT_NONE
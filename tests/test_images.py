@@ -0,0 +1,133 @@
+import io
+import os
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+import settings
+from api import PetFriends
+from images import ImageError, ImagePreprocessor, sniff
+
+images = os.path.join(os.path.dirname(__file__), 'images')
+jpeg = os.path.join(images, 'rab.jpeg')
+gif = os.path.join(images, 'rab_1.gif')
+txt = os.path.join(images, 'rab_2.txt')
+auth_key = {'key': 'stub-key'}
+
+
+def _size(data: bytes):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.format, image.size
+
+
+def test_sniff_by_content():
+    for path, expected in ((jpeg, 'image/jpeg'), (gif, 'image/gif'), (txt, None)):
+        with open(path, 'rb') as file:
+            assert sniff(file.read()) == expected
+    assert sniff(b'\x89PNG\r\n\x1a\n...') == 'image/png'
+
+
+def test_strict_mode_fails_before_request(stub_server):
+    """Проверяет, что в strict режиме GIF и текстовый файл отклоняются без запроса к серверу"""
+
+    with PetFriends(images=ImagePreprocessor(strict=True)) as pf:
+        pf.base_url = stub_server.url
+        with pytest.raises(ImageError):
+            pf.add_new_pet(auth_key, 'Сноу', 'кроля', '2', txt)
+        with pytest.raises(ImageError):
+            pf.add_photo_pet(auth_key, 'abc', gif)
+        status, _ = pf.add_photo_pet(auth_key, 'abc', jpeg)
+
+    assert status == 200
+    assert len(stub_server.requests) == 1
+
+
+def test_without_processing_photo_sent_as_is(stub_server):
+    with PetFriends(images=ImagePreprocessor()) as pf:
+        pf.base_url = stub_server.url
+        pf.add_photo_pet(auth_key, 'abc', gif)
+
+    with open(gif, 'rb') as file:
+        assert file.read() in stub_server.bodies[0]
+
+
+def test_without_processing_only_header_read(tmp_path, monkeypatch):
+    """Проверяет, что без обработки из файла читаются только первые байты для определения формата"""
+
+    reads = []
+    path = tmp_path / 'big.jpeg'
+    with open(jpeg, 'rb') as file:
+        path.write_bytes(file.read() + bytes(1 << 20))
+
+    class File(io.FileIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    monkeypatch.setattr('images.open', File, raising=False)
+    assert ImagePreprocessor(strict=True).prepare(path) == (str(path), 'image/jpeg')
+    assert reads and all(0 < size <= 12 for size in reads)
+
+
+def test_downscale_and_convert(fake_server, tmp_path):
+    """Проверяет, что GIF уменьшается и конвертируется в JPEG, который принимает сервер"""
+
+    preprocessor = ImagePreprocessor(max_size=200, quality=70, cache_dir=str(tmp_path))
+    path, content_type = preprocessor.prepare(gif)
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert content_type == 'image/jpeg'
+    assert _size(data) == ('JPEG', (200, 166))
+    assert len(data) < os.path.getsize(gif) / 10
+
+    with PetFriends(images=preprocessor) as pf:
+        pf.base_url = fake_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        status, result = pf.add_new_pet(key, 'Сноу', 'кроля', '2', gif)
+
+    assert status == 200
+    assert result['pet_photo'].startswith('data:image/jpeg')
+
+
+def test_processed_photos_cached_on_disk(tmp_path, monkeypatch):
+    """Проверяет, что повторная обработка того же содержимого берётся из кэша на диске,
+    в том числе другим экземпляром с тем же каталогом"""
+
+    calls = []
+    convert = ImagePreprocessor._convert
+    monkeypatch.setattr(ImagePreprocessor, '_convert', lambda self, *args: calls.append(1) or convert(self, *args))
+
+    first = ImagePreprocessor(max_size=300, cache_dir=str(tmp_path))
+    with open(jpeg, 'rb') as file:
+        data = file.read()
+    path, _ = first.prepare(jpeg)
+    assert first.prepare(jpeg) == (path, 'image/jpeg')
+    assert first.prepare(data) == (path, 'image/jpeg')
+    assert ImagePreprocessor(max_size=300, cache_dir=str(tmp_path)).prepare(io.BytesIO(data))[0] == path
+    assert len(calls) == 1
+
+    # Другие настройки - другой результат
+    assert ImagePreprocessor(max_size=100, cache_dir=str(tmp_path)).prepare(jpeg)[0] != path
+    assert len(calls) == 2
+
+
+def test_recompression_never_inflates():
+    """Проверяет, что если пережатие не уменьшило фото подходящего размера, отправляется исходное"""
+
+    with open(jpeg, 'rb') as file:
+        data = file.read()
+    photo, content_type = ImagePreprocessor(max_size=2000, quality=100).prepare(data)
+    assert content_type == 'image/jpeg'
+    assert photo == data
+
+
+def test_png_content_type_in_request(stub_server):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (400, 300)).save(buffer, 'PNG')
+
+    with PetFriends(images=ImagePreprocessor(max_size=100)) as pf:
+        pf.base_url = stub_server.url
+        pf.add_photo_pet(auth_key, 'abc', buffer.getvalue())
+
+    assert b'Content-Type: image/png' in stub_server.bodies[0]
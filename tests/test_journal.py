@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+
+import settings
+from api import PetFriends
+from journal import PetJournal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+photo = os.path.join(ROOT, 'tests', 'images', 'rab.jpeg')
+
+# Процесс, который создаёт питомцев с журналом и аварийно завершается, не убрав за собой
+CRASH = '''
+import sys
+import settings
+from api import PetFriends
+from journal import PetJournal
+
+pf = PetFriends(key_ttl=60, journal=PetJournal.create(sys.argv[2]))
+pf.base_url = sys.argv[1]
+_, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+for i in range(3):
+    pf.add_new_pet_simple(key, 'Брошенный%d' % i, 'кот', '1')
+import os
+os._exit(1)
+'''
+
+
+def _ids(fake_server) -> set:
+    return set(fake_server.store.pets)
+
+
+def test_created_pets_tracked_and_cleaned(fake_server, tmp_path):
+    """Проверяет, что созданные питомцы попадают в журнал, удалённые через delete_pet вычёркиваются,
+    а cleanup удаляет остальных и пустой журнал убирает свой файл"""
+
+    before = _ids(fake_server)
+    journal = PetJournal.create(str(tmp_path))
+    with PetFriends(journal=journal) as pf:
+        pf.base_url = fake_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        _, first = pf.add_new_pet(key, 'Снежа', 'кролик', '2', photo)
+        pf.add_new_pets(key, [{'name': 'Бэль%d' % i, 'animal_type': 'кот', 'age': '1'} for i in range(5)]).wait()
+        # Отклонённый сервером питомец в журнал не попадает
+        assert pf.add_new_pet_simple(key, '', '', '')[0] == 400
+        pf.delete_pet(key, first['id'])
+        assert len(journal) == 5 and len(_ids(fake_server)) == len(before) + 5
+
+        assert journal.cleanup(pf) == []
+
+    assert len(journal) == 0
+    assert _ids(fake_server) == before
+    journal.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_pets_of_crashed_run_removed_next_time(fake_server, tmp_path):
+    directory = str(tmp_path)
+    subprocess.run([sys.executable, '-c', CRASH, fake_server.url, directory], cwd=ROOT, check=False)
+    assert len(fake_server.store.pets) == 3 * (len(fake_server.store.users)) + 3
+
+    live = PetJournal.create(directory)
+    stale = PetJournal.stale(directory)
+    # Журнал работающего процесса заблокирован и не считается брошенным
+    assert len(stale) == 1 and stale[0].path != live.path
+    assert sum(len(ids) for ids in stale[0].pending().values()) == 3
+
+    with PetFriends() as pf:
+        pf.base_url = fake_server.url
+        _, key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        assert stale[0].cleanup(pf, {settings.valid_email: key}) == []
+    stale[0].close()
+    live.close()
+
+    assert not any(pet['name'].startswith('Брошенный') for pet in fake_server.store.pets.values())
+    assert os.listdir(directory) == []
+
+
+def test_torn_line_ignored_and_failures_kept(fake_server, tmp_path):
+    """Проверяет, что недописанная строка журнала пропускается, а питомцы, которых не удалось
+    удалить (неверный ключ), остаются в журнале"""
+
+    path = str(tmp_path / 'run.jsonl')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('{"add": "abc", "key": "bad", "email": null}\n{"add": "de')
+
+    journal = PetJournal(path)
+    assert journal.pending() == {'bad': ['abc']}
+    with PetFriends() as pf:
+        pf.base_url = fake_server.url
+        failed = journal.cleanup(pf)
+
+    assert [(pet_id, status) for pet_id, status, _ in failed] == [('abc', 403)]
+    journal.close()
+    assert os.path.exists(path)
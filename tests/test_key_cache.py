@@ -0,0 +1,110 @@
+import os.path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from api import PetFriends
+
+
+def key_requests(server):
+    return [path for _, path, _ in server.requests if path.startswith('/api/key')]
+
+
+def test_key_is_cached_per_credentials(stub_server):
+    """Проверяет, что повторный запрос ключа с теми же email/паролем не идёт на сервер"""
+
+    with PetFriends(key_ttl=60) as pf:
+        pf.base_url = stub_server.url
+        _, first = pf.get_api_key('email', 'password')
+        _, second = pf.get_api_key('email', 'password')
+        _, other = pf.get_api_key('other', 'password')
+
+    assert first == second
+    assert other != first
+    assert len(key_requests(stub_server)) == 2
+
+
+def test_key_cache_expires_after_ttl(stub_server):
+    """Проверяет, что по истечении key_ttl ключ запрашивается заново"""
+
+    with PetFriends(key_ttl=0) as pf:
+        pf.base_url = stub_server.url
+        pf.get_api_key('email', 'password')
+        pf.get_api_key('email', 'password')
+
+    assert len(key_requests(stub_server)) == 2
+
+
+def test_concurrent_callers_share_one_key_request(stub_server):
+    """Проверяет, что параллельные вызовы ждут один общий запрос к /api/key"""
+
+    stub_server.delay = 0.05
+    with PetFriends(key_ttl=60) as pf:
+        pf.base_url = stub_server.url
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: pf.get_api_key('email', 'password'), range(16)))
+
+    assert len({result['key'] for _, result in results}) == 1
+    assert len(key_requests(stub_server)) == 1
+
+
+def test_key_is_refreshed_once_on_403(stub_server):
+    """Проверяет, что при ответе 403 ключ сбрасывается, перезапрашивается и запрос повторяется с новым ключом"""
+
+    pet_photo = os.path.join(os.path.dirname(__file__), 'images/rab.jpeg')
+
+    with PetFriends(key_ttl=60) as pf:
+        pf.base_url = stub_server.url
+        _, auth_key = pf.get_api_key('email', 'password')
+        stub_server.revoked.add(auth_key['key'])
+        status, _ = pf.add_new_pet(auth_key, 'Снежа', 'кролик', '2', pet_photo)
+
+    assert status == 200
+    assert auth_key['key'] == 'stub-key-2'
+    assert len(key_requests(stub_server)) == 2
+
+
+def test_streamed_403_closed_before_retry(stub_server, monkeypatch):
+    """Проверяет, что потоковый ответ 403 закрывается перед повтором с новым ключом"""
+
+    closed = []
+    close = requests.Response.close
+    monkeypatch.setattr(requests.Response, 'close', lambda self: closed.append(self.status_code) or close(self))
+
+    with PetFriends(key_ttl=60) as pf:
+        pf.base_url = stub_server.url
+        _, auth_key = pf.get_api_key('email', 'password')
+        stub_server.revoked.add(auth_key['key'])
+        list(pf.iter_pets(auth_key))
+
+    assert auth_key['key'] == 'stub-key-2'
+    assert 403 in closed
+
+
+def test_key_refresh_uses_remaining_deadline(stub_server):
+    """Проверяет, что новый ключ после 403 запрашивается в пределах оставшегося срока вызова"""
+
+    timeouts = []
+    with PetFriends(key_ttl=60, timeout=5) as pf:
+        pf.base_url = stub_server.url
+        _, auth_key = pf.get_api_key('email', 'password')
+        stub_server.revoked.add(auth_key['key'])
+        get_api_key = pf.get_api_key
+        pf.get_api_key = lambda *args, **kwargs: timeouts.append(kwargs.get('timeout')) or get_api_key(*args, **kwargs)
+        status, _ = pf.get_list_of_pets(auth_key)
+
+    assert status == 200
+    assert timeouts and 0 < timeouts[0] < 5
+
+
+def test_403_without_cache_is_returned_as_is(stub_server):
+    """Проверяет, что ключ, полученный не через кэш, не перезапрашивается"""
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        _, auth_key = pf.get_api_key('email', 'password')
+        stub_server.revoked.add(auth_key['key'])
+        status, _ = pf.get_list_of_pets(auth_key)
+
+    assert status == 403
+    assert len(key_requests(stub_server)) == 1
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from api import PetFriends
+from limits import AdaptiveLimiter, TokenBucket
+
+auth_key = {'key': 'stub-key'}
+
+
+def test_aimd_grows_and_backs_off():
+    """Проверяет, что AIMD лимит растёт при успешных ответах и уменьшается вдвое при перегрузке"""
+
+    limiter = AdaptiveLimiter(initial=4, max_limit=10)
+    for _ in range(40):
+        assert limiter.acquire(timeout=0)
+        limiter.release(0.01)
+    grown = limiter.limit
+    assert 5 < grown <= 10
+
+    assert limiter.acquire(timeout=0)
+    limiter.release(0.01, overloaded=True)
+    assert limiter.limit == pytest.approx(grown / 2)
+
+
+def test_gradient_shrinks_when_latency_grows():
+    """Проверяет, что градиентный лимит растёт при стабильной задержке и падает при её росте"""
+
+    limiter = AdaptiveLimiter(initial=10, algorithm='gradient')
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(0.01)
+    grown = limiter.limit
+    assert grown > 10
+
+    for _ in range(30):
+        limiter.acquire()
+        limiter.release(0.2)
+    assert limiter.limit < grown / 2
+
+
+def test_limiter_blocks_when_full():
+    """Проверяет, что при занятом лимите acquire ждёт освобождения места"""
+
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0.05)
+
+    threading.Timer(0.05, limiter.release, (0.01,)).start()
+    assert limiter.acquire(timeout=1)
+
+
+def test_token_bucket_caps_rate():
+    """Проверяет, что после исчерпания запаса жетоны выдаются с заданной частотой"""
+
+    bucket = TokenBucket(rate=50, burst=5)
+    started = time.monotonic()
+    for _ in range(15):
+        assert bucket.acquire()
+    assert time.monotonic() - started >= 0.18
+    assert not bucket.acquire(timeout=0)
+
+
+def test_shared_token_bucket(tmp_path):
+    """Проверяет, что два TokenBucket на одном файле делят общий запас жетонов"""
+
+    path = str(tmp_path / 'bucket')
+    first = TokenBucket(rate=1, burst=3, path=path)
+    second = TokenBucket(rate=1, burst=3, path=path)
+
+    assert first.acquire(timeout=0)
+    assert first.acquire(timeout=0)
+    assert second.acquire(timeout=0)
+    assert not second.acquire(timeout=0)
+    assert not first.acquire(timeout=0)
+
+
+def test_client_respects_concurrency_limit(stub_server):
+    """Проверяет, что клиент не держит больше запросов одновременно, чем разрешает лимитер"""
+
+    stub_server.delay = 0.05
+    limiter = AdaptiveLimiter(initial=2, max_limit=2)
+
+    with PetFriends(concurrency=limiter) as pf:
+        pf.base_url = stub_server.url
+        result = pf.delete_pets(auth_key, [str(i) for i in range(10)], workers=8).wait()
+
+    assert [status for _, status, _ in result] == [200] * 10
+    assert stub_server.max_active == 2
+    assert limiter.in_flight == 0
+
+
+def test_server_errors_reduce_limit(stub_server):
+    """Проверяет, что ответы 5xx уменьшают лимит одновременных запросов"""
+
+    stub_server.fail_paths.add('/api/pets/abc')
+    with PetFriends(concurrency=8) as pf:
+        pf.base_url = stub_server.url
+        pf.delete_pet(auth_key, 'abc')
+        pf.delete_pet(auth_key, 'abc')
+        assert pf.limiter.limit == 2
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import load
+from api import PetFriends
+
+
+def test_request_count_and_report(fake_server):
+    """Проверяет, что прогон выполняет ровно заданное число операций, считает перцентили
+    по каждой операции и удаляет созданных питомцев"""
+
+    before = len(fake_server.store.pets)
+    with PetFriends(pool_maxsize=4) as pf:
+        pf.base_url = fake_server.url
+        result = load.run(pf, users=4, requests=200, seed=1)
+
+    total = result['total']
+    assert total['count'] == 200 and total['errors'] == 0
+    assert sum(item['count'] for item in result['operations'].values()) == 200
+    assert set(result['operations']) <= set(load.MIX)
+    assert {'list_all', 'list_my', 'create_simple'} <= set(result['operations'])
+    for summary in result['operations'].values():
+        assert summary['min'] <= summary['p50'] <= summary['p99'] <= summary['max']
+        assert summary['statuses'] == {'200': summary['count']}
+    assert len(fake_server.store.pets) == before
+    assert 'всего' in load.format_report(result)
+
+
+def test_duration_and_mix(fake_server):
+    with PetFriends() as pf:
+        pf.base_url = fake_server.url
+        result = load.run(pf, users=2, duration=0.3, mix=load.parse_mix('list_my=1,delete=1'))
+
+    assert 0.3 <= result['duration'] < 2
+    # delete без питомцев превращается в create_simple
+    assert set(result['operations']) <= {'list_my', 'delete', 'create_simple'}
+    assert result['total']['count'] > 0
+
+
+def test_cli_writes_json(fake_server, tmp_path, capsys):
+    path = tmp_path / 'report.json'
+    assert load.main(['--base-url', fake_server.url, '--users', '2', '--requests', '20',
+                      '--mix', 'key,list_all=3', '--json', str(path)]) == 0
+
+    result = json.loads(path.read_text(encoding='utf-8'))
+    assert result['total']['count'] == 20
+    assert set(result['operations']) <= {'key', 'list_all'}
+    assert 'list_all' in capsys.readouterr().out
+
+
+def test_parse_mix_rejects_unknown():
+    with pytest.raises(ValueError):
+        load.parse_mix('list_all=1,fly=2')
+    with pytest.raises(ValueError):
+        load.parse_mix('list_all=0')
@@ -0,0 +1,116 @@
+import json
+import random
+import socket
+
+import pytest
+import requests
+
+from api import PetFriends
+from metrics import Histogram, RollingHistogram
+
+auth_key = {'key': 'stub-key'}
+
+
+def test_hooks_receive_request_info(stub_server):
+    """Проверяет, что хуки вызываются до и после запроса и получают эндпоинт, статус, байты и время"""
+
+    before, after = [], []
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url.replace('127.0.0.1', 'localhost')
+        pf.hooks['before_request'].append(lambda info: before.append(info.endpoint))
+        pf.hooks['after_request'].append(after.append)
+        pf.update_pet(auth_key, 'abc', 'Пушок', 'заяц', '3')
+        pf.delete_pet(auth_key, 'abc')
+
+    assert before == ['/api/pets/{pet_id}', '/api/pets/{pet_id}']
+    first, second = after
+    assert (first.method, first.status, first.retries) == ('PUT', 200, 0)
+    assert first.bytes_sent == len(stub_server.bodies[0]) > 0
+    assert first.bytes_received > 0
+    assert first.timings['dns'] > 0
+    assert first.timings['connect'] > 0
+    assert first.timings['total'] >= first.timings['dns'] + first.timings['connect']
+    # Второй запрос идёт по уже открытому соединению
+    assert second.timings['connect'] == second.timings['dns'] == 0
+
+
+def test_retry_after_403_is_counted(stub_server):
+    """Проверяет, что повтор запроса после перезапроса ключа попадает в retries"""
+
+    infos = []
+
+    with PetFriends(key_ttl=60) as pf:
+        pf.base_url = stub_server.url
+        pf.hooks['after_request'].append(infos.append)
+        _, key = pf.get_api_key('email', 'password')
+        stub_server.revoked.add(key['key'])
+        pf.get_list_of_pets(key)
+
+    assert [(info.endpoint, info.retries) for info in infos] == [('/api/key', 0), ('/api/key', 0), ('/api/pets', 1)]
+
+
+def test_connection_error_is_reported():
+    """Проверяет, что при ошибке соединения хук получает исключение, а метрики считают ошибку"""
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    infos = []
+    with PetFriends() as pf:
+        pf.base_url = 'http://127.0.0.1:%d' % port
+        pf.hooks['after_request'].append(infos.append)
+        with pytest.raises(requests.ConnectionError):
+            pf.get_api_key('email', 'password')
+        stats = pf.metrics.to_dict()
+
+    assert isinstance(infos[0].error, requests.ConnectionError)
+    assert stats['GET /api/key']['errors'] == 1
+
+
+def test_metrics_export(stub_server):
+    """Проверяет экспорт метрик в JSON и формат Prometheus"""
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        for _ in range(5):
+            pf.get_list_of_pets(auth_key, 'my_pets')
+        pf.delete_pet(auth_key, '1')
+        data = json.loads(pf.metrics.to_json())
+        text = pf.metrics.to_prometheus()
+
+    assert data['GET /api/pets']['count'] == 5
+    assert data['GET /api/pets']['statuses'] == {'200': 5}
+    assert data['GET /api/pets']['latency']['p99'] > 0
+    assert 'DELETE /api/pets/{pet_id}' in data
+    assert 'petfriends_request_duration_seconds_count{method="GET",endpoint="/api/pets"} 5' in text
+    assert 'petfriends_requests_total{method="DELETE",endpoint="/api/pets/{pet_id}",status="200"} 1' in text
+    assert '# TYPE petfriends_request_duration_seconds summary' in text
+
+
+def test_histogram_percentiles_are_accurate():
+    """Проверяет, что перцентили гистограммы отличаются от точных меньше чем на 1%"""
+
+    values = [random.lognormvariate(-4, 1.5) for _ in range(20000)]
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.01, abs=2e-6)
+    assert histogram.percentile(1.0) == values[-1]
+
+
+def test_rolling_histogram_drops_old_values():
+    """Проверяет, что скользящая гистограмма забывает замеры старше окна"""
+
+    rolling = RollingHistogram(window=10, slots=5)
+    rolling.record(1.0, now=100)
+    rolling.record(2.0, now=105)
+
+    assert rolling.snapshot(now=106).count == 2
+    assert rolling.snapshot(now=111).count == 1
+    assert rolling.snapshot(now=200).count == 0
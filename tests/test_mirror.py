@@ -0,0 +1,100 @@
+import os
+import time
+
+import pytest
+
+import settings
+from api import PetFriends
+from mirror import PetsMirror
+from models import Pet
+
+photo = os.path.join(os.path.dirname(__file__), 'images', 'rab.jpeg')
+
+
+def _list_requests(pf: PetFriends) -> int:
+    return pf.metrics.to_dict().get('GET /api/pets', {}).get('count', 0)
+
+
+@pytest.fixture
+def client(fake_server):
+    with PetFriends(mirror=True) as pf:
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        yield pf, auth_key
+
+
+def test_mirror_follows_changes_without_refetch(client):
+    """Проверяет, что после первой загрузки копия обновляется ответами методов без запросов списка"""
+
+    pf, auth_key = client
+    assert len(pf.my_pets(auth_key)) == 3
+
+    _, added = pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4')
+    _, with_photo = pf.add_new_pet(auth_key, 'Снежа', 'кролик', '2', photo)
+    pf.update_pet(auth_key, added['id'], 'Пушок', 'заяц', '3')
+    pf.add_photo_pet(auth_key, added['id'], photo)
+    pf.delete_pet(auth_key, with_photo['id'])
+
+    pets = pf.my_pets(auth_key)
+    assert _list_requests(pf) == 1
+    assert len(pets) == 4
+    pet = pf.my_pet(auth_key, added['id'])
+    assert (pet['name'], pet['animal_type']) == ('Пушок', 'заяц')
+    assert pet['pet_photo'].startswith('data:image/jpeg')
+    assert pf.find_my_pets(auth_key, 'Пушок') == [pet]
+    assert pf.find_my_pets(auth_key, 'Бэль') == []
+    assert pf.my_pet(auth_key, with_photo['id']) is None
+
+    # Копия совпадает с тем, что вернёт сервер
+    _, server = pf.get_list_of_pets(auth_key, 'my_pets')
+    assert sorted(p['id'] for p in server['pets']) == sorted(p['id'] for p in pets)
+
+
+def test_mirror_resyncs_on_refresh_and_ttl(fake_server):
+    """Проверяет, что список запрашивается заново по refresh=True и после mirror_ttl"""
+
+    with PetFriends(mirror=True, mirror_ttl=0.1) as pf:
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pf.my_pets(auth_key)
+        pf.my_pets(auth_key)
+        assert _list_requests(pf) == 1
+
+        # Питомец, добавленный в обход клиента, появится только после повторной загрузки
+        fake_server.store.add_pet(settings.valid_email, 'Чужой', 'кот', '1')
+        assert len(pf.my_pets(auth_key)) == 3
+        assert len(pf.my_pets(auth_key, refresh=True)) == 4
+        assert _list_requests(pf) == 2
+
+        time.sleep(0.15)
+        pf.my_pets(auth_key)
+        assert _list_requests(pf) == 3
+
+
+def test_mirror_typed(fake_server):
+    with PetFriends(mirror=True, typed=True) as pf:
+        pf.base_url = fake_server.url
+        _, auth_key = pf.get_api_key(settings.valid_email, settings.valid_password)
+        pets = pf.my_pets(auth_key)
+        assert all(isinstance(pet, Pet) for pet in pets)
+        assert pf.my_pet(auth_key, pets[0].id) == pets[0]
+
+
+def test_mirror_disabled():
+    with PetFriends() as pf:
+        with pytest.raises(ValueError):
+            pf.my_pets({'key': 'stub-key'})
+
+
+def test_mirror_ignores_changes_before_load():
+    """Проверяет, что изменения до первой загрузки не создают неполную копию"""
+
+    mirror = PetsMirror()
+    mirror.put('key', {'id': '1', 'name': 'Бэль'})
+    assert mirror.pets('key') is None
+
+    mirror.load('key', [{'id': '1', 'name': 'Бэль'}, {'id': '2', 'name': 'Бэль'}])
+    mirror.put('key', {'id': '1', 'name': 'Пушок'})
+    assert [pet['id'] for pet in mirror.find('key', 'Бэль')] == ['2']
+    mirror.remove('key', '2')
+    assert mirror.find('key', 'Бэль') == []
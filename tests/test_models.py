@@ -0,0 +1,81 @@
+import base64
+import json
+import os.path
+import sys
+import tracemalloc
+
+from api import PetFriends
+from models import Pet
+
+auth_key = {'key': 'stub-key'}
+
+
+def make_pet(i, photo=''):
+    return {'id': 'id-%05d' % i, 'name': 'Пушок%d' % i, 'animal_type': 'кот', 'age': str(i % 20),
+            'created_at': '1690000000.%d' % i, 'user_id': 'user', 'pet_photo': photo}
+
+
+def test_photo_is_decoded_on_access():
+    """Проверяет, что фото раскодируется из data URI в bytes только при обращении"""
+
+    photo = b'\xff\xd8\xff\xe0'
+    pet = Pet.from_dict(make_pet(1, 'data:image/jpeg;base64,' + base64.b64encode(photo).decode()))
+
+    assert pet.pet_photo.startswith('data:image/jpeg')
+    assert pet.photo == photo
+    assert Pet.from_dict(make_pet(2)).photo == b''
+
+
+def test_pet_supports_dict_access():
+    """Проверяет, что к полям Pet можно обращаться как к ключам словаря"""
+
+    pet = Pet.from_dict(make_pet(3))
+
+    assert pet['id'] == pet.id == 'id-00003'
+    assert pet.to_dict() == make_pet(3)
+
+
+def test_pets_take_less_memory_than_dicts():
+    """Проверяет память списка Pet и тех же данных в словарях на ответе с настоящими фото: у каждого
+    второго питомца base64 фото из tests/images. Строка фото у Pet та же, что пришла в ответе (без
+    копии и без раскодирования), поэтому список Pet не больше списка словарей, а всё, кроме фото,
+    занимает заметно меньше"""
+
+    with open(os.path.join(os.path.dirname(__file__), 'images', 'rab.jpeg'), 'rb') as file:
+        photo = 'data:image/jpeg;base64,' + base64.b64encode(file.read()).decode()
+    count = 1000
+    raw = json.dumps([make_pet(i, photo if i % 2 else '') for i in range(count)])
+    photos_size = count // 2 * sys.getsizeof(photo)
+
+    tracemalloc.start()
+    dicts = json.loads(raw)
+    dicts_size, _ = tracemalloc.get_traced_memory()
+    del dicts
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    pets = [Pet.from_dict(pet) for pet in json.loads(raw)]
+    pets_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(pets) == count
+    assert pets_size < dicts_size
+    assert pets_size - photos_size < (dicts_size - photos_size) * 0.75
+
+
+def test_typed_mode_returns_pets(stub_server):
+    """Проверяет, что в режиме typed методы возвращают Pet вместо словарей"""
+
+    stub_server.pets = [make_pet(i) for i in range(3)]
+
+    with PetFriends(typed=True) as pf:
+        pf.base_url = stub_server.url
+        _, pets = pf.get_list_of_pets(auth_key)
+        streamed = list(pf.iter_pets(auth_key))
+        _, created = pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4')
+        status, _ = pf.get_api_key('email', 'password')
+
+    assert pets == streamed == [Pet.from_dict(make_pet(i)) for i in range(3)]
+    assert isinstance(created, Pet)
+    assert created.name == 'stub'
+    assert status == 200
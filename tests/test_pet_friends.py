@@ -1,11 +1,12 @@
 import os.path
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 
-from api import PetFriends
 from settings import valid_email, valid_password, invalid_email, invalid_password, empty_email, empty_password, invalid_text
 
-pf = PetFriends()
 
-def test_get_api_key_for_valid_user(email=valid_email, password=valid_password):
+def test_get_api_key_for_valid_user(pf, email=valid_email, password=valid_password):
     """Проверяет, что запрос api ключа возвращает статус 200 и в результате содержится слово 'key'"""
 
     # Отправляет запрос и сохраняет полученный ответ с кодом статуса в 'status', текст ответа в 'result'
@@ -15,26 +16,22 @@ def test_get_api_key_for_valid_user(email=valid_email, password=valid_password):
     assert 'key' in result
     print(result)
 
-def test_get_all_pets_with_valid_key(filter=''):
-    """Проверяет, что запрос возвращает не пустой список. Получаем api ключ, сохраняем его в auth_key.
-    С помощью полученного ключа запрашиваем список всех питомцев и проверяем, что он не пуст.
+def test_get_all_pets_with_valid_key(pf, auth_key, filter=''):
+    """Проверяет, что запрос возвращает не пустой список. С помощью api ключа учётной записи воркера
+    (auth_key) запрашиваем список всех питомцев и проверяем, что он не пуст.
     Доступное значение параметра filter - 'my_pets' либо ''"""
 
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
     status, result = pf.get_list_of_pets(auth_key, filter)
     assert status == 200
     assert len(result['pets']) > 0
     print(result)
 
-def test_add_new_pet_with_valid_data(name='Снежа', animal_type='кролик', age='2', pet_photo='images/rabbit.jpeg'):
+def test_add_new_pet_with_valid_data(pf, auth_key, name='Снежа', animal_type='кролик', age='2', pet_photo='images/rab.jpeg'):
     """Проверяет добавление питомца с корректными данными"""
 
     # Полный путь к изображению и сохранение его в переменную 'pet_photo'
     pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
 
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
     # Добавляем питомца
     status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
 
@@ -42,51 +39,31 @@ def test_add_new_pet_with_valid_data(name='Снежа', animal_type='кроли
     assert status == 200
     assert result['name'] == name
 
-def test_successful_delete_pet():
+def test_successful_delete_pet(pf, auth_key, my_pet):
     """Проверяет возможность удаления питомца"""
 
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-    _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
-
-    if len(my_pets['pets']) == 0:
-        pf.add_new_pet(auth_key, 'Снежинка', 'Декоративный кролик', '1', 'images/rabbit.jpeg')
-        _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
-
-    pet_id = my_pets['pets'][0]['id']
+    pet_id = my_pet['id']
     status, _ = pf.delete_pet(auth_key, pet_id)
 
     _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
 
     assert status == 200
-    assert pet_id not in my_pets.values()
+    assert pet_id not in [pet['id'] for pet in my_pets['pets']]
 
 
-def test_successful_update_pet(name='Пушок', animal_type='заяц', age='3'):
+def test_successful_update_pet(pf, auth_key, my_pet, name='Пушок', animal_type='заяц', age='3'):
     """Проверяет возможность изменения данных питомца"""
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-    # Получаем список питомцев пользователя
-    _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
 
-    # Если список не пуст, то обновляет данные первого питомца
-    if len(my_pets['pets']) > 0:
-        status, result = pf.update_pet(auth_key, my_pets['pets'][0]['id'], name, animal_type, age)
+    status, result = pf.update_pet(auth_key, my_pet['id'], name, animal_type, age)
 
-        # Проверяет статус ответа и имя питомца соответствует заданному
-        assert status == 200
-        assert result['name'] == name
-    else:
-        # Если список пуст, то выходит исключение с сообщением
-        raise Exception("Список питомцев пользователя пуст.")
+    # Проверяет статус ответа и имя питомца соответствует заданному
+    assert status == 200
+    assert result['name'] == name
 
 
-def test_add_new_pet_simple_with_valid_data(name='Бэль', animal_type='дек. кролик', age='4'):
+def test_add_new_pet_simple_with_valid_data(pf, auth_key, name='Бэль', animal_type='дек. кролик', age='4'):
     """Проверяет добавление питомца с корректными данными без фото"""
 
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
     # Добавляем питомца
     status, result = pf.add_new_pet_simple(auth_key, name, animal_type, age)
 
@@ -95,334 +72,157 @@ def test_add_new_pet_simple_with_valid_data(name='Бэль', animal_type='дек
     assert result['name'] == name
 
 
-def test_add_photo_pet_with_valid_data(pet_photo='images/rab.jpeg'):
+def test_add_photo_pet_with_valid_data(pf, auth_key, my_pet, pet_photo='images/rab.jpeg'):
     """Проверяет добавление фото с корректными данными"""
 
     # Полный путь к изображению и сохранение его в переменную 'pet_photo'
     pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
 
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-    # Получаем список питомцев пользователя
-    _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
-
-    # Если список не пуст, то меняет фото первого питомца
-    if len(my_pets['pets']) > 0:
-        status, result = pf.add_photo_pet(auth_key, my_pets['pets'][0]['id'], pet_photo)
-    else:
-        # Если список пуст, то выходит исключение с сообщением
-        raise Exception("Список питомцев пользователя пуст.")
+    status, result = pf.add_photo_pet(auth_key, my_pet['id'], pet_photo)
 
     # Проверяем полученные данные
     assert status == 200
     assert result['pet_photo'] != ''
 
 
-def test_get_api_key_for_invalid_user(email=invalid_email, password=invalid_password):
-    """Проверяет, что запрос api ключа возвращает статус равный 403, если указан
-    некорректный email/пароль. Ошибка авторизации"""
-
-    # Отправляет запрос и сохраняет полученный ответ с кодом статуса в 'status', текст ответа в 'result'
-    status, result = pf.get_api_key(email, password)
-    # Проверка полученных данных
-    assert status == 403
+# Ключ, которого нет на сервере: вызовы с ним должны получить 403
+INVALID_KEY = {'key': 'ea738148a1f19838e1c5d1413877f3691a3731380e733e877b0ae72900000000'}
+# Заглушка аргумента: заменяется id временного питомца
+PET = object()
+
+
+def photo(name: str) -> str:
+    return os.path.join(os.path.dirname(__file__), 'images', name)
+
+
+class Case:
+    """Строка таблицы негативных проверок: метод PetFriends, аргументы и ожидаемый статус.
+    auth - какой api ключ подставить первым аргументом: 'valid' (общий ключ прогона), 'invalid'
+    (несуществующий) или None (метод без ключа)"""
+
+    __slots__ = ('id', 'method', 'args', 'expected', 'auth', 'doc')
+
+    def __init__(self, id: str, method: str, args: tuple, expected: int, auth: str = 'valid', doc: str = ''):
+        self.id = id
+        self.method = method
+        self.args = args
+        self.expected = expected
+        self.auth = auth
+        self.doc = doc
+
+    def __repr__(self):
+        return self.id
+
+
+BUG_400 = 'По документации API ожидается 400, но сервер возвращает 200. Баг'
+LONG_TEXT = 'Текст больше 255 символов (например, 500): ожидается 400, но питомец добавляется с кодом 200'
+
+CASES = [
+    # Получение ключа
+    Case('get_api_key_for_invalid_user', 'get_api_key', (invalid_email, invalid_password), 403, None,
+         'Неверный email/пароль - ошибка авторизации'),
+    Case('get_api_key_for_empty_user', 'get_api_key', (empty_email, empty_password), 403, None,
+         'Незаполненные email/пароль - ошибка авторизации'),
+
+    # Питомец без фото
+    Case('add_new_pet_simple_with_invalid_name', 'add_new_pet_simple', (invalid_text, 'Пушишка', '5'), 400,
+         doc=LONG_TEXT),
+    Case('add_new_pet_simple_with_invalid_animal_type', 'add_new_pet_simple', ('Печенька', invalid_text, '5'),
+         400, doc=LONG_TEXT),
+    Case('add_new_pet_simple_with_invalid_age', 'add_new_pet_simple', ('Печенька', 'Пушишка', invalid_text),
+         400, doc='Возраст должен быть числом. ' + BUG_400),
+    Case('add_new_pet_simple_with_negative_age', 'add_new_pet_simple', ('Печенька', 'Пушишка', '-5'), 400,
+         doc='Возраст должен быть положительным. ' + BUG_400),
+    Case('add_new_pet_simple_with_empty_data', 'add_new_pet_simple', ('', '', ''), 400, doc=BUG_400),
+
+    # Питомец с фото
+    Case('add_new_pet_with_invalid_name', 'add_new_pet', (invalid_text, 'Кролик', '3', photo('rab.jpeg')), 400,
+         doc=LONG_TEXT),
+    Case('add_new_pet_with_invalid_animal_type', 'add_new_pet', ('Пряня', invalid_text, '3', photo('rab.jpeg')),
+         400, doc=LONG_TEXT),
+    Case('add_new_pet_with_invalid_age', 'add_new_pet', ('Пряня', 'Кролик', invalid_text, photo('rab.jpeg')),
+         400, doc='Возраст должен быть числом. ' + BUG_400),
+    Case('add_new_pet_with_negative_age', 'add_new_pet', ('Пряня', 'Кролик', '-3', photo('rab.jpeg')), 400,
+         doc='Возраст должен быть положительным. ' + BUG_400),
+    Case('add_new_pet_with_empty_data', 'add_new_pet', ('', '', '', photo('rab.jpeg')), 400, doc=BUG_400),
+    Case('add_new_pet_with_photo_invalid_extension', 'add_new_pet', ('Сноу', 'кроля', '2', photo('rab_2.txt')),
+         400, doc='Текстовый файл вместо фото: по документации 400, но питомец добавляется без фото. Баг'),
+    Case('add_photo_pet_with_invalid_extension', 'add_photo_pet', (PET, photo('rab_1.gif')), 500,
+         doc='GIF не поддерживается: по документации 400, но сервер отвечает 500. Баг'),
+
+    # Несуществующий ключ
+    Case('get_all_pets_with_invalid_key', 'get_list_of_pets', ('',), 403, 'invalid'),
+    Case('add_new_pet_with_invalid_key', 'add_new_pet', ('Снежа', 'кролик', '2', photo('rab.jpeg')), 403,
+         'invalid'),
+    Case('add_new_pet_simple_with_invalid_key', 'add_new_pet_simple', ('Бэль', 'дек. кролик', '4'), 403,
+         'invalid'),
+    Case('add_photo_pet_with_invalid_key', 'add_photo_pet', (PET, photo('rab.jpeg')), 403, 'invalid'),
+    Case('update_pet_with_invalid_key', 'update_pet', (PET, 'Пушок', 'заяц', '3'), 403, 'invalid'),
+    Case('delete_pet_with_invalid_key', 'delete_pet', (PET,), 403, 'invalid'),
+
+    # Параметры запроса
+    Case('get_all_pets_with_invalid_filter', 'get_list_of_pets', ('filter',), 500,
+         doc='Неподдерживаемый фильтр - ошибка сервера'),
+]
+
+
+def run_cases(pf, cases: list, auth_key: dict, pet_id: str = None) -> dict:
+    """Отправляет проверки параллельно в pf.bulk_workers потоков (не больше, чем соединений в пуле
+    клиента) и возвращает id проверки -> (статус, результат) либо исключение, которое вызов выбросил"""
+
+    def call(case: Case):
+        args = tuple(pet_id if arg is PET else arg for arg in case.args)
+        if case.auth is not None:
+            args = (auth_key if case.auth == 'valid' else INVALID_KEY,) + args
+        try:
+            return getattr(pf, case.method)(*args)
+        except Exception as e:
+            return e
+
+    if not cases:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(cases), pf.bulk_workers)) as executor:
+        return dict(zip((case.id for case in cases), executor.map(call, cases)))
+
+
+def run_batch(pf, cases: list, auth_key: dict) -> dict:
+    """run_cases, а для строк с PET на время пакета создаётся временный питомец"""
+
+    if not any(PET in case.args for case in cases):
+        return run_cases(pf, cases, auth_key)
+
+    status, pet = pf.add_new_pet_simple(auth_key, 'pytest-negative', 'кот', '1')
+    assert status == 200
+    try:
+        return run_cases(pf, cases, auth_key, pet['id'])
+    finally:
+        pf.delete_pet(auth_key, pet['id'])
 
 
-def test_get_api_key_for_empty_user(email=empty_email, password=empty_password):
-    """Проверяет, что запрос api ключа возвращает статус равный 403,
-    если email/пароль не заполнены. Ошибка авторизации"""
+@pytest.fixture(scope='session')
+def negative_results(request, pf, auth_key):
+    """Результаты всех выбранных в прогоне строк CASES, отправленных одним пакетом с общим api ключом.
+    В session.items каждого воркера xdist все тесты прогона, а не только его, поэтому под xdist пакет
+    отправляется только с --dist loadgroup: тогда все строки (группа 'negative') достаются одному
+    воркеру. При другом распределении результатов нет, и каждая строка отправляется в своём тесте"""
 
-    # Отправляет запрос и сохраняет полученный ответ с кодом статуса в 'status', текст ответа в 'result'
-    status, result = pf.get_api_key(email, password)
-    # Проверка полученных данных.
-    # 403 - The error code means that provided combination of user email and password is incorrect
-    assert status == 403
+    if 'PYTEST_XDIST_WORKER' in os.environ and not request.config.getvalue('loadgroup'):
+        return {}
+    selected = [item.callspec.params['case'] for item in request.session.items
+                if getattr(item, 'function', None) is test_negative]
+    return run_batch(pf, selected, auth_key)
 
 
-def test_add_photo_pet_with_invalid_extension(pet_photo='images/rab_1.gif'):
-    """Проверяет добавление фото неподдерживаемого формата.
-    Фото не будет добавлено.  По описанию в документации API сказано,
-    что должен быть статус 400, если переданы некорректные данные, но ловится статус 500. Баг?"""
+@pytest.mark.xdist_group('negative')
+@pytest.mark.parametrize('case', CASES, ids=repr)
+def test_negative(case, pf, auth_key, negative_results):
+    """Проверяет статус ответа на некорректный запрос из таблицы CASES"""
 
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-    # Получаем список питомцев пользователя
-    _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
-
-    # Если список не пуст, то меняет фото первого питомца
-    if len(my_pets['pets']) > 0:
-        status, result = pf.add_photo_pet(auth_key, my_pets['pets'][0]['id'], pet_photo)
+    if case.id in negative_results:
+        result = negative_results[case.id]
     else:
-        # Если список пуст, то выходит исключение с сообщением
-        raise Exception("Список питомцев пользователя пуст.")
-    # Проверяем полученные данные
-
-    assert status == 500
-    print(status)
-
-
-def test_add_new_pet_with_photo_invalid_extension(name='Сноу', animal_type='кроля', age='2', pet_photo='images/rab_2.txt'):
-    """Проверяет добавление питомца с фото неподдерживаемого формата.
-    Ожидается, что появится ошибка при выборе фото некорректного формата.
-    Баг: По описанию в документации API сказано, что должен быть статус 400, если переданы некорректные данные,
-    но возвращает 200, т.е. добавляет питомца без фото."""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-
-def test_add_new_pet_simple_with_invalid_name(name=invalid_text, animal_type='Пушишка', age='5'):
-    """Проверяет добавление питомца (без фото) с некорректным именем:
-    в поле name передается текст больше 255 символов. Например, 500 символов. Ожидается ответ от сервера 400.
-    Пробовала и около 1500 символов - добавляет успешно, возвращает код 200.
-    Неясно, зачем такая большая размерность для данного поля."""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet_simple(auth_key, name, animal_type, age)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_simple_with_invalid_animal_type(name='Печенька', animal_type=invalid_text, age='5'):
-    """Проверяет добавление питомца (без фото) с некорректной породой:
-    в поле animal_type передается текст больше 255 символов. Например, 500 символов. Ожидается ответ от сервера 400.
-    Пробовала и около 1500 символов - добавляет успешно, возвращает код 200.
-    Неясно, зачем такая большая размерность для данного поля."""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet_simple(auth_key, name, animal_type, age)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-def test_add_new_pet_simple_with_invalid_age(name='Печенька', animal_type='Пушишка', age=invalid_text):
-    """Проверяет добавление питомца (без фото) с некорректным возрастом:
-    в поле age передается текст размером больше 255 символов, а должен принимать только числа.
-    Ожидается ответ от сервера 400. Но возвращает код 200. Баг"""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet_simple(auth_key, name, animal_type, age)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_simple_with_negative_age(name='Печенька', animal_type='Пушишка', age='-5'):
-    """Проверяет добавление питомца (без фото) с некорректным возрастом:
-    в поле age передается текст с отрицательным числом, а должен принимать только положительные числа.
-    Ожидается ответ от сервера 400. Но возвращает код 200. Баг"""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet_simple(auth_key, name, animal_type, age)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_simple_with_empty_data(name='', animal_type='', age=''):
-    """Проверяет добавление питомца (без фото) с незаполненными полями.
-    Ожидается ответ от сервера 400. Но возвращает код 200. Баг"""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet_simple(auth_key, name, animal_type, age)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_with_invalid_name(name=invalid_text, animal_type='Кролик', age='3', pet_photo='images/rabbit.jpeg'):
-    """Проверяет добавление питомца с некорректным именем:
-    в поле name передается текст больше 255 символов. Например, 500 символов.
-    Ожидается ответ от сервера 400. Но добавляет питомца успешно, возвращает код 200.
-    Неясно, зачем такая большая размерность для данного поля."""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_with_invalid_animal_type(name='Пряня', animal_type=invalid_text, age='3', pet_photo='images/rabbit.jpeg'):
-    """Проверяет добавление питомца с некорректной породой:
-    в поле animal_type передается текст больше 255 символов. Например, 500 символов.
-    Ожидается ответ от сервера 400. Но добавляет питомца успешно, возвращает код 200.
-    Неясно, зачем такая большая размерность для данного поля."""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-def test_add_new_pet_with_invalid_age(name='Пряня', animal_type='Кролик', age=invalid_text, pet_photo='images/rabbit.jpeg'):
-    """Проверяет добавление питомца с некорректным возрастом:
-    в поле age передается текст больше 255 символов, должен принимать только числа.
-    Ожидается ответ от сервера 400. Но добавляет питомца успешно, возвращает код 200. Баг"""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_with_negative_age(name='Пряня', animal_type='Кролик', age='-3', pet_photo='images/rabbit.jpeg'):
-    """Проверяет добавление питомца с некорректным возрастом:
-    в поле age передается отрицательное число, должен принимать только числа > 0.
-    Ожидается ответ от сервера 400. Но добавляет питомца успешно, возвращает код 200. Баг"""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_add_new_pet_with_empty_data(name='', animal_type='', age='', pet_photo='images/rabbit.jpeg'):
-    """Проверяет добавление питомца с незаполненными именем, породой и возрастом.
-    Ожидается ответ от сервера 400. Но добавляет питомца успешно, возвращает код 200. Баг"""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-
-    # Добавляем питомца
-    status, result = pf.add_new_pet(auth_key, name, animal_type, age, pet_photo)
-
-    # Проверяем полученные данные
-    assert status == 400
-
-
-def test_get_all_pets_with_invalid_key(filter=''):
-    """Проверяет, что запрос возвращает ответ от сервера 403, если auth_key невозможно получить, потому что
-    переданы некорректные email (invalid_email) и пароль (invalid_password)"""
-
-    status, auth_key = pf.get_api_key(invalid_email, invalid_password)
-    assert status == 403
-
-
-
-def test_add_new_pet_with_invalid_key(name='Снежа', animal_type='кролик', age='2', pet_photo='images/rabbit.jpeg'):
-    """Проверяет добавление питомца с корректными данными, если auth_key невозможно получить, потому что
-    переданы некорректные email (invalid_email) и пароль (invalid_password). Ожидаем ответ от сервера 403"""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    status, auth_key = pf.get_api_key(invalid_email, invalid_password)
-
-    # Проверяем полученные данные
-    assert status == 403
-
-
-def test_unsuccessful_delete_pet_with_invalid_key():
-    """Проверяет невозможность удаления питомца, если auth_key не получен, потому что
-    переданы некорректные email (invalid_email) и пароль (invalid_password). Ожидаем ответ от сервера 403"""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    status, auth_key = pf.get_api_key(invalid_email, invalid_password)
-
-    assert status == 403
-
-
-def test_unsuccessful_update_pet_with_invalid_key(name='Пушок', animal_type='заяц', age='3'):
-    """Проверяет невозможность изменения данных питомца, если auth_key не получен, потому что
-    переданы некорректные email (invalid_email) и пароль (invalid_password). Ожидаем ответ от сервера 403"""
-    # Получаем api ключ, сохраняем его в auth_key
-    status, auth_key = pf.get_api_key(invalid_email, invalid_password)
-
-    assert status == 403
-
-
-
-def test_add_new_pet_simple_with_invalid_key(name='Бэль', animal_type='дек. кролик', age='4'):
-    """Проверяет невозможность добавления питомца с корректными данными без фото, если auth_key не получен, потому что
-    переданы некорректные email (invalid_email) и пароль (invalid_password). Ожидаем ответ от сервера 403"""
-
-    # Получаем api ключ, сохраняем его в auth_key
-    status, auth_key = pf.get_api_key(invalid_email, invalid_password)
-
-    # Проверяем полученные данные
-    assert status == 403
-
-
-
-def test_add_photo_pet_with_invalid_key(pet_photo='images/rab.jpeg'):
-    """Проверяет невозможность добавления фото с корректными данными, если auth_key не получен, потому что
-    переданы некорректные email (invalid_email) и пароль (invalid_password). Ожидаем ответ от сервера 403"""
-
-    # Полный путь к изображению и сохранение его в переменную 'pet_photo'
-    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
-
-    # Получаем api ключ, сохраняем его в auth_key
-    status, auth_key = pf.get_api_key(invalid_email, invalid_password)
-
-    # Проверяем полученные данные
-    assert status == 403
-
-
-def test_get_all_pets_with_invalid_filter(filter='filter'):
-    """Проверяет, что запрос возвращает ответ от сервера 500, так как задан неподдерживаемый фильтр."""
-
-    _, auth_key = pf.get_api_key(valid_email, valid_password)
-    status, result = pf.get_list_of_pets(auth_key, filter)
-    assert status == 500
-    #assert len(result['pets']) > 0
-    print(result)
\ No newline at end of file
+        result = run_batch(pf, [case], auth_key)[case.id]
+    if isinstance(result, Exception):
+        raise result
+    status, _ = result
+    assert status == case.expected, case.doc
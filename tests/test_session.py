@@ -0,0 +1,38 @@
+from api import PetFriends
+
+
+def test_connection_is_reused_between_calls(stub_server):
+    """Проверяет, что несколько вызовов разных методов идут по одному keep-alive соединению"""
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        _, auth_key = pf.get_api_key('email', 'password')
+        pf.get_list_of_pets(auth_key, 'my_pets')
+        pf.add_new_pet_simple(auth_key, 'Бэль', 'кролик', '4')
+        pf.delete_pet(auth_key, 'stub-id')
+
+    assert len(stub_server.requests) == 4
+    assert stub_server.connections == 1
+
+
+def test_keep_alive_disabled_opens_new_connections(stub_server):
+    """Проверяет, что при keep_alive=False каждый запрос открывает новое соединение"""
+
+    with PetFriends(keep_alive=False) as pf:
+        pf.base_url = stub_server.url
+        pf.get_api_key('email', 'password')
+        pf.get_api_key('email', 'password')
+
+    assert stub_server.connections == 2
+
+
+def test_default_headers_and_pool_size(stub_server):
+    """Проверяет, что заголовки по умолчанию уходят в каждом запросе, а размер пула настраивается"""
+
+    with PetFriends(pool_maxsize=4, headers={'User-Agent': 'pf-tests'}) as pf:
+        pf.base_url = stub_server.url
+        pf.get_api_key('email', 'password')
+        adapter = pf.session.get_adapter(pf.base_url)
+
+    assert stub_server.requests[0][2]['User-Agent'] == 'pf-tests'
+    assert adapter._pool_maxsize == 4
@@ -0,0 +1,91 @@
+import base64
+import json
+import tracemalloc
+
+import pytest
+
+from api import PetFriends
+from streaming import PetsParser
+
+auth_key = {'key': 'stub-key'}
+
+
+def make_pets(count, photo_size=1000):
+    photo = 'data:image/jpeg;base64,' + base64.b64encode(b'\xff' * photo_size).decode()
+    return [{'id': str(i), 'name': 'Пушок "%d"\\' % i, 'animal_type': 'кот', 'age': str(i),
+             'created_at': '1690000000.0', 'user_id': 'u', 'pet_photo': photo if i % 2 else '',
+             'tags': {'nested': [1, {'pet_photo': 'x'}]}}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_parser_handles_any_chunk_boundaries(chunk_size):
+    """Проверяет, что результат разбора не зависит от того, как ответ разбит на куски"""
+
+    pets = make_pets(5)
+    raw = json.dumps({'pets': pets}).encode()
+
+    for photos in ('keep', 'skip', 'defer'):
+        parser = PetsParser(photos)
+        items = []
+        for i in range(0, len(raw), chunk_size):
+            items += parser.feed(raw[i:i + chunk_size])
+
+        assert parser.done
+        expected = []
+        for pet in pets:
+            pet = dict(pet)
+            if photos == 'skip':
+                del pet['pet_photo']
+            elif photos == 'defer':
+                pet['pet_photo'] = pet['pet_photo'].encode()
+            expected.append(pet)
+        assert items == expected
+
+
+def test_deferred_photo_with_escaped_slashes():
+    """Проверяет, что экранированные символы в отложенном фото раскодируются"""
+
+    raw = b'{"pets": [{"id": "1", "pet_photo": "data:image\\/jpeg;base64,AA\\/B"}]}'
+    assert PetsParser('defer').feed(raw) == [{'id': '1', 'pet_photo': b'data:image/jpeg;base64,AA/B'}]
+
+
+def test_iter_pets_yields_pets_from_server(stub_server):
+    """Проверяет, что iter_pets возвращает тех же питомцев, что и get_list_of_pets"""
+
+    stub_server.pets = make_pets(20)
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        _, result = pf.get_list_of_pets(auth_key)
+        pets = list(pf.iter_pets(auth_key, chunk_size=100))
+
+    assert pets == result['pets']
+
+
+def test_iter_pets_memory_does_not_grow_with_list(stub_server):
+    """Проверяет, что без фото потребление памяти не зависит от размера ответа"""
+
+    # Ответ собирается заранее, чтобы в замер не попала память самой заглушки
+    stub_server.pets = json.dumps({'pets': make_pets(200, photo_size=30000)}).encode()
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        tracemalloc.start()
+        count = sum(1 for _ in pf.iter_pets(auth_key, photos='skip'))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    assert count == 200
+    assert peak < 1024 * 1024
+
+
+def test_iter_pets_raises_on_error_status(stub_server):
+    """Проверяет, что при ошибке сервера iter_pets выбрасывает исключение"""
+
+    stub_server.revoked.add('stub-key')
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        with pytest.raises(Exception):
+            list(pf.iter_pets(auth_key))
@@ -0,0 +1,84 @@
+import io
+import mmap
+import os
+import os.path
+
+import uploads
+from api import PetFriends
+
+auth_key = {'key': 'stub-key'}
+pet_photo = os.path.join(os.path.dirname(__file__), 'images/rab.jpeg')
+
+
+def read_photo():
+    with open(pet_photo, 'rb') as file:
+        return file.read()
+
+
+def open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def test_photo_sources_produce_same_body(stub_server):
+    """Проверяет, что путь, bytes, memoryview и файловый объект дают одно и то же содержимое файла в запросе"""
+
+    photo = read_photo()
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        with open(pet_photo, 'rb') as file:
+            sources = [pet_photo, photo, memoryview(photo), io.BytesIO(photo), file]
+            for source in sources:
+                status, _ = pf.add_new_pet(auth_key, 'Снежа', 'кролик', '2', source)
+                assert status == 200
+
+    for body in stub_server.bodies:
+        assert photo in body
+        assert 'Снежа'.encode() in body
+        assert body.endswith(b'--\r\n')
+    assert all(headers['Content-Length'] == str(len(body))
+               for (_, _, headers), body in zip(stub_server.requests, stub_server.bodies))
+
+
+def test_upload_does_not_leak_file_descriptors(stub_server):
+    """Проверяет, что многократная загрузка фото не оставляет открытых файлов"""
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        pf.add_photo_pet(auth_key, 'stub-id', pet_photo)
+        before = open_fds()
+        for _ in range(50):
+            pf.add_photo_pet(auth_key, 'stub-id', pet_photo)
+        after = open_fds()
+
+    assert after <= before
+
+
+def test_encoded_file_part_is_reused(stub_server):
+    """Проверяет, что часть тела с файлом собирается один раз и переиспользуется для повторных загрузок"""
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        first = pf._photos.body({}, pet_photo)
+        second = pf._photos.body({'name': 'Бэль'}, pet_photo)
+        pf.add_photo_pet(auth_key, 'stub-id', pet_photo)
+        pf.add_photo_pet(auth_key, 'stub-id', pet_photo)
+
+    assert first._parts[1].obj is second._parts[2].obj
+    assert stub_server.bodies[0] == stub_server.bodies[1] == bytes(first.read())
+
+
+def test_large_file_is_memory_mapped(tmp_path, stub_server):
+    """Проверяет, что большой файл отправляется из mmap без чтения в память"""
+
+    photo = tmp_path / 'big.jpeg'
+    photo.write_bytes(os.urandom(uploads.MMAP_THRESHOLD + 1))
+
+    with PetFriends() as pf:
+        pf.base_url = stub_server.url
+        status, _ = pf.add_photo_pet(auth_key, 'stub-id', str(photo))
+        cached = list(pf._photos._cache.values())
+
+    assert status == 200
+    assert isinstance(cached[0][1], mmap.mmap)
+    assert photo.read_bytes() in stub_server.bodies[0]
@@ -0,0 +1,94 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+
+# Замеры установки соединения для текущего потока. Клиент кладёт сюда словарь перед отправкой
+# запроса, соединения urllib3 (они открываются в том же потоке) дописывают в него время
+_local = threading.local()
+
+
+@contextmanager
+def measure_connections():
+    """Контекст, в котором соединения текущего потока записывают время DNS, TCP и TLS в
+    возвращаемый словарь. Вложенные контексты (например, перезапрос ключа внутри запроса)
+    пишут в свой словарь и не смешиваются с внешним"""
+
+    previous = getattr(_local, 'timings', None)
+    timings = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+def _timings() -> dict:
+    timings = getattr(_local, 'timings', None)
+    return timings if timings is not None else {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """Соединение urllib3, которое отдельно замеряет разрешение имени и TCP подключение: адрес
+    получается через getaddrinfo заранее, а подключение идёт уже к IP"""
+
+    def _new_conn(self) -> socket.socket:
+        timings = _timings()
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+        timings['dns'] += resolved - started
+
+        error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+            timings['connect'] += time.perf_counter() - resolved
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """HTTPS вариант: время TLS рукопожатия - это всё время connect() за вычетом DNS и TCP"""
+
+    def connect(self):
+        timings = _timings()
+        before = timings['dns'] + timings['connect']
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            timings['tls'] += time.perf_counter() - started - (timings['dns'] + timings['connect'] - before)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter с пулом соединений, которые записывают время DNS, TCP и TLS в measure_connections()"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
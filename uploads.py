@@ -0,0 +1,160 @@
+import io
+import mmap
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+# Файлы больше этого размера не читаются в память, а отображаются через mmap
+MMAP_THRESHOLD = 1024 * 1024
+
+
+class MultipartBody(io.RawIOBase):
+    """Тело multipart/form-data, собранное из готовых буферов (bytes, memoryview, mmap) без их
+    копирования. requests отправляет его как поток с известной длиной, read() отдаёт срезы
+    memoryview исходных буферов"""
+
+    def __init__(self, parts: list):
+        super().__init__()
+        self._parts = [memoryview(part).cast('B') for part in parts]
+        self._length = sum(len(part) for part in self._parts)
+        self._index = 0
+        self._offset = 0
+        self._position = 0
+
+    def __len__(self):
+        return self._length
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        # Поддерживаем только перемотку в начало - этого достаточно для повторной отправки
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('MultipartBody можно перемотать только в начало')
+        self._index = self._offset = self._position = 0
+        return 0
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            return self.readall()
+        if self._index >= len(self._parts):
+            return b''
+        part = self._parts[self._index]
+        chunk = part[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        self._position += len(chunk)
+        if self._offset >= len(part):
+            self._index += 1
+            self._offset = 0
+        return chunk
+
+    def readall(self):
+        chunks = []
+        while True:
+            chunk = self.read(self._length)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class PhotoEncoder:
+    """Готовит части multipart запроса с фото питомца. Принимает путь к файлу, bytes, memoryview или
+    файловый объект. Закодированная часть с файлом для путей кэшируется (по пути, размеру и времени
+    изменения), поэтому повторная загрузка одного и того же фото не перечитывает файл"""
+
+    def __init__(self, cache_size: int = 32, content_type: str = 'image/jpeg'):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=' + self.boundary
+        self.photo_content_type = content_type
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._tail = ('--%s--\r\n' % self.boundary).encode()
+
+    def close(self):
+        """Освобождает закэшированные файлы"""
+
+        with self._lock:
+            entries = list(self._cache.values())
+            self._cache.clear()
+        for _, data in entries:
+            _release(data)
+
+    def body(self, fields: dict, pet_photo, field_name: str = 'pet_photo', content_type: str = None) -> MultipartBody:
+        """Возвращает тело запроса из текстовых полей fields и файла pet_photo. content_type - тип
+        файла в запросе, по умолчанию photo_content_type"""
+
+        head, data = self._file_part(pet_photo, field_name, content_type or self.photo_content_type)
+        parts = [self._fields(fields)] if fields else []
+        return MultipartBody(parts + [head, data, b'\r\n', self._tail])
+
+    def _fields(self, fields: dict) -> bytes:
+        chunks = []
+        for name, value in fields.items():
+            chunks.append('--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n'
+                          % (self.boundary, name, value))
+        return ''.join(chunks).encode()
+
+    def _head(self, field_name: str, filename: str, content_type: str) -> bytes:
+        filename = filename.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+        return ('--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\nContent-Type: %s\r\n\r\n'
+                % (self.boundary, field_name, filename, content_type)).encode()
+
+    def _file_part(self, pet_photo, field_name: str, content_type: str):
+        if isinstance(pet_photo, (bytes, bytearray, memoryview)):
+            return self._head(field_name, 'pet_photo', content_type), pet_photo
+
+        if hasattr(pet_photo, 'read'):
+            # Файловым объектом владеет вызывающий, поэтому читаем его, но не закрываем
+            filename = os.path.basename(getattr(pet_photo, 'name', '') or 'pet_photo')
+            return self._head(field_name, str(filename), content_type), pet_photo.read()
+
+        path = os.path.abspath(os.fspath(pet_photo))
+        stat = os.stat(path)
+        key = (path, field_name, content_type, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        cached = (self._head(field_name, os.path.basename(path), content_type), _load(path, stat.st_size))
+        with self._lock:
+            self._cache[key] = cached
+            evicted = []
+            while len(self._cache) > self.cache_size:
+                evicted.append(self._cache.popitem(last=False)[1])
+        for _, data in evicted:
+            _release(data)
+        return cached
+
+
+def _load(path: str, size: int):
+    """Читает небольшой файл целиком, большой отображает в память через mmap. Дескриптор файла
+    закрывается сразу: mmap держит собственную копию"""
+
+    with open(path, 'rb') as file:
+        if size < MMAP_THRESHOLD:
+            return file.read()
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _release(data):
+    if isinstance(data, mmap.mmap):
+        try:
+            data.close()
+        except BufferError:
+            # Тело ещё отправляется в другом потоке - mmap закроется сборщиком мусора
+            pass